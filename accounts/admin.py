@@ -13,7 +13,7 @@ class ProfileInline(admin.StackedInline):
     model = Profile
     can_delete = False
     extra = 0
-    fields = ("image","phone","location","shirt_size")
+    fields = ("image","phone","location","shirt_size","max_weekly_hours")
 
 class CustomUserAdmin(UserAdmin):
     inlines = (ProfileInline,)
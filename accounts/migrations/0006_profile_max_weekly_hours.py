@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_customuser_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='max_weekly_hours',
+            field=models.PositiveSmallIntegerField(default=40),
+        ),
+    ]
@@ -35,6 +35,8 @@ class Profile(models.Model):
     emergency_contact_number = models.CharField(max_length=20,blank=True)
     start_date = models.DateField(default=timezone.now)
     is_primary = models.BooleanField(default=False)
+    # Upper bound the schedule generator respects when assigning shifts
+    max_weekly_hours = models.PositiveSmallIntegerField(default=40)
     shirt_size = models.CharField(max_length=15,
                                   choices=SHIRT_SIZES,
                                   blank=True,
@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    One listener's bounded queue of events, owned by the event loop that created it.
+    A listener that falls too far behind gets a single 'resync' event in place of the
+    backlog, so a stalled client cannot grow the worker's memory.
+    """
+
+    def __init__(self, broker, channels, loop, maxsize):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, event):
+        """Call on the subscription's loop; see BaseBroker.fan_out for other threads."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            if isinstance(event, dict):
+                event = {'id': event['id'], 'channel': event['channel'], 'type': 'resync', 'data': {}}
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+def _deliver(listeners, event):
+    for subscription in listeners:
+        subscription.put(event)
+
+
+class BaseBroker:
+    """
+    Fans published events out to subscriptions. Subclasses that relay between
+    processes (Redis, Postgres LISTEN/NOTIFY, ...) override `publish` to send the
+    event out and call `fan_out` when one arrives.
+    """
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or getattr(settings, 'LIVE_QUEUE_SIZE', 100)
+        self.subscribers = {}  # channel -> set of Subscription
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def subscribe(self, channels):
+        """Call from inside the event loop that will read the subscription."""
+        subscription = Subscription(self, channels, asyncio.get_running_loop(), self.queue_size)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                listeners = self.subscribers.get(channel)
+                if listeners is not None:
+                    listeners.discard(subscription)
+                    if not listeners:
+                        del self.subscribers[channel]
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(set().union(*self.subscribers.values())) if self.subscribers else 0
+
+    def fan_out(self, event):
+        """
+        Hand the event to every subscription of its channel. Publishers usually run in a
+        sync thread, so delivery is scheduled on each event loop with one thread-safe
+        call per loop rather than one per listener.
+        """
+        by_loop = {}
+        with self.lock:
+            for subscription in self.subscribers.get(event['channel'], ()):
+                by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, listeners in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, listeners, event)
+            except RuntimeError:
+                # The loop is gone; its connections' cleanup will unsubscribe them
+                pass
+        return sum(len(listeners) for listeners in by_loop.values())
+
+    def publish(self, channel, type, data):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """Delivers events to listeners in this process only: enough for one worker, tests and development."""
+
+    def publish(self, channel, type, data):
+        return self.fan_out({'id': next(self.ids), 'channel': channel, 'type': type, 'data': data})
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    """The broker named by settings.LIVE_BROKER, one instance per process."""
+    path = getattr(settings, 'LIVE_BROKER', 'live.brokers.InMemoryBroker')
+    if path not in _brokers:
+        with _brokers_lock:
+            _brokers.setdefault(path, import_string(path)())
+    return _brokers[path]
+
+
+def publish(channel, type, data):
+    return get_broker().publish(channel, type, data)
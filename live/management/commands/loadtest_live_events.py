@@ -0,0 +1,71 @@
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from live.brokers import InMemoryBroker
+from live.sse import EVENTS_PATH, EventStream
+
+
+class Command(BaseCommand):
+    help = "Hold many idle server-sent event connections in-process and measure their memory and fan-out time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000)
+        parser.add_argument('--events', type=int, default=10)
+
+    def handle(self, *args, **options):
+        stats = asyncio.run(self.run(options['connections'], options['events']))
+        self.stdout.write(f"connections: {options['connections']}")
+        self.stdout.write(f"     memory: {stats['memory'] / 1024:10.1f} KiB total, "
+                          f"{stats['memory'] / options['connections'] / 1024:6.2f} KiB per connection")
+        self.stdout.write(f"    fan-out: {stats['fan_out'] * 1000:10.2f} ms per event to every connection")
+        self.stdout.write(f"  delivered: {stats['delivered']} of {options['connections'] * options['events']}")
+
+    async def run(self, connections, events):
+        async def allow(scope):
+            return True
+
+        broker = InMemoryBroker(queue_size=max(events, 1))
+        # No heartbeats during the run: the point is the cost of connections that sit idle
+        stream = EventStream(broker=broker, authorize=allow, heartbeat=3600)
+        scope = {'type': 'http', 'method': 'GET', 'path': EVENTS_PATH, 'query_string': b'', 'headers': []}
+        closed = asyncio.Event()
+        delivered = 0
+        received = asyncio.Event()
+
+        async def receive():
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal delivered
+            if message['type'] == 'http.response.body' and message['body'].startswith(b'id:'):
+                delivered += 1
+                if delivered % connections == 0:
+                    received.set()
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tasks = [asyncio.ensure_future(stream(scope, receive, send)) for _ in range(connections)]
+        while broker.subscriber_count() < connections:
+            await asyncio.sleep(0)
+        # Let every connection reach its idle wait
+        await asyncio.sleep(0.1)
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for i in range(events):
+            received.clear()
+            broker.publish('schedule', 'shift', {'action': 'saved', 'id': i, 'location_id': None})
+            await received.wait()
+        fan_out = (time.perf_counter() - start) / max(events, 1)
+
+        closed.set()
+        await asyncio.gather(*tasks)
+        return {'memory': memory, 'fan_out': fan_out, 'delivered': delivered}
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from scheduling.models import ScheduleDay, Shift
+from scheduling.signals import schedule_bulk_changed
+from scheduling.weekly import week_start
+from training.models import ExamResult
+from training.signals import results_created
+from .brokers import publish
+
+SCHEDULE = 'schedule'
+TRAINING = 'training'
+
+
+def publish_on_commit(channel, type, data):
+    # Listeners only hear about changes that were actually committed
+    transaction.on_commit(lambda: publish(channel, type, data))
+
+
+@receiver([post_save, post_delete], sender=Shift)
+def shift_changed(sender, instance, **kwargs):
+    day = ScheduleDay.objects.filter(pk=instance.day_id).values('date', 'location_id').first() or {}
+    publish_on_commit(SCHEDULE, 'shift', {
+        'action': 'deleted' if kwargs['signal'] is post_delete else 'saved',
+        'id': instance.pk,
+        'day_id': instance.day_id,
+        'date': day.get('date') and day['date'].isoformat(),
+        'location_id': day.get('location_id'),
+    })
+
+
+@receiver([post_save, post_delete], sender=ScheduleDay)
+def schedule_day_changed(sender, instance, **kwargs):
+    publish_on_commit(SCHEDULE, 'day', {
+        'action': 'deleted' if kwargs['signal'] is post_delete else 'saved',
+        'id': instance.pk,
+        'date': instance.date.isoformat(),
+        'location_id': instance.location_id,
+    })
+
+
+@receiver(schedule_bulk_changed)
+def schedule_bulk_written(sender, days, **kwargs):
+    # One event per week and location rather than one per row: a generated week is hundreds of shifts
+    for start, location_id in sorted({(week_start(date), location_id) for date, location_id in days},
+                                     key=lambda week: (week[0], week[1] or 0)):
+        publish_on_commit(SCHEDULE, 'week', {
+            'action': 'bulk',
+            'date': start.isoformat(),
+            'location_id': location_id,
+        })
+
+
+@receiver(results_created, sender=ExamResult)
+def exam_results_created(sender, results, **kwargs):
+    # Sent for single saves and for the buffered outbox's bulk inserts alike
+    exams = {}
+    for result in results:
+        exams[result.exam_id] = exams.get(result.exam_id, 0) + 1
+    publish_on_commit(TRAINING, 'exam_results', {
+        'created': len(results),
+        'exams': {str(exam_id): count for exam_id, count in exams.items()},
+    })
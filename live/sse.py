@@ -0,0 +1,150 @@
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http import HttpRequest
+
+from .brokers import get_broker
+
+EVENTS_PATH = '/live/events/'
+CHANNELS = ('schedule', 'training')
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+def _is_staff(scope):
+    """Session cookie -> user, the same lookup AuthenticationMiddleware does."""
+    close_old_connections()
+    try:
+        cookies = SimpleCookie(_header(scope, b'cookie'))
+        morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+        if morsel is None:
+            return False
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+        user = auth.get_user(request)
+        return user.is_authenticated and user.is_staff
+    finally:
+        close_old_connections()
+
+
+def format_event(event):
+    """The event's SSE frame, encoded once and shared by every connection it goes to."""
+    body = event.get('body')
+    if body is None:
+        data = json.dumps(event['data'], cls=DjangoJSONEncoder, separators=(',', ':'))
+        body = event['body'] = f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+    return body
+
+
+# Sentinels put on a subscription's queue next to the broker's events
+PING = 'ping'
+CLOSED = 'closed'
+
+
+class EventStream:
+    """
+    Raw ASGI app streaming broker events to staff as server-sent events.
+
+    ?channels=schedule,training picks what to hear (both by default) and
+    ?location=<id> drops schedule events for other locations. Each connection is a
+    coroutine parked on its subscription queue; a disconnect and the shared heartbeat
+    timer both arrive through that queue, so an idle client costs a few kilobytes,
+    no thread and no timer of its own. Only the session lookup runs in a thread.
+    """
+
+    def __init__(self, broker=None, authorize=None, heartbeat=None):
+        self.broker = broker
+        self.authorize = authorize or sync_to_async(_is_staff)
+        self.heartbeat = heartbeat or getattr(settings, 'LIVE_HEARTBEAT_SECONDS', 15)
+        self.open = set()
+        self.pinger = None
+
+    async def ping(self):
+        loop = asyncio.get_running_loop()
+        while self.open:
+            await asyncio.sleep(self.heartbeat)
+            for subscription in list(self.open):
+                # A backed-up client is clearly not idle
+                if subscription.loop is loop and not subscription.queue.full():
+                    subscription.put(PING)
+
+    async def __call__(self, scope, receive, send):
+        if scope['method'] != 'GET':
+            return await self.reject(send, 405, b"Method not allowed.")
+        if not await self.authorize(scope):
+            return await self.reject(send, 403, b"Staff only.")
+
+        query = parse_qs(scope.get('query_string', b'').decode())
+        channels = [c for c in ','.join(query.get('channels', [])).split(',') if c in CHANNELS] or CHANNELS
+        location = (query.get('location') or [''])[0]
+        location_id = int(location) if location.isdigit() else None
+
+        subscription = (self.broker or get_broker()).subscribe(channels)
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            subscription.put(CLOSED)
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        self.open.add(subscription)
+        if self.pinger is None or self.pinger.done() or self.pinger.get_loop() is not subscription.loop:
+            self.pinger = asyncio.ensure_future(self.ping())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    # Tell nginx not to buffer the stream
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            while True:
+                event = await subscription.get()
+                if event is CLOSED:
+                    break
+                if event is PING:
+                    # A comment line keeps proxies from timing the connection out
+                    body = b': ping\n\n'
+                elif location_id and event['data'].get('location_id') not in (None, location_id):
+                    continue
+                else:
+                    body = format_event(event)
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            self.open.discard(subscription)
+            subscription.close()
+            watcher.cancel()
+
+    async def reject(self, send, status, body):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def with_event_stream(django_application, stream=None):
+    """Route EVENTS_PATH to the event stream and everything else to Django."""
+    stream = stream or EventStream()
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+            return await stream(scope, receive, send)
+        return await django_application(scope, receive, send)
+
+    return application
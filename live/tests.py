@@ -0,0 +1,174 @@
+import asyncio
+import datetime
+from io import StringIO
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from accounts.models import Location
+from jobs.models import EmployeeJob, JobBase
+from live.brokers import BaseBroker, InMemoryBroker, get_broker
+from live.sse import EVENTS_PATH, EventStream
+from scheduling.models import ScheduleDay, Shift
+from scheduling.solver import ScheduleSolver
+from training.models import Exam, ExamResult
+
+User = get_user_model()
+
+
+class RecordingBroker(BaseBroker):
+    """Keeps what is published instead of delivering it."""
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def publish(self, channel, type, data):
+        self.events.append((channel, type, data))
+
+
+async def _listen(broker, channels, publish, count):
+    subscription = broker.subscribe(channels)
+    try:
+        for args in publish:
+            broker.publish(*args)
+        return [await asyncio.wait_for(subscription.get(), 1) for _ in range(count)]
+    finally:
+        subscription.close()
+
+
+class BrokerTests(TestCase):
+    def test_fan_out_by_channel(self):
+        broker = InMemoryBroker()
+        events = async_to_sync(_listen)(broker, ['schedule'], [
+            ('training', 'exam_results', {'created': 1}),
+            ('schedule', 'shift', {'id': 1}),
+        ], 1)
+        self.assertEqual([(e['channel'], e['type'], e['data']) for e in events], [('schedule', 'shift', {'id': 1})])
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_slow_listener_gets_resync_instead_of_backlog(self):
+        broker = InMemoryBroker(queue_size=2)
+        events = async_to_sync(_listen)(broker, ['schedule'], [('schedule', 'shift', {'id': i}) for i in range(3)], 1)
+        self.assertEqual(events[0]['type'], 'resync')
+
+    @override_settings(LIVE_BROKER='live.tests.RecordingBroker')
+    def test_model_changes_are_published_on_commit(self):
+        broker = get_broker()
+        broker.events.clear()
+        location = Location.objects.create(name="Downtown")
+        with self.captureOnCommitCallbacks(execute=True):
+            day = ScheduleDay.objects.create(date=datetime.date(2025, 3, 3), location=location)
+            shift = Shift.objects.create(day=day, start_time=datetime.time(9), end_time=datetime.time(17))
+        shift_id = shift.pk
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            shift.delete()
+        self.assertEqual(len(broker.events), 2)  # nothing is sent before the commit
+        for callback in callbacks:
+            callback()
+
+        exam = Exam.objects.create(title="Safety", job=JobBase.objects.create(title="Server"), season='FALL', year=2025)
+        profile = User.objects.create_user(username="emp", email="emp@email.com", password="x").profile
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamResult.objects.create(profile=profile, exam=exam, score=90, passed=True)
+
+        self.assertEqual([(channel, type) for channel, type, _ in broker.events],
+                         [('schedule', 'day'), ('schedule', 'shift'), ('schedule', 'shift'), ('training', 'exam_results')])
+        self.assertEqual(broker.events[1][2], {'action': 'saved', 'id': shift_id, 'day_id': day.pk,
+                                               'date': '2025-03-03', 'location_id': location.pk})
+        self.assertEqual(broker.events[2][2]['action'], 'deleted')
+        self.assertEqual(broker.events[3][2], {'created': 1, 'exams': {str(exam.pk): 1}})
+
+    def test_generated_week_reaches_subscribers(self):
+        # Generated shifts are bulk inserted, so they send no Shift signals of their own
+        location = Location.objects.create(name="Downtown")
+        monday = datetime.date(2025, 3, 3)
+        for d in range(7):
+            ScheduleDay.objects.create(date=monday + datetime.timedelta(days=d), location=location, projected_sales=1500)
+        cook = JobBase.objects.create(title="Cook", department="BOH")
+        for i in range(3):
+            profile = User.objects.create_user(username=f"cook{i}", email=f"cook{i}@email.com", password="x").profile
+            profile.location = location
+            profile.save()
+            EmployeeJob.objects.create(profile=profile, job=cook, pay_rate=18)
+
+        def generate():
+            with self.captureOnCommitCallbacks(execute=True):
+                ScheduleSolver(monday, seed=1).solve().save()
+
+        async def listen():
+            subscription = get_broker().subscribe(['schedule'])
+            try:
+                await sync_to_async(generate)()
+                return await asyncio.wait_for(subscription.get(), 1)
+            finally:
+                subscription.close()
+
+        event = async_to_sync(listen)()
+        self.assertEqual((event['type'], event['data']),
+                         ('week', {'action': 'bulk', 'date': '2025-03-03', 'location_id': location.pk}))
+
+    def test_loadtest_command(self):
+        out = StringIO()
+        call_command("loadtest_live_events", "--connections", "50", "--events", "2", stdout=out)
+        self.assertIn("delivered: 100 of 100", out.getvalue())
+
+
+# Transactional: the stream's session lookup closes stale connections the way a request would
+class EventStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="boss", email="boss@email.com", password="x", is_staff=True)
+
+    def cookie(self, user):
+        self.client.force_login(user)
+        return f"sessionid={self.client.cookies['sessionid'].value}".encode()
+
+    def stream(self, cookie=b'', query=b'', publish=()):
+        async def run():
+            broker = InMemoryBroker()
+            app = EventStream(broker=broker)
+            sent, closed = [], asyncio.Event()
+
+            async def receive():
+                await closed.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {'type': 'http', 'method': 'GET', 'path': EVENTS_PATH, 'query_string': query,
+                     'headers': [(b'cookie', cookie)] if cookie else []}
+            task = asyncio.ensure_future(app(scope, receive, send))
+            while not broker.subscriber_count() and not task.done():
+                await asyncio.sleep(0.001)
+            for args in publish:
+                broker.publish(*args)
+            await asyncio.sleep(0.01)
+            closed.set()
+            await task
+            return sent, broker.subscriber_count()
+
+        return async_to_sync(run)()
+
+    def test_staff_only(self):
+        sent, _ = self.stream()
+        self.assertEqual(sent[0]['status'], 403)
+        regular = User.objects.create_user(username="emp", email="emp@email.com", password="x")
+        sent, _ = self.stream(self.cookie(regular))
+        self.assertEqual(sent[0]['status'], 403)
+
+    def test_streams_events_until_disconnect(self):
+        sent, listeners = self.stream(self.cookie(self.staff), b'channels=schedule&location=1', [
+            ('schedule', 'shift', {'id': 1, 'location_id': 1}),
+            ('schedule', 'shift', {'id': 2, 'location_id': 2}),
+            ('training', 'exam_results', {'created': 3}),
+        ])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        bodies = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn(b'event: shift\ndata: {"id":1,"location_id":1}\n\n', bodies)
+        self.assertNotIn(b'"id":2', bodies)
+        self.assertNotIn(b'exam_results', bodies)
+        self.assertEqual(listeners, 0)
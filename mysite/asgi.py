@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup so the live app's models and settings are ready
+from live.sse import with_event_stream  # noqa: E402
+
+# Server-sent events at /live/events/ are streamed without going through Django's request cycle
+application = with_event_stream(django_application)
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     "jobs.apps.JobsConfig",
     "training.apps.TrainingConfig",
     "scheduling.apps.SchedulingConfig",
+    "live.apps.LiveConfig",
 ]
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -80,6 +81,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "training.context_processors.training_status",
             ],
         },
     },
@@ -159,4 +161,41 @@ AUTHENTICATION_BACKENDS = (
     "allauth.account.auth_backends.AuthenticationBackend",
 )
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
-ACCOUNT_SIGNUP_PASSWORD_ENTER_TWICE = False
\ No newline at end of file
+ACCOUNT_SIGNUP_PASSWORD_ENTER_TWICE = False
+
+# Schedule generator: staff needed per shift is projected sales x sales_share / sales_per_staff,
+# never fewer than `minimum` (sales_per_staff 0 means a fixed headcount)
+SCHEDULING_STAFFING_RATIOS = {
+    'FOH': {'sales_per_staff': 350, 'minimum': 2},
+    'BOH': {'sales_per_staff': 600, 'minimum': 1},
+    'Management': {'sales_per_staff': 0, 'minimum': 1},
+}
+SCHEDULING_SHIFT_TEMPLATES = {
+    'AM': {'start': '07:00', 'end': '15:00', 'sales_share': 0.35},
+    'MID': {'start': '11:00', 'end': '19:00', 'sales_share': 0.25},
+    'PM': {'start': '16:00', 'end': '00:00', 'sales_share': 0.40},
+}
+# Shorter gaps between an employee's shifts are reported as rest conflicts
+SCHEDULING_MIN_REST_HOURS = 8
+# Payroll export: hours past this in a Monday-Sunday workweek are overtime, paid at the
+# multiplier times the employee's blended rate for that week (all jobs' pay / all hours)
+SCHEDULING_OVERTIME_WEEKLY_HOURS = 40
+SCHEDULING_OVERTIME_MULTIPLIER = 1.5
+# Schedule delta sync: deletes are remembered this long, and older cursors must resync from scratch
+SCHEDULING_TOMBSTONE_DAYS = 30
+# Publishing a week queues an email to every scheduled employee; run
+# `python manage.py send_publish_notifications --loop` alongside the web process to send them,
+# this many over each mail connection
+SCHEDULING_NOTIFY_BATCH_SIZE = 200
+# Queue graded exams in the ExamSubmission outbox instead of writing ExamResult in the request;
+# run `python manage.py flush_exam_submissions --loop` alongside the web process when enabled
+TRAINING_BUFFERED_SUBMISSIONS = os.getenv('TRAINING_BUFFERED_SUBMISSIONS', 'False') == 'True'
+# Processed outbox rows are deleted by flush_exam_submissions after this many days
+TRAINING_SUBMISSION_RETENTION_DAYS = 7
+# Live updates over server-sent events, served by mysite/asgi.py (run an ASGI server such as
+# `uvicorn mysite.asgi:application`; runserver is WSGI only). The in-memory broker only reaches
+# clients connected to the same process; multi-worker deployments need a relaying backend
+LIVE_BROKER = os.getenv('LIVE_BROKER', 'live.brokers.InMemoryBroker')
+LIVE_HEARTBEAT_SECONDS = 15
+# Events buffered per connection before a slow client is told to resync instead
+LIVE_QUEUE_SIZE = 100
@@ -0,0 +1,4 @@
+class Echo:
+    """File-like object whose write() returns the line, for csv.writer in a generator."""
+    def write(self, value):
+        return value
@@ -1,3 +1,137 @@
 from django.contrib import admin
+from django.utils.html import format_html_join
+from .models import (
+    Availability, Kiosk, NotificationDelivery, PublishedSchedule, PublishNotification, SalesHistory, ScheduleDay,
+    ScheduleFeed, ScheduleTemplate, ScheduleTemplateShift, Shift, TimePunch,
+)
+from .availability import mask_windows
+from .conflicts import shift_conflicts
 
 # Register your models here.
+class ShiftInline(admin.TabularInline):
+    model = Shift
+    extra = 0
+    fields = ('employee_job', 'shift_type', 'section_number', 'start_time', 'end_time')
+    raw_id_fields = ('employee_job',)
+
+@admin.register(ScheduleDay)
+class ScheduleDayAdmin(admin.ModelAdmin):
+    list_display = ('date', 'location', 'projected_sales', 'created_by')
+    list_filter = ('location',)
+    list_select_related = ('location', 'created_by__user')
+    date_hierarchy = 'date'
+    inlines = [ShiftInline]
+
+@admin.register(Shift)
+class ShiftAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'shift_type', 'section_number', 'start_time', 'end_time')
+    list_filter = ('shift_type', 'day__location')
+    readonly_fields = ('conflicts',)
+    raw_id_fields = ('employee_job',)
+    date_hierarchy = 'day__date'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_related()
+
+    # Saving through the admin runs Shift.clean, which rejects new conflicts
+    @admin.display(description='Conflicts')
+    def conflicts(self, obj):
+        conflicts = shift_conflicts(obj) if obj.pk else []
+        if not conflicts:
+            return "None"
+        return format_html_join('', '<div>{}</div>', ((conflict['message'],) for conflict in conflicts))
+
+@admin.register(Availability)
+class AvailabilityAdmin(admin.ModelAdmin):
+    list_display = ('profile', 'updated_at')
+    list_select_related = ('profile__user',)
+    raw_id_fields = ('profile',)
+    exclude = Availability.WEEKDAYS
+    readonly_fields = ('windows',)
+
+    # The bitmaps are edited through scheduling.availability; show them as time ranges here
+    @admin.display(description='Available')
+    def windows(self, obj):
+        return format_html_join('', '<div>{}: {}</div>', (
+            (weekday.title(), ', '.join(f"{start:%H:%M}-{end:%H:%M}" for start, end in mask_windows(obj.get_mask(i)))
+             or 'Unavailable')
+            for i, weekday in enumerate(Availability.WEEKDAYS)
+        ))
+
+class ScheduleTemplateShiftInline(admin.TabularInline):
+    model = ScheduleTemplateShift
+    extra = 0
+    raw_id_fields = ('employee_job',)
+
+@admin.register(ScheduleTemplate)
+class ScheduleTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'location', 'created_by', 'created_at')
+    list_select_related = ('location', 'created_by__user')
+    inlines = [ScheduleTemplateShiftInline]
+
+@admin.register(PublishedSchedule)
+class PublishedScheduleAdmin(admin.ModelAdmin):
+    list_display = ('location', 'week_start', 'version', 'is_current', 'published_at', 'published_by')
+    list_filter = ('location', 'is_current')
+    list_select_related = ('location', 'published_by__user')
+    date_hierarchy = 'week_start'
+    exclude = ('payload',)
+
+    # Versions are written by publish/rollback only, so they stay consistent with their etag
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class NotificationDeliveryInline(admin.TabularInline):
+    model = NotificationDelivery
+    extra = 0
+    fields = ('email', 'sent_at', 'attempts', 'error')
+    readonly_fields = fields
+    can_delete = False
+
+@admin.register(PublishNotification)
+class PublishNotificationAdmin(admin.ModelAdmin):
+    list_display = ('published', 'status', 'sent', 'failed', 'total', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    list_select_related = ('published__location',)
+    readonly_fields = ('published', 'total', 'sent', 'failed', 'attempts', 'last_error', 'finished_at')
+    fields = ('published', 'status', 'next_attempt_at') + readonly_fields[1:]
+    inlines = [NotificationDeliveryInline]
+
+@admin.register(ScheduleFeed)
+class ScheduleFeedAdmin(admin.ModelAdmin):
+    list_display = ('profile', 'version', 'updated_at')
+    list_select_related = ('profile__user',)
+    readonly_fields = ('token', 'version', 'updated_at')
+    raw_id_fields = ('profile',)
+
+@admin.register(SalesHistory)
+class SalesHistoryAdmin(admin.ModelAdmin):
+    list_display = ('date', 'location', 'sales')
+    list_filter = ('location',)
+    list_select_related = ('location',)
+    date_hierarchy = 'date'
+
+@admin.register(Kiosk)
+class KioskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'location', 'is_active', 'last_seen_at')
+    list_filter = ('location', 'is_active')
+    list_select_related = ('location',)
+    readonly_fields = ('token', 'last_seen_at')
+
+@admin.register(TimePunch)
+class TimePunchAdmin(admin.ModelAdmin):
+    list_display = ('profile', 'kind', 'punched_at', 'kiosk', 'sequence', 'received_at')
+    list_filter = ('kind', 'kiosk__location')
+    list_select_related = ('profile__user', 'kiosk__location')
+    raw_id_fields = ('profile',)
+    date_hierarchy = 'punched_at'
+
+    # Punches are the kiosks' record of what happened; corrections belong in the schedule
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
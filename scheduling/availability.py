@@ -0,0 +1,195 @@
+import datetime
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+from jobs.models import EmployeeJob
+from .conflicts import find_conflicts, shift_interval
+from .models import Availability, Shift
+from .weekly import week_start
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_MASK = (1 << SLOTS_PER_DAY) - 1
+LOW_BITS = (1 << 64) - 1
+AVAILABILITY_TIMEOUT = 60 * 60
+
+
+def _slot(value, round_up=False):
+    minutes = value.hour * 60 + value.minute + (value.second + value.microsecond / 1e6) / 60
+    return int(-(-minutes // SLOT_MINUTES) if round_up else minutes // SLOT_MINUTES)
+
+
+def window_mask(start_time, end_time):
+    """
+    Bits covering start..end as (same day, next day) masks.
+    An end before the start runs past midnight, like Shift.hours.
+    """
+    first = _slot(start_time)
+    if end_time < start_time:
+        last_next = _slot(end_time, round_up=True)
+        return FULL_MASK ^ ((1 << first) - 1), (1 << last_next) - 1
+    last = _slot(end_time, round_up=True)
+    return ((1 << last) - 1) ^ ((1 << first) - 1), 0
+
+
+def windows_mask(windows):
+    """Day mask for [(start, end), ...]; an end of 00:00 means midnight at the end of the day."""
+    mask = 0
+    for start_time, end_time in windows:
+        mask |= window_mask(start_time, end_time)[0]
+    return mask
+
+
+def mask_windows(mask):
+    """[(start, end), ...] times for the runs of set bits in a day mask; 24:00 is returned as 00:00."""
+    windows, slot = [], 0
+    while slot < SLOTS_PER_DAY:
+        if mask >> slot & 1:
+            end = slot
+            while end < SLOTS_PER_DAY and mask >> end & 1:
+                end += 1
+            windows.append((_time(slot), _time(end)))
+            slot = end
+        else:
+            slot += 1
+    return windows
+
+
+def _time(slot):
+    minutes = slot * SLOT_MINUTES % (24 * 60)
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def _split(mask):
+    return mask & LOW_BITS, mask >> 64
+
+
+class AvailabilityIndex:
+    """
+    Availability of every employee that holds a job, as uint64 array pairs per weekday,
+    so "who is free and qualified" is a handful of vectorized bitwise operations.
+    """
+
+    def __init__(self, profile_ids, location_ids, masks, jobs):
+        self.profile_ids = profile_ids  # int64 (n,)
+        self.location_ids = location_ids  # int64 (n,), 0 for no location
+        self.low, self.high = masks  # uint64 (7, n) each: bits 0-63 and 64-95 of the day mask
+        self.jobs = jobs  # {job_id: bool (n,)}
+        self.row = {int(profile_id): i for i, profile_id in enumerate(profile_ids)}
+
+    def _covers(self, weekday, mask):
+        low, high = _split(mask)
+        low, high = np.uint64(low), np.uint64(high)
+        return ((self.low[weekday] & low) == low) & ((self.high[weekday] & high) == high)
+
+    def free(self, weekday, start_time, end_time, job_id=None, location_id=None):
+        """Profile ids available for the whole window (and qualified for job / based at location)."""
+        today, tomorrow = window_mask(start_time, end_time)
+        matches = self._covers(weekday, today)
+        if tomorrow:
+            matches &= self._covers((weekday + 1) % 7, tomorrow)
+        if job_id is not None:
+            matches &= self.jobs.get(job_id, np.zeros_like(matches))
+        if location_id is not None:
+            matches &= self.location_ids == location_id
+        return self.profile_ids[matches]
+
+
+def build_availability_index():
+    """Two queries: who holds which job where, and the availability rows that exist."""
+    holdings = list(EmployeeJob.objects.values_list('profile_id', 'job_id', 'profile__location_id').order_by())
+    profile_ids = sorted({profile_id for profile_id, _, _ in holdings})
+    row = {profile_id: i for i, profile_id in enumerate(profile_ids)}
+
+    locations = np.zeros(len(profile_ids), dtype=np.int64)
+    jobs = {}
+    for profile_id, job_id, location_id in holdings:
+        locations[row[profile_id]] = location_id or 0
+        jobs.setdefault(job_id, np.zeros(len(profile_ids), dtype=bool))[row[profile_id]] = True
+
+    low_full, high_full = _split(FULL_MASK)
+    low = np.full((7, len(profile_ids)), low_full, dtype=np.uint64)
+    high = np.full((7, len(profile_ids)), high_full, dtype=np.uint64)
+    rows = Availability.objects.filter(profile_id__in=profile_ids).values_list('profile_id', *Availability.WEEKDAYS)
+    for profile_id, *days in rows:
+        for weekday, value in enumerate(days):
+            low[weekday, row[profile_id]], high[weekday, row[profile_id]] = _split(
+                int.from_bytes(bytes(value), 'little')
+            )
+
+    return AvailabilityIndex(np.array(profile_ids, dtype=np.int64), locations, (low, high), jobs)
+
+
+# -------------------------------
+# Caching
+# -------------------------------
+def _generation():
+    return cache.get_or_set('scheduling:availability:generation', time.time_ns, None)
+
+
+def get_availability_index():
+    key = f"scheduling:availability:{_generation()}"
+    index = cache.get(key)
+    if index is None:
+        index = build_availability_index()
+        cache.set(key, index, AVAILABILITY_TIMEOUT)
+    return index
+
+
+def invalidate_availability():
+    cache.set('scheduling:availability:generation', time.time_ns(), None)
+
+
+# -------------------------------
+# Fill-ins
+# -------------------------------
+def suggest_fill_ins(date, start_time, end_time, job_id, location_id=None, exclude_profile_ids=(), limit=10):
+    """
+    Employees who could cover a shift: available, holding the job, based at the location
+    and without an overlapping shift or a short rest around it. The fewest scheduled
+    hours that week come first; anyone who would go over Profile.max_weekly_hours is last.
+    """
+    index = get_availability_index()
+    profile_ids = set(index.free(date.weekday(), start_time, end_time, job_id, location_id).tolist())
+    profile_ids.difference_update(exclude_profile_ids)
+    if not profile_ids:
+        return []
+
+    start = week_start(date)
+    shifts = Shift.objects.filter(
+        employee_job__profile_id__in=profile_ids,
+        day__date__range=(min(start, date - datetime.timedelta(days=1)),
+                          max(start + datetime.timedelta(days=6), date + datetime.timedelta(days=1))),
+        start_time__isnull=False, end_time__isnull=False,
+    ).with_hours().values_list('id', 'employee_job__profile_id', 'day__date', 'start_time', 'end_time', 'duration')
+
+    intervals, week_hours = [], dict.fromkeys(profile_ids, 0.0)
+    for shift_id, profile_id, day, shift_start, shift_end, duration in shifts:
+        intervals.append((shift_id, profile_id, *shift_interval(day, shift_start, shift_end)))
+        if start <= day <= start + datetime.timedelta(days=6):
+            week_hours[profile_id] += duration.total_seconds() / 3600
+    # The proposed shift gets a negative id per profile so its conflicts are easy to pick out
+    proposed = shift_interval(date, start_time, end_time)
+    intervals.extend((-profile_id, profile_id, *proposed) for profile_id in profile_ids)
+    busy = {conflict['profile_id'] for conflict in find_conflicts(intervals)
+            if any(shift_id < 0 for shift_id in conflict['shift_ids'])}
+    hours = (proposed[1] - proposed[0]).total_seconds() / 3600
+
+    suggestions = []
+    candidates = EmployeeJob.objects.filter(job_id=job_id, profile_id__in=profile_ids - busy).values_list(
+        'id', 'profile_id', 'pay_rate', 'profile__user__username', 'profile__user__first_name',
+        'profile__user__last_name', 'profile__max_weekly_hours',
+    )
+    for employee_job_id, profile_id, pay_rate, username, first_name, last_name, cap in candidates:
+        suggestions.append({
+            'employee_job_id': employee_job_id,
+            'profile_id': profile_id,
+            'name': f"{first_name} {last_name}".strip() or username,
+            'pay_rate': pay_rate or 0,
+            'week_hours': round(week_hours[profile_id], 2),
+            'over_cap': week_hours[profile_id] + hours > cap,
+        })
+    suggestions.sort(key=lambda s: (s['over_cap'], s['week_hours'], s['pay_rate'], s['profile_id']))
+    return suggestions[:limit]
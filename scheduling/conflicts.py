@@ -0,0 +1,124 @@
+import datetime
+import heapq
+
+from django.conf import settings
+
+from .models import Shift
+
+OVERLAP = 'overlap'
+REST = 'rest'
+
+
+def min_rest_hours():
+    return settings.SCHEDULING_MIN_REST_HOURS
+
+
+def shift_interval(date, start_time, end_time):
+    """(start, end) datetimes for a shift; an end before the start runs past midnight, like Shift.hours."""
+    start = datetime.datetime.combine(date, start_time)
+    end = datetime.datetime.combine(date, end_time)
+    if end < start:
+        end += datetime.timedelta(days=1)
+    return start, end
+
+
+def _conflict(kind, profile_id, employee, first, second, window_start, window_end):
+    hours = round((window_end - window_start).total_seconds() / 3600, 2)
+    when = f"{window_start:%a %b %d %H:%M}"
+    if kind == OVERLAP:
+        message = f"{employee}: shifts {first} and {second} overlap by {hours} hours from {when}."
+    else:
+        message = f"{employee}: only {hours} hours of rest between shifts {first} and {second} ({when})."
+    return {
+        'type': kind,
+        'profile_id': profile_id,
+        'employee': employee,
+        'shift_ids': [first, second],
+        'start': window_start,
+        'end': window_end,
+        'hours': hours,
+        'message': message,
+    }
+
+
+def find_conflicts(intervals, rest_hours=None, names=None):
+    """
+    Double bookings and short rest periods among (shift_id, profile_id, start, end) tuples.
+    `names` optionally maps profile ids to the name used in messages.
+
+    Each employee's shifts are sorted by start and swept once while a heap holds the
+    shifts still running, so the cost is O(n log n) plus one entry per conflict found.
+    """
+    rest = datetime.timedelta(hours=min_rest_hours() if rest_hours is None else rest_hours)
+    by_profile = {}
+    for shift_id, profile_id, start, end in intervals:
+        if profile_id is not None:
+            by_profile.setdefault(profile_id, []).append((start, end, shift_id))
+
+    names = names or {}
+    conflicts = []
+    for profile_id, shifts in by_profile.items():
+        employee = names.get(profile_id, f"Profile {profile_id}")
+        shifts.sort()
+        running = []  # heap of (end, shift_id) for shifts that started earlier
+        last_end, last_id = None, None
+        for start, end, shift_id in shifts:
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+            if running:
+                for other_end, other_id in sorted(running):
+                    conflicts.append(_conflict(OVERLAP, profile_id, employee, other_id, shift_id,
+                                               start, min(end, other_end)))
+            elif last_end is not None and start - last_end < rest:
+                conflicts.append(_conflict(REST, profile_id, employee, last_id, shift_id, last_end, start))
+            heapq.heappush(running, (end, shift_id))
+            if last_end is None or end >= last_end:
+                last_end, last_id = end, shift_id
+    return conflicts
+
+
+def _intervals(shifts):
+    """(intervals, {profile_id: username}) for the shifts that have an employee and both times."""
+    rows = shifts.filter(
+        employee_job__isnull=False, start_time__isnull=False, end_time__isnull=False,
+    ).values_list('id', 'employee_job__profile_id', 'employee_job__profile__user__username',
+                  'day__date', 'start_time', 'end_time')
+    intervals, names = [], {}
+    for shift_id, profile_id, username, date, start_time, end_time in rows:
+        intervals.append((shift_id, profile_id, *shift_interval(date, start_time, end_time)))
+        names[profile_id] = username
+    return intervals, names
+
+
+def week_conflicts(start, location_id=None):
+    """
+    Every conflict touching the week that starts on `start`, in one query.
+    A day either side is loaded so overnight shifts and rest across the week boundary count.
+    """
+    end = start + datetime.timedelta(days=6)
+    shifts = Shift.objects.filter(day__date__range=(start - datetime.timedelta(days=1),
+                                                     end + datetime.timedelta(days=1)))
+    if location_id:
+        shifts = shifts.filter(employee_job__profile__location_id=location_id)
+    intervals, names = _intervals(shifts)
+    in_week = {shift_id for shift_id, _, shift_start, _ in intervals if start <= shift_start.date() <= end}
+    return [conflict for conflict in find_conflicts(intervals, names=names)
+            if in_week.intersection(conflict['shift_ids'])]
+
+
+def shift_conflicts(shift):
+    """Conflicts an (unsaved or edited) shift would have with the employee's other shifts."""
+    if not shift.employee_job_id or not shift.day_id or shift.start_time is None or shift.end_time is None:
+        return []
+    date = shift.day.date
+    others = Shift.objects.filter(
+        employee_job__profile_id=shift.employee_job.profile_id,
+        day__date__range=(date - datetime.timedelta(days=1), date + datetime.timedelta(days=1)),
+    ).exclude(pk=shift.pk)
+    # A placeholder id keeps unsaved shifts apart from stored ones
+    shift_id = shift.pk or 0
+    profile_id = shift.employee_job.profile_id
+    intervals, names = _intervals(others)
+    intervals.append((shift_id, profile_id, *shift_interval(date, shift.start_time, shift.end_time)))
+    names.setdefault(profile_id, shift.employee_job.profile.user.username)
+    return [conflict for conflict in find_conflicts(intervals, names=names) if shift_id in conflict['shift_ids']]
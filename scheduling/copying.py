@@ -0,0 +1,156 @@
+import datetime
+
+from django.db import transaction
+
+from .conflicts import week_conflicts
+from .feeds import invalidate_feeds_for_jobs
+from .labor import invalidate_labor
+from .models import ScheduleDay, ScheduleTemplate, ScheduleTemplateShift, Shift, SyncSequence
+from .signals import schedule_bulk_changed
+from .weekly import week_start
+
+
+class CopyError(ValueError):
+    pass
+
+
+def ensure_days(keys):
+    """
+    ({(date, location_id): ScheduleDay id} for every key, number of days created).
+    Missing days are added with one bulk insert. Call inside the transaction that uses them.
+    """
+    keys = set(keys)
+    dates = {date for date, _ in keys}
+    if not dates:
+        return {}, 0
+
+    def existing():
+        days = ScheduleDay.objects.filter(date__range=(min(dates), max(dates)))
+        return {(date, location_id): day_id
+                for day_id, date, location_id in days.values_list('id', 'date', 'location_id')
+                if (date, location_id) in keys}
+
+    days = existing()
+    missing = keys - set(days)
+    if missing:
+        sequence = SyncSequence.take()
+        ScheduleDay.objects.bulk_create(ScheduleDay(date=date, location_id=location_id, sync_seq=sequence)
+                                        for date, location_id in missing)
+        # Re-read instead of relying on returned ids so every backend behaves the same
+        days = existing()
+    return days, len(missing)
+
+
+def _finish(shifts, days, dates, location_id, skipped, days_created):
+    sequence = SyncSequence.take()
+    for shift in shifts:
+        shift.sync_seq = sequence
+    Shift.objects.bulk_create(shifts)
+    # bulk_create skips the Shift signals, so invalidate the labor cache and calendar feeds explicitly
+    invalidate_labor(dates)
+    day_dates = {day_id: date for (date, _), day_id in days.items()}
+    invalidate_feeds_for_jobs((shift.employee_job_id, day_dates[shift.day_id]) for shift in shifts)
+    schedule_bulk_changed.send(sender=Shift, days=days.keys())
+    conflicts = []
+    for start in sorted({week_start(date) for date in dates}):
+        conflicts.extend(week_conflicts(start, location_id))
+    return {
+        'days_created': days_created,
+        'shifts_created': len(shifts),
+        'skipped': skipped,
+        'conflicts': conflicts,
+    }
+
+
+def _check_empty(start, end, location_id):
+    shifts = Shift.objects.filter(day__date__range=(start, end))
+    if location_id:
+        shifts = shifts.at_location(location_id)
+    if shifts.exists():
+        raise CopyError(f"{start} to {end} already has shifts; pass allow_existing to add to them.")
+
+
+def copy_week(source, target, location_id=None, allow_existing=False):
+    """
+    Copy every shift of the week containing `source` to the week containing `target`,
+    onto ScheduleDays with the same location (created when missing). Shifts whose
+    EmployeeJob no longer exists are skipped. Returns counts and the conflicts found
+    in the target week. A handful of queries however many shifts are copied.
+    """
+    source, target = week_start(source), week_start(target)
+    if source == target:
+        raise CopyError("Source and target are the same week.")
+    offset = target - source
+
+    with transaction.atomic():
+        if not allow_existing:
+            _check_empty(target, target + datetime.timedelta(days=6), location_id)
+        shifts = Shift.objects.filter(day__date__range=(source, source + datetime.timedelta(days=6)))
+        if location_id:
+            shifts = shifts.at_location(location_id)
+        rows = list(shifts.values_list('day__date', 'day__location_id', 'employee_job_id', 'shift_type',
+                                       'section_number', 'start_time', 'end_time').order_by('id'))
+        copies = [row for row in rows if row[2] is not None]
+
+        days, days_created = ensure_days((date + offset, day_location) for date, day_location, *_ in copies)
+        new_shifts = [
+            Shift(day_id=days[(date + offset, day_location)], employee_job_id=employee_job_id,
+                  shift_type=shift_type, section_number=section_number, start_time=start_time, end_time=end_time)
+            for date, day_location, employee_job_id, shift_type, section_number, start_time, end_time in copies
+        ]
+        return _finish(new_shifts, days, [target], location_id, len(rows) - len(copies), days_created)
+
+
+def save_template(name, week, location_id=None, created_by=None):
+    """Store the week containing `week` as a template (assigned shifts only)."""
+    start = week_start(week)
+    with transaction.atomic():
+        template = ScheduleTemplate.objects.create(name=name, location_id=location_id, created_by=created_by)
+        shifts = Shift.objects.filter(day__date__range=(start, start + datetime.timedelta(days=6)),
+                                      employee_job__isnull=False)
+        if location_id:
+            shifts = shifts.at_location(location_id)
+        ScheduleTemplateShift.objects.bulk_create(
+            ScheduleTemplateShift(template=template, weekday=date.weekday(), employee_job_id=employee_job_id,
+                                  shift_type=shift_type, section_number=section_number,
+                                  start_time=start_time, end_time=end_time)
+            for date, employee_job_id, shift_type, section_number, start_time, end_time in shifts.values_list(
+                'day__date', 'employee_job_id', 'shift_type', 'section_number', 'start_time', 'end_time',
+            ).order_by('id')
+            if start_time is not None and end_time is not None
+        )
+    return template
+
+
+def apply_template(template, start, end, allow_existing=False):
+    """
+    Create the template's shifts on every date from start to end (inclusive), matching
+    weekdays, on days at the template's location. Template shifts whose EmployeeJob
+    was deleted are skipped (and counted once each).
+    """
+    if end < start:
+        raise CopyError("end must not be before start.")
+    dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+
+    with transaction.atomic():
+        if not allow_existing:
+            _check_empty(start, end, template.location_id)
+        rows = list(template.shifts.values_list('weekday', 'employee_job_id', 'shift_type', 'section_number',
+                                                'start_time', 'end_time').order_by('id'))
+        by_weekday = {}
+        skipped = 0
+        for weekday, *shift in rows:
+            if shift[0] is None:
+                skipped += 1
+            else:
+                by_weekday.setdefault(weekday, []).append(shift)
+
+        used = [date for date in dates if date.weekday() in by_weekday]
+        days, days_created = ensure_days((date, template.location_id) for date in used)
+        new_shifts = [
+            Shift(day_id=days[(date, template.location_id)], employee_job_id=employee_job_id, shift_type=shift_type,
+                  section_number=section_number, start_time=start_time, end_time=end_time)
+            for date in used
+            for employee_job_id, shift_type, section_number, start_time, end_time in by_weekday[date.weekday()]
+        ]
+        return _finish(new_shifts, days, dates, template.location_id, skipped, days_created)
@@ -0,0 +1,156 @@
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import EmployeeJob
+from .models import ScheduleFeed, Shift
+from .weekly import week_start
+
+WEEKS_BACK = 4
+WEEKS_AHEAD = 12
+FEED_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def feed_window(today=None):
+    """Monday of every week the feed covers."""
+    first = week_start(today or timezone.localdate()) - datetime.timedelta(weeks=WEEKS_BACK)
+    return [first + datetime.timedelta(weeks=i) for i in range(WEEKS_BACK + WEEKS_AHEAD + 1)]
+
+
+# -------------------------------
+# iCalendar text
+# -------------------------------
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces, as RFC 5545 requires."""
+    data = line.encode()
+    if len(data) <= 75:
+        return line
+    pieces, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Never cut a multi-byte character in half
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        pieces.append(data[start:end].decode())
+        start, limit = end, 74
+    return '\r\n '.join(pieces)
+
+
+def _utc(moment):
+    return timezone.make_aware(moment).astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_event(shift_id, date, start_time, end_time, job, shift_type, location, stamp):
+    start = datetime.datetime.combine(date, start_time)
+    end = datetime.datetime.combine(date, end_time)
+    if end < start:
+        end += datetime.timedelta(days=1)
+    summary = f"{job} ({shift_type})" if shift_type else job
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:shift-{shift_id}@scheduling',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{_utc(start)}',
+        f'DTEND:{_utc(end)}',
+        f'SUMMARY:{_escape(summary)}',
+    ]
+    if location:
+        lines.append(f'LOCATION:{_escape(location)}')
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
+
+
+def render_calendar(events, name="Work schedule"):
+    return (
+        'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//mysite//Scheduling//EN\r\nCALSCALE:GREGORIAN\r\n'
+        f'{_fold("X-WR-CALNAME:" + _escape(name))}\r\n{events}END:VCALENDAR\r\n'
+    )
+
+
+# -------------------------------
+# Per-week caching
+# -------------------------------
+def _version_key(profile_id, start):
+    return f"scheduling:ics:{profile_id}:{start.isoformat()}:version"
+
+
+def _render_weeks(profile_id, weeks):
+    """{week start: VEVENT text} for the given weeks, from one query."""
+    weeks = set(weeks)
+    shifts = Shift.objects.filter(
+        employee_job__profile_id=profile_id,
+        day__date__range=(min(weeks), max(weeks) + datetime.timedelta(days=6)),
+        start_time__isnull=False, end_time__isnull=False,
+    ).with_location().values_list('id', 'day__date', 'start_time', 'end_time', 'employee_job__job__title',
+                                  'shift_type', 'location_name').order_by('day__date', 'start_time', 'id')
+    stamp = timezone.now().astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    rendered = dict.fromkeys(weeks, '')
+    for shift_id, date, start_time, end_time, job, shift_type, location in shifts:
+        week = week_start(date)
+        if week in rendered:
+            rendered[week] += render_event(shift_id, date, start_time, end_time, job, shift_type, location, stamp)
+    return rendered
+
+
+def feed_events(profile_id, weeks):
+    """
+    VEVENT text for every shift of the profile in `weeks`. Each week is cached on its own,
+    so after a change only the weeks that were touched are queried and rendered again.
+    """
+    version_keys = {week: _version_key(profile_id, week) for week in weeks}
+    versions = cache.get_many(version_keys.values())
+    new_versions = {key: time.time_ns() for key in version_keys.values() if key not in versions}
+    if new_versions:
+        cache.set_many(new_versions, None)
+        versions.update(new_versions)
+
+    event_keys = {week: f"scheduling:ics:{profile_id}:{week.isoformat()}:{versions[key]}"
+                  for week, key in version_keys.items()}
+    cached = cache.get_many(event_keys.values())
+    missing = [week for week, key in event_keys.items() if key not in cached]
+    if missing:
+        rendered = _render_weeks(profile_id, missing)
+        cache.set_many({event_keys[week]: text for week, text in rendered.items()}, FEED_TIMEOUT)
+        cached.update((event_keys[week], text) for week, text in rendered.items())
+    return ''.join(cached[event_keys[week]] for week in weeks)
+
+
+def invalidate_feeds(profile_dates):
+    """
+    Bump the feed version of each profile and forget its cached weeks.
+    `profile_dates` is an iterable of (profile_id, shift date) pairs.
+    """
+    weeks = {}
+    for profile_id, date in profile_dates:
+        if profile_id is not None and date is not None:
+            weeks.setdefault(profile_id, set()).add(week_start(date))
+    if not weeks:
+        return
+    now = time.time_ns()
+    cache.set_many({_version_key(profile_id, week): now
+                    for profile_id, starts in weeks.items() for week in starts}, None)
+    ScheduleFeed.objects.filter(profile_id__in=weeks).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def invalidate_feeds_for_jobs(employee_job_dates):
+    """invalidate_feeds for (employee_job_id, date) pairs, e.g. after a bulk_create that skipped signals."""
+    employee_job_dates = list(employee_job_dates)
+    profiles = dict(EmployeeJob.objects.filter(
+        pk__in={employee_job_id for employee_job_id, _ in employee_job_dates}
+    ).values_list('id', 'profile_id'))
+    invalidate_feeds((profiles.get(employee_job_id), date) for employee_job_id, date in employee_job_dates)
+
+
+def invalidate_feeds_for_shifts(shifts):
+    """invalidate_feeds for the shifts in the feed window, e.g. after the job or location they show is renamed."""
+    weeks = feed_window()
+    invalidate_feeds(shifts.filter(day__date__range=(weeks[0], weeks[-1] + datetime.timedelta(days=6)))
+                     .values_list('employee_job__profile_id', 'day__date'))
@@ -0,0 +1,187 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .copying import ensure_days
+from .labor import invalidate_labor
+from .models import SalesHistory, ScheduleDay, SyncSequence
+from .signals import schedule_bulk_changed
+
+# Annual seasonality as Fourier terms: smooth, and cheap enough to fit for every location at once
+HARMONICS = 3
+YEAR_DAYS = 365.2425
+# Shrinks trend, weekday and seasonal terms toward zero so short histories stay stable
+RIDGE = 2.0
+MIN_HISTORY_DAYS = 28
+HISTORY_DAYS = 2 * 365
+
+
+class ForecastError(ValueError):
+    pass
+
+
+def quarter_bounds(day):
+    """(first, last) date of the calendar quarter containing `day`."""
+    first_month = (day.month - 1) // 3 * 3 + 1
+    start = datetime.date(day.year, first_month, 1)
+    end = (datetime.date(day.year + (first_month + 3 > 12), (first_month + 2) % 12 + 1, 1)
+           - datetime.timedelta(days=1))
+    return start, end
+
+
+def design_matrix(ordinals, origin):
+    """
+    Columns for log(sales): intercept, linear trend (in years since `origin`), six weekday
+    offsets from Monday and HARMONICS sine/cosine pairs of the day of the year.
+    """
+    ordinals = np.asarray(ordinals, dtype=np.float64)
+    columns = [np.ones_like(ordinals), (ordinals - origin) / YEAR_DAYS]
+    # date.toordinal() of a Monday leaves a remainder of 1 when divided by 7
+    weekday = (ordinals.astype(np.int64) - 1) % 7
+    columns.extend((weekday == day).astype(np.float64) for day in range(1, 7))
+    angle = 2 * np.pi * ordinals / YEAR_DAYS
+    for k in range(1, HARMONICS + 1):
+        columns.extend((np.sin(k * angle), np.cos(k * angle)))
+    return np.column_stack(columns)
+
+
+class SalesForecast:
+    """Fitted coefficients for many locations; `predict` is one matrix product."""
+
+    def __init__(self, location_ids, origin, coef, smear):
+        self.location_ids = location_ids  # int64 (L,)
+        self.origin = origin  # ordinal the trend is measured from
+        self.coef = coef  # (L, p), NaN rows for locations with too little history
+        self.smear = smear  # (L,) mean of exp(residual): undoes the log transform's low bias
+
+    @property
+    def fitted(self):
+        return ~np.isnan(self.coef[:, 0])
+
+    def predict(self, dates):
+        """(L, len(dates)) expected sales; NaN for locations that could not be fitted."""
+        X = design_matrix([date.toordinal() for date in dates], self.origin)
+        return np.exp(self.coef @ X.T) * self.smear[:, None]
+
+
+def fit_forecast(location_ids, dates, sales, ridge=RIDGE):
+    """
+    Fit log(sales) = trend + weekday + annual season per location by ridge least squares.
+
+    `sales` is an (L, T) array over consecutive `dates` with NaN where nothing was recorded;
+    days with no sales (closed) are left out too. Every location is solved in one batched
+    call: the normal equations are built with einsum against the shared design matrix.
+    """
+    ordinals = np.array([date.toordinal() for date in dates])
+    origin = float(ordinals[-1])
+    X = design_matrix(ordinals, origin)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.log(np.where(sales > 0, sales, np.nan))
+    observed = ~np.isnan(y)
+    weights = observed.astype(np.float64)
+    y = np.where(observed, y, 0.0)
+
+    penalty = np.full((len(sales), X.shape[1]), float(ridge))
+    penalty[:, 0] = 1e-9
+    # Under a year of history the annual terms would only be guessing: pin them to zero
+    penalty[observed.sum(axis=1) < 365, -2 * HARMONICS:] = 1e9
+    gram = np.einsum('lt,tp,tq->lpq', weights, X, X)
+    gram[:, np.arange(X.shape[1]), np.arange(X.shape[1])] += penalty
+    coef = np.linalg.solve(gram, ((y * weights) @ X)[..., None])[..., 0]
+
+    residual = np.where(observed, y - coef @ X.T, np.nan)
+    with np.errstate(invalid='ignore'):
+        smear = np.nanmean(np.exp(residual), axis=1)
+    too_short = observed.sum(axis=1) < MIN_HISTORY_DAYS
+    coef[too_short] = np.nan
+    smear[too_short] = np.nan
+    return SalesForecast(np.asarray(location_ids, dtype=np.int64), origin, coef, smear)
+
+
+def load_history(start, end, location_ids=None):
+    """(location ids, dates, (L, T) sales with NaN gaps) from one query."""
+    rows = SalesHistory.objects.filter(date__range=(start, end))
+    if location_ids:
+        rows = rows.filter(location_id__in=location_ids)
+    rows = list(rows.values_list('location_id', 'date', 'sales').order_by())
+    dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    ids = np.array(sorted({location_id for location_id, _, _ in rows}), dtype=np.int64)
+    sales = np.full((len(ids), len(dates)), np.nan)
+    if rows:
+        location_index = np.searchsorted(ids, [location_id for location_id, _, _ in rows])
+        day_index = np.array([(date - start).days for _, date, _ in rows])
+        sales[location_index, day_index] = [float(amount) for _, _, amount in rows]
+    return ids, dates, sales
+
+
+def forecast_sales(start, end, location_ids=None, history_days=HISTORY_DAYS, overwrite=False):
+    """
+    Fill ScheduleDay.projected_sales for every date from start to end at each location
+    with sales history, fitted on the `history_days` before `start`. Missing days are
+    created; days that already have a projection keep it unless `overwrite`.
+    A fixed handful of queries however many locations and days there are.
+    """
+    if end < start:
+        raise ForecastError("end must not be before start.")
+    ids, history, sales = load_history(start - datetime.timedelta(days=history_days),
+                                       start - datetime.timedelta(days=1), location_ids)
+    if not len(ids):
+        raise ForecastError("There is no sales history before the forecast period.")
+    forecast = fit_forecast(ids, history, sales)
+
+    dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    predicted = np.round(forecast.predict(dates), 2)
+    fitted = forecast.fitted
+    projections = {
+        (date, int(location_id)): Decimal(f"{amount:.2f}")
+        for location_id, row in zip(ids[fitted], predicted[fitted])
+        for date, amount in zip(dates, row)
+    }
+
+    with transaction.atomic():
+        days, days_created = ensure_days(projections)
+        current = ScheduleDay.objects.filter(date__range=(start, end), location_id__in=ids[fitted].tolist())
+        current = dict(current.values_list('id', 'projected_sales'))
+        # bulk_update skips save(), and delta sync clients need to see the new projections
+        now, sequence = timezone.now(), SyncSequence.take()
+        updates = [
+            ScheduleDay(pk=days[key], projected_sales=amount, updated_at=now, sync_seq=sequence)
+            for key, amount in projections.items()
+            if overwrite or not current.get(days[key])
+        ]
+        ScheduleDay.objects.bulk_update(updates, ['projected_sales', 'updated_at', 'sync_seq'], batch_size=500)
+    # bulk_update skips the ScheduleDay signals, and projected sales feed the labor plan
+    invalidate_labor(dates)
+    schedule_bulk_changed.send(sender=ScheduleDay, days=projections.keys())
+    return {
+        'locations': int(fitted.sum()),
+        'days_created': days_created,
+        'days_updated': len(updates),
+        'skipped_locations': ids[~fitted].tolist(),
+    }
+
+
+# -------------------------------
+# Scoring
+# -------------------------------
+def score_forecast(actual, predicted):
+    """
+    Error of `predicted` against `actual` (both (L, D), NaN where unknown): weighted absolute
+    percentage error overall and per location, MAPE over days with sales, and bias.
+    """
+    known = ~np.isnan(actual) & ~np.isnan(predicted) & (np.nan_to_num(actual) > 0)
+    actual = np.where(known, actual, 0.0)
+    error = np.where(known, predicted - actual, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_location = np.abs(error).sum(axis=1) / actual.sum(axis=1)
+        return {
+            'days': int(known.sum()),
+            'wape': float(np.abs(error).sum() / actual.sum()) if known.any() else None,
+            'mape': float(np.mean(np.abs(error[known]) / actual[known])) if known.any() else None,
+            'bias': float(error.sum() / actual.sum()) if known.any() else None,
+            'per_location': per_location,
+        }
@@ -0,0 +1,64 @@
+from django.db.models import Count, Sum
+from django.utils.dateparse import parse_date
+
+from .models import Shift
+
+# group name -> (output keys, ORM paths), all grouped by the database in one query
+HOURS_GROUPS = {
+    'employee': (
+        ('profile_id', 'username', 'first_name', 'last_name'),
+        ('employee_job__profile_id', 'employee_job__profile__user__username',
+         'employee_job__profile__user__first_name', 'employee_job__profile__user__last_name'),
+    ),
+    'department': (
+        ('department',),
+        ('employee_job__job__department',),
+    ),
+    'location': (
+        ('location_id', 'location'),
+        ('location_key', 'location_name'),
+    ),
+}
+
+
+class HoursFilterError(ValueError):
+    pass
+
+
+def parse_range(start, end):
+    start_date, end_date = parse_date(start or ''), parse_date(end or '')
+    if start_date is None or end_date is None:
+        raise HoursFilterError("start and end must be dates (YYYY-MM-DD).")
+    if end_date < start_date:
+        raise HoursFilterError("end must not be before start.")
+    return start_date, end_date
+
+
+def hours_by(group, start, end, location_id=None):
+    """
+    Scheduled hours per employee, department or location between two dates (inclusive).
+    Durations are summed in SQL; only the final timedelta -> hours conversion happens here.
+    """
+    if group not in HOURS_GROUPS:
+        raise HoursFilterError(f"group must be one of {', '.join(HOURS_GROUPS)}.")
+    keys, paths = HOURS_GROUPS[group]
+
+    shifts = Shift.objects.filter(day__date__range=(start, end))
+    if location_id:
+        shifts = shifts.at_location(location_id)
+    if group == 'location':
+        shifts = shifts.with_location()
+    rows = (
+        shifts.with_hours()
+        .values_list(*paths)
+        .annotate(shift_count=Count('id'), total=Sum('duration'))
+        .order_by(*paths)
+    )
+    return [
+        {
+            **dict(zip(keys, row[:-2])),
+            'shifts': row[-2],
+            'hours': round(row[-1].total_seconds() / 3600, 2) if row[-1] else 0,
+        }
+        for row in rows
+    ]
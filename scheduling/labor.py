@@ -0,0 +1,264 @@
+import datetime
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+from accounts.models import Location
+from jobs.models import JobBase
+from .models import ScheduleDay, Shift
+from .weekly import week_start
+
+LABOR_TIMEOUT = 60 * 60
+
+# Department axis of every plan; None collects unassigned shifts and jobs without a department
+DEPARTMENTS = tuple(key for key, _ in JobBase.DEPARTMENTS) + (None,)
+DEPARTMENT_INDEX = {department: i for i, department in enumerate(DEPARTMENTS)}
+UNASSIGNED_LOCATION = (None, "Unassigned")
+
+
+def labor_percent(cost, sales):
+    """cost / sales * 100 elementwise, NaN where there are no projected sales."""
+    cost, sales = np.asarray(cost, dtype=np.float64), np.asarray(sales, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(sales > 0, cost / sales * 100, np.nan)
+
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+class LaborPlan:
+    """
+    Scheduled hours and labor cost against projected sales for a run of days.
+
+    hours and cost are float64 arrays indexed [day, location, department]; sales is
+    [day, location]. The last location column holds shifts without a location and
+    company-wide projected sales.
+    """
+
+    def __init__(self, dates, locations, hours, cost, sales, shifts):
+        self.dates = dates  # [date, ...]
+        self.locations = locations  # [(location_id, name), ..., (None, "Unassigned")]
+        self.hours = hours
+        self.cost = cost
+        self.sales = sales
+        self.shifts = shifts  # {shift_id: (day, location, department, hours, cost)}
+        self.date_index = {date: i for i, date in enumerate(dates)}
+        self.location_index = {location_id: i for i, (location_id, _) in enumerate(locations)}
+
+    def copy(self):
+        return LaborPlan(self.dates, self.locations, self.hours.copy(), self.cost.copy(),
+                         self.sales.copy(), dict(self.shifts))
+
+    # -------------------------------
+    # What-if edits
+    # -------------------------------
+    def contribution(self, shift):
+        """Array cell and (hours, cost) a Shift instance adds; it does not need to be saved."""
+        day = self.date_index.get(shift.day.date)
+        if day is None:
+            raise ValueError(f"{shift.day.date} is outside this plan.")
+        employee_job = shift.employee_job if shift.employee_job_id else None
+        location_id = shift.day.location_id or (employee_job.profile.location_id if employee_job else None)
+        if location_id not in self.location_index:
+            raise ValueError(f"Location {location_id} is not part of this plan.")
+        department = employee_job.job.department if employee_job else None
+        hours = shift.hours
+        cost = hours * ((employee_job.pay_rate or 0) if employee_job else 0)
+        return day, self.location_index[location_id], DEPARTMENT_INDEX.get(department, -1), hours, cost
+
+    def what_if(self, add=(), remove=()):
+        """
+        A new plan with unsaved Shift instances added and shift ids removed.
+        Each edit only touches one cell, so nothing is reloaded or recomputed.
+        """
+        plan = self.copy()
+        for shift_id in remove:
+            day, location, department, hours, cost = plan.shifts.pop(shift_id)
+            plan.hours[day, location, department] -= hours
+            plan.cost[day, location, department] -= cost
+        for shift in add:
+            day, location, department, hours, cost = plan.contribution(shift)
+            plan.hours[day, location, department] += hours
+            plan.cost[day, location, department] += cost
+        return plan
+
+    # -------------------------------
+    # Reporting
+    # -------------------------------
+    def days(self):
+        """Per day: totals plus a breakdown per location and department."""
+        day_cost, day_sales = self.cost.sum(axis=(1, 2)), self.sales.sum(axis=1)
+        location_cost, location_hours = self.cost.sum(axis=2), self.hours.sum(axis=2)
+        day_pct = labor_percent(day_cost, day_sales)
+        location_pct = labor_percent(location_cost, self.sales)
+        department_pct = labor_percent(self.cost, self.sales[:, :, np.newaxis])
+
+        rows = []
+        for d, date in enumerate(self.dates):
+            locations = []
+            for l, (location_id, name) in enumerate(self.locations):
+                if not location_hours[d, l] and not self.sales[d, l]:
+                    continue
+                locations.append({
+                    'location_id': location_id,
+                    'location': name,
+                    'hours': round(float(location_hours[d, l]), 2),
+                    'cost': round(float(location_cost[d, l]), 2),
+                    'sales': round(float(self.sales[d, l]), 2),
+                    'labor_pct': _number(location_pct[d, l]),
+                    'departments': {
+                        department: {
+                            'hours': round(float(self.hours[d, l, p]), 2),
+                            'cost': round(float(self.cost[d, l, p]), 2),
+                            'labor_pct': _number(department_pct[d, l, p]),
+                        }
+                        for p, department in enumerate(DEPARTMENTS) if self.hours[d, l, p]
+                    },
+                })
+            rows.append({
+                'date': date,
+                'hours': round(float(self.hours[d].sum()), 2),
+                'cost': round(float(day_cost[d]), 2),
+                'sales': round(float(day_sales[d]), 2),
+                'labor_pct': _number(day_pct[d]),
+                'locations': locations,
+            })
+        return rows
+
+    def totals(self):
+        """Totals over the whole range, overall and per location and department."""
+        location_cost, location_sales = self.cost.sum(axis=(0, 2)), self.sales.sum(axis=0)
+        department_cost = self.cost.sum(axis=(0, 1))
+        total_sales = float(self.sales.sum())
+        return {
+            'hours': round(float(self.hours.sum()), 2),
+            'cost': round(float(self.cost.sum()), 2),
+            'sales': round(total_sales, 2),
+            'labor_pct': _number(labor_percent(self.cost.sum(), total_sales)),
+            'locations': [
+                {'location_id': location_id, 'location': name,
+                 'cost': round(float(cost), 2), 'sales': round(float(sales), 2),
+                 'labor_pct': _number(labor_percent(cost, sales))}
+                for (location_id, name), cost, sales in zip(self.locations, location_cost, location_sales)
+                if cost or sales
+            ],
+            # Department labor is measured against all projected sales in the range
+            'departments': {
+                department: {'cost': round(float(cost), 2), 'labor_pct': _number(labor_percent(cost, total_sales))}
+                for department, cost in zip(DEPARTMENTS, department_cost) if cost
+            },
+        }
+
+
+def build_labor_plan(start, end, location_id=None):
+    """Build the plan for start..end (inclusive) with three queries and vectorized sums."""
+    dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    date_index = {date: i for i, date in enumerate(dates)}
+
+    locations = Location.objects.order_by('name')
+    if location_id:
+        locations = locations.filter(pk=location_id)
+    locations = list(locations.values_list('id', 'name')) + [UNASSIGNED_LOCATION]
+    location_index = {location: i for i, (location, _) in enumerate(locations)}
+
+    shifts = Shift.objects.filter(day__date__range=(start, end))
+    if location_id:
+        shifts = shifts.at_location(location_id)
+    rows = list(
+        shifts.with_hours().with_location()
+        .values_list('id', 'day__date', 'location_key', 'employee_job__job__department',
+                     'duration', 'employee_job__pay_rate')
+        .order_by()
+    )
+
+    shape = (len(dates), len(locations), len(DEPARTMENTS))
+    hours, cost = np.zeros(shape), np.zeros(shape)
+    contributions = {}
+    if rows:
+        ids, days, location_keys, departments, durations, rates = zip(*rows)
+        cell = (
+            np.array([date_index[day] for day in days]),
+            np.array([location_index.get(location, -1) for location in location_keys]),
+            np.array([DEPARTMENT_INDEX.get(department, -1) for department in departments]),
+        )
+        shift_hours = np.array([d.total_seconds() if d is not None else 0 for d in durations]) / 3600
+        shift_cost = shift_hours * np.array([rate or 0 for rate in rates], dtype=np.float64)
+        np.add.at(hours, cell, shift_hours)
+        np.add.at(cost, cell, shift_cost)
+        contributions = dict(zip(ids, zip(*(c.tolist() for c in cell), shift_hours.tolist(), shift_cost.tolist())))
+
+    sales = np.zeros(shape[:2])
+    schedule_days = ScheduleDay.objects.filter(date__range=(start, end))
+    for date, day_location, projected in schedule_days.values_list('date', 'location_id', 'projected_sales'):
+        if day_location in location_index:
+            sales[date_index[date], location_index[day_location]] += float(projected)
+
+    return LaborPlan(dates, locations, hours, cost, sales, contributions)
+
+
+# -------------------------------
+# Caching
+# -------------------------------
+def _generation():
+    return cache.get_or_set('scheduling:labor:generation', time.time_ns, None)
+
+
+def _week_version(start):
+    return cache.get_or_set(f"scheduling:labor:week:{start.isoformat()}", time.time_ns, None)
+
+
+def labor_cache_key(start, location_id=None):
+    return f"scheduling:labor:{_generation()}:{start.isoformat()}:v{_week_version(start)}:{location_id or 'all'}"
+
+
+def get_week_labor(day, location_id=None):
+    """The plan for the Monday-Sunday week containing `day`, cached until that week changes."""
+    start = week_start(day)
+    key = labor_cache_key(start, location_id)
+    plan = cache.get(key)
+    if plan is None:
+        plan = build_labor_plan(start, start + datetime.timedelta(days=6), location_id)
+        cache.set(key, plan, LABOR_TIMEOUT)
+    return plan
+
+
+def get_labor_plan(start, end, location_id=None):
+    """Any date range, assembled from the cached weeks it overlaps."""
+    weeks = []
+    day = week_start(start)
+    while day <= end:
+        weeks.append(get_week_labor(day, location_id))
+        day += datetime.timedelta(days=7)
+    if any(plan.locations != weeks[0].locations for plan in weeks):
+        return build_labor_plan(start, end, location_id)  # a location was added between builds
+
+    first = weeks[0].date_index[start]
+    last = first + (end - start).days + 1
+    contributions = {}
+    offset = 0
+    for plan in weeks:
+        for shift_id, (d, l, p, h, c) in plan.shifts.items():
+            if first <= d + offset < last:
+                contributions[shift_id] = (d + offset - first, l, p, h, c)
+        offset += len(plan.dates)
+    return LaborPlan(
+        [date for plan in weeks for date in plan.dates][first:last],
+        weeks[0].locations,
+        np.concatenate([plan.hours for plan in weeks])[first:last],
+        np.concatenate([plan.cost for plan in weeks])[first:last],
+        np.concatenate([plan.sales for plan in weeks])[first:last],
+        contributions,
+    )
+
+
+def invalidate_labor(dates):
+    """Move every week touching `dates` to a new cache key."""
+    for start in {week_start(date) for date in dates if date}:
+        cache.set(f"scheduling:labor:week:{start.isoformat()}", time.time_ns(), None)
+
+
+def invalidate_all_labor():
+    """Pay rates, jobs and locations affect every week."""
+    cache.set('scheduling:labor:generation', time.time_ns(), None)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from scheduling.copying import CopyError, apply_template
+from scheduling.models import ScheduleTemplate
+from .copy_schedule_week import report
+
+
+class Command(BaseCommand):
+    help = "Create a schedule template's shifts on every matching weekday in a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('template', type=int, help="ScheduleTemplate id.")
+        parser.add_argument('start', help="First date (YYYY-MM-DD).")
+        parser.add_argument('end', help="Last date, inclusive (YYYY-MM-DD).")
+        parser.add_argument('--allow-existing', action='store_true',
+                            help="Add to dates that already have shifts.")
+
+    def handle(self, *args, **options):
+        start, end = parse_date(options['start']), parse_date(options['end'])
+        if start is None or end is None:
+            raise CommandError("Dates must be YYYY-MM-DD.")
+        try:
+            template = ScheduleTemplate.objects.get(pk=options['template'])
+        except ScheduleTemplate.DoesNotExist:
+            raise CommandError(f"Schedule template {options['template']} does not exist.")
+
+        try:
+            result = apply_template(template, start, end, allow_existing=options['allow_existing'])
+        except CopyError as e:
+            raise CommandError(str(e))
+        report(self, result)
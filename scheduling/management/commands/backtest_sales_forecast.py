@@ -0,0 +1,81 @@
+import datetime
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from scheduling.forecast import fit_forecast, load_history, score_forecast
+
+
+def synthetic_history(locations, days, end, seed=0):
+    """Sales with a trend, a weekly pattern, a yearly season and noise, for timing without a database."""
+    rng = np.random.default_rng(seed)
+    dates = [end - datetime.timedelta(days=days - 1 - i) for i in range(days)]
+    t = np.arange(days) / 365.0
+    weekday = np.array([date.weekday() for date in dates])
+    day_of_year = np.array([date.timetuple().tm_yday for date in dates])
+    base = rng.uniform(2000, 8000, (locations, 1))
+    growth = rng.uniform(-0.05, 0.15, (locations, 1))
+    weekly = np.array([0.85, 0.8, 0.9, 0.95, 1.2, 1.35, 1.1])[weekday] * rng.uniform(0.9, 1.1, (locations, 1))
+    season = 1 + rng.uniform(0.05, 0.2, (locations, 1)) * np.sin(2 * np.pi * (day_of_year - 80) / 365.25)
+    sales = base * (1 + growth * t) * weekly * season * rng.lognormal(0, 0.08, (locations, days))
+    return np.arange(1, locations + 1), dates, sales
+
+
+def seasonal_naive(history, horizon):
+    """Each weekday's mean over the last four weeks, repeated: the baseline to beat."""
+    recent = history[:, -28:].reshape(history.shape[0], 4, 7)
+    return np.tile(np.nanmean(recent, axis=1), (1, -(-horizon // 7)))[:, :horizon]
+
+
+class Command(BaseCommand):
+    help = "Fit the sales forecast on history, score it on the days held out after it and report error and runtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history', type=int, default=365, help="Days to fit on.")
+        parser.add_argument('--holdout', type=int, default=91, help="Days after the history to score.")
+        parser.add_argument('--end', help="Last held-out day (YYYY-MM-DD; defaults to yesterday).")
+        parser.add_argument('--location', type=int, action='append', help="Only this location id (repeatable).")
+        parser.add_argument('--synthetic', type=int, metavar='LOCATIONS',
+                            help="Generate history for this many locations instead of reading SalesHistory.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        end = (datetime.date.fromisoformat(options['end']) if options['end']
+               else timezone.localdate() - datetime.timedelta(days=1))
+        total = options['history'] + options['holdout']
+
+        start = time.perf_counter()
+        if options['synthetic']:
+            ids, dates, sales = synthetic_history(options['synthetic'], total, end, options['seed'])
+        else:
+            ids, dates, sales = load_history(end - datetime.timedelta(days=total - 1), end, options['location'])
+        if not len(ids):
+            raise CommandError("No sales history in that period.")
+        loaded = time.perf_counter() - start
+
+        split = options['history']
+        start = time.perf_counter()
+        forecast = fit_forecast(ids, dates[:split], sales[:, :split])
+        fitted = time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = forecast.predict(dates[split:])
+        result = score_forecast(sales[:, split:], predicted)
+        scored = time.perf_counter() - start
+        baseline = score_forecast(sales[:, split:], seasonal_naive(sales[:, :split], options['holdout']))
+
+        def percent(value):
+            return "-" if value is None else f"{value * 100:6.2f}%"
+
+        self.stdout.write(f"{len(ids)} location(s), {split} day(s) of history, {options['holdout']} held out "
+                          f"({dates[split]} to {dates[-1]})")
+        self.stdout.write(f"   forecast: WAPE {percent(result['wape'])}  MAPE {percent(result['mape'])}  "
+                          f"bias {percent(result['bias'])}")
+        self.stdout.write(f"   baseline: WAPE {percent(baseline['wape'])}  MAPE {percent(baseline['mape'])}  "
+                          f"bias {percent(baseline['bias'])}  (same weekday, last four weeks)")
+        worst = np.nanargmax(result['per_location']) if not np.isnan(result['per_location']).all() else None
+        if worst is not None:
+            self.stdout.write(f"      worst: location {ids[worst]} at WAPE {percent(result['per_location'][worst])}")
+        self.stdout.write(f"    runtime: load {loaded * 1000:.1f} ms, fit {fitted * 1000:.1f} ms, "
+                          f"predict and score {scored * 1000:.1f} ms")
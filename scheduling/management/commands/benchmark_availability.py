@@ -0,0 +1,87 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Location, Profile
+from jobs.models import JobBase, EmployeeJob
+from scheduling.availability import build_availability_index, windows_mask
+from scheduling.models import Availability
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time 'who is free and qualified' lookups against synthetic availability bitmaps."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=5000)
+        parser.add_argument('--locations', type=int, default=10)
+        parser.add_argument('--jobs', type=int, default=8)
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        Location.objects.bulk_create(Location(name=f"Benchmark Location {i}") for i in range(options['locations']))
+        locations = list(Location.objects.filter(name__startswith="Benchmark Location"))
+        JobBase.objects.bulk_create(JobBase(title=f"Benchmark Job {i}") for i in range(options['jobs']))
+        jobs = list(JobBase.objects.filter(title__startswith="Benchmark Job"))
+
+        User.objects.bulk_create(
+            User(username=f"available-{i}", email=f"available-{i}@example.com") for i in range(options['employees'])
+        )
+        users = User.objects.filter(username__startswith="available-")
+        Profile.objects.bulk_create(Profile(user=user, location=rng.choice(locations)) for user in users)
+        profiles = list(Profile.objects.filter(user__username__startswith="available-"))
+        EmployeeJob.objects.bulk_create(
+            EmployeeJob(profile=profile, job=job) for profile in profiles for job in rng.sample(jobs, 2)
+        )
+
+        def random_day():
+            start = rng.randrange(6, 18)
+            return windows_mask([(datetime.time(start), datetime.time(min(start + rng.randrange(4, 12), 23)))]) \
+                if rng.random() < 0.8 else 0
+        availability = []
+        for profile in profiles:
+            row = Availability(profile=profile)
+            for weekday in range(7):
+                row.set_mask(weekday, random_day())
+            availability.append(row)
+        Availability.objects.bulk_create(availability)
+
+        start = time.perf_counter()
+        index = build_availability_index()
+        built = time.perf_counter() - start
+
+        lookups = [
+            (rng.randrange(7), datetime.time(rng.randrange(6, 20)), datetime.time(rng.randrange(0, 24)),
+             rng.choice(jobs).pk, rng.choice(locations).pk)
+            for _ in range(options['queries'])
+        ]
+        found = 0
+        start = time.perf_counter()
+        for weekday, window_start, window_end, job_id, location_id in lookups:
+            found += len(index.free(weekday, window_start, window_end, job_id, location_id))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"index: {len(profiles)} employees in {built * 1000:.1f} ms, "
+                          f"{(index.low.nbytes + index.high.nbytes) // 1024} KiB of masks")
+        self.stdout.write(f"free + qualified: {elapsed / len(lookups) * 1000:.3f} ms per lookup "
+                          f"({found / len(lookups):.1f} matches on average)")
@@ -0,0 +1,103 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Location, Profile
+from jobs.models import JobBase, EmployeeJob
+from scheduling.models import ScheduleDay
+from scheduling.solver import ScheduleSolver
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time the schedule generator on a synthetic week and report objective quality."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=300)
+        parser.add_argument('--locations', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--iterations', type=int)
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        locations = Location.objects.bulk_create(
+            Location(name=f"Benchmark Location {i}") for i in range(options['locations'])
+        )
+        locations = list(Location.objects.filter(name__startswith="Benchmark Location"))
+        jobs = {
+            department: JobBase.objects.create(title=f"Benchmark {department}", department=department)
+            for department in ('FOH', 'BOH', 'Management')
+        }
+
+        User.objects.bulk_create(
+            User(username=f"solver-{i}", email=f"solver-{i}@example.com") for i in range(options['employees'])
+        )
+        users = User.objects.filter(username__startswith="solver-").order_by('id')
+        Profile.objects.bulk_create(
+            Profile(user=user, location=locations[i % len(locations)], max_weekly_hours=rng.choice([24, 32, 40, 40]))
+            for i, user in enumerate(users)
+        )
+        profiles = list(Profile.objects.filter(user__username__startswith="solver-"))
+
+        # 60% front of house, 30% kitchen, 10% managers; a fifth also cross-train
+        employee_jobs = []
+        for profile in profiles:
+            department = rng.choices(['FOH', 'BOH', 'Management'], weights=[6, 3, 1])[0]
+            employee_jobs.append(EmployeeJob(profile=profile, job=jobs[department], pay_rate=rng.uniform(12, 30)))
+            if department != 'Management' and rng.random() < 0.2:
+                other = 'BOH' if department == 'FOH' else 'FOH'
+                employee_jobs.append(EmployeeJob(profile=profile, job=jobs[other], pay_rate=rng.uniform(12, 30)))
+        EmployeeJob.objects.bulk_create(employee_jobs)
+
+        start = datetime.date(2000, 1, 3)  # a Monday far away from real schedules
+        ScheduleDay.objects.bulk_create(
+            ScheduleDay(date=start + datetime.timedelta(days=d), location=location,
+                        projected_sales=rng.randint(3000, 9000))
+            for d in range(7) for location in locations
+        )
+
+        solver = ScheduleSolver(start, [location.pk for location in locations], seed=options['seed'],
+                                iterations=options['iterations'])
+        with CaptureQueriesContext(connection) as ctx:
+            began = time.perf_counter()
+            solver.load()
+            loaded = time.perf_counter()
+        solver.greedy()
+        greedy_done = time.perf_counter()
+        greedy = solver.objective()
+        solver.local_search()
+        searched = time.perf_counter()
+        final = solver.objective()
+        solver.save()
+        saved = time.perf_counter()
+
+        hours = [solver.hours[profile.pk] for profile in profiles]
+        self.stdout.write(f"{len(profiles)} employees, {len(locations)} locations, {final['slots']} slots")
+        self.stdout.write(f"load:         {(loaded - began) * 1000:.1f} ms, {len(ctx.captured_queries)} queries")
+        self.stdout.write(f"greedy:       {(greedy_done - loaded) * 1000:.1f} ms, "
+                          f"unfilled {greedy['unfilled']}, cost {greedy['cost']}, score {greedy['score']}")
+        self.stdout.write(f"local search: {(searched - greedy_done) * 1000:.1f} ms, "
+                          f"unfilled {final['unfilled']}, cost {final['cost']}, score {final['score']}")
+        self.stdout.write(f"bulk insert:  {(saved - searched) * 1000:.1f} ms")
+        self.stdout.write(f"total:        {saved - began:.2f}s, labor {final['labor_pct']}% of projected sales, "
+                          f"hours per employee {statistics.mean(hours):.1f} +/- {statistics.pstdev(hours):.1f}")
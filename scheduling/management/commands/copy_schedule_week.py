@@ -0,0 +1,42 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from scheduling.copying import CopyError, copy_week
+
+
+class Command(BaseCommand):
+    help = "Copy a week's shifts to another week, creating the ScheduleDays it needs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Any date in the week to copy (YYYY-MM-DD).")
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--to', help="Any date in the target week (YYYY-MM-DD).")
+        target.add_argument('--weeks', type=int, help="Copy this many weeks ahead (negative goes back).")
+        parser.add_argument('--location', type=int, help="Only copy shifts at this location id.")
+        parser.add_argument('--allow-existing', action='store_true',
+                            help="Add to a target week that already has shifts.")
+
+    def handle(self, *args, **options):
+        source = parse_date(options['source'])
+        target = parse_date(options['to']) if options['to'] else None
+        if source is None or (options['to'] and target is None):
+            raise CommandError("Dates must be YYYY-MM-DD.")
+        if target is None:
+            target = source + datetime.timedelta(weeks=options['weeks'])
+
+        try:
+            result = copy_week(source, target, options['location'], allow_existing=options['allow_existing'])
+        except CopyError as e:
+            raise CommandError(str(e))
+        report(self, result)
+
+
+def report(command, result):
+    command.stdout.write(command.style.SUCCESS(
+        f"Created {result['shifts_created']} shift(s) and {result['days_created']} day(s); "
+        f"skipped {result['skipped']} shift(s) without an employee."
+    ))
+    for conflict in result['conflicts']:
+        command.stdout.write(command.style.WARNING(conflict['message']))
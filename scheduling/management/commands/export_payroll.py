@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from scheduling.payroll import PayrollError, iter_payroll_csv, payroll_rows
+
+
+class Command(BaseCommand):
+    help = "Stream regular and overtime hours and pay per employee for a payroll period as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', help="First day of the period, a Monday (YYYY-MM-DD).")
+        parser.add_argument('end', help="Last day of the period, a Sunday (YYYY-MM-DD).")
+        parser.add_argument('--location', type=int, help="Location id")
+        parser.add_argument('--output', help="File to write (defaults to stdout).")
+
+    def handle(self, *args, **options):
+        start, end = parse_date(options['start']), parse_date(options['end'])
+        if start is None or end is None:
+            raise CommandError("start and end must be dates (YYYY-MM-DD).")
+        try:
+            rows = payroll_rows(start, end, options['location'])
+        except PayrollError as e:
+            raise CommandError(str(e))
+
+        chunks = iter_payroll_csv(rows)
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,42 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from scheduling.forecast import HISTORY_DAYS, ForecastError, forecast_sales, quarter_bounds
+
+
+class Command(BaseCommand):
+    help = "Fill ScheduleDay.projected_sales for a quarter from the sales history of every location."
+
+    def add_arguments(self, parser):
+        parser.add_argument('day', nargs='?',
+                            help="Any date in the quarter to forecast (YYYY-MM-DD; defaults to next quarter).")
+        parser.add_argument('--location', type=int, action='append', help="Only this location id (repeatable).")
+        parser.add_argument('--history-days', type=int, default=HISTORY_DAYS,
+                            help="Days of history before the quarter to fit on.")
+        parser.add_argument('--overwrite', action='store_true',
+                            help="Replace projections that were already entered.")
+
+    def handle(self, *args, **options):
+        if options['day']:
+            day = parse_date(options['day'])
+            if day is None:
+                raise CommandError("The date must be YYYY-MM-DD.")
+        else:
+            day = quarter_bounds(timezone.localdate())[1] + datetime.timedelta(days=1)
+        start, end = quarter_bounds(day)
+
+        try:
+            result = forecast_sales(start, end, options['location'], options['history_days'], options['overwrite'])
+        except ForecastError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast {start} to {end} for {result['locations']} location(s): "
+            f"{result['days_updated']} day(s) updated, {result['days_created']} created."
+        ))
+        if result['skipped_locations']:
+            self.stdout.write(self.style.WARNING(
+                f"Too little history to forecast location(s) {', '.join(map(str, result['skipped_locations']))}."
+            ))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from scheduling.solver import ScheduleSolver
+from scheduling.weekly import week_start
+
+
+class Command(BaseCommand):
+    help = "Generate shifts for a week from projected sales, staffing ratios and hour caps."
+
+    def add_arguments(self, parser):
+        parser.add_argument('week', help="Any date in the week to fill (YYYY-MM-DD).")
+        parser.add_argument('--location', type=int, action='append', dest='location_ids',
+                            help="Only fill the given location id (can be repeated).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int,
+                            help="Local search iterations (defaults to 20 per slot).")
+        parser.add_argument('--dry-run', action='store_true', help="Solve without writing shifts.")
+
+    def handle(self, *args, **options):
+        day = parse_date(options['week'])
+        if day is None:
+            raise CommandError("week must be a date (YYYY-MM-DD).")
+
+        start = time.perf_counter()
+        solver = ScheduleSolver(week_start(day), options['location_ids'], seed=options['seed'],
+                                iterations=options['iterations']).solve()
+        elapsed = time.perf_counter() - start
+        result = solver.objective()
+
+        if not options['dry_run']:
+            solver.save()
+        verb = "Planned" if options['dry_run'] else "Created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['filled']} of {result['slots']} shift(s) for the week of {solver.start} "
+            f"in {elapsed:.2f}s: {result['hours']} hours, cost {result['cost']}, "
+            f"labor {result['labor_pct']}%"
+        ))
+        if result['unfilled']:
+            self.stdout.write(self.style.WARNING(f"{result['unfilled']} shift(s) could not be staffed."))
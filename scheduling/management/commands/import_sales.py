@@ -0,0 +1,91 @@
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from accounts.models import Location
+from scheduling.models import SalesHistory
+
+
+def read_sales(stream):
+    """
+    One day per row with columns location (id or name), date (YYYY-MM-DD) and sales.
+    Yields (row number, location, date, sales).
+    """
+    reader = csv.DictReader(stream)
+    missing = {'location', 'date', 'sales'} - set(reader.fieldnames or ())
+    if missing:
+        raise CommandError(f"Missing column(s): {', '.join(sorted(missing))}")
+    for row_number, row in enumerate(reader, start=2):
+        date = parse_date((row['date'] or '').strip())
+        try:
+            sales = Decimal((row['sales'] or '').strip().replace(',', ''))
+        except InvalidOperation:
+            sales = None
+        if date is None or sales is None or sales < 0:
+            raise CommandError(f"Row {row_number}: needs a YYYY-MM-DD date and non-negative sales")
+        yield row_number, (row['location'] or '').strip(), date, sales.quantize(Decimal('0.01'))
+
+
+class Command(BaseCommand):
+    help = "Load daily sales per location from a CSV into SalesHistory, replacing days already loaded."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Rows buffered before each bulk write.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate the file without writing anything.")
+
+    def handle(self, *args, **options):
+        locations = {}
+        for location_id, name in Location.objects.values_list('id', 'name'):
+            locations[str(location_id)] = location_id
+            # Names that more than one location shares can only be given by id
+            locations[name] = None if name in locations else location_id
+        self.counts = {'created': 0, 'updated': 0}
+        self.dry_run = options['dry_run']
+
+        start = time.perf_counter()
+        batch = {}
+        with open(options['path'], newline='', encoding='utf-8') as stream, transaction.atomic():
+            for row_number, location, date, sales in read_sales(stream):
+                location_id = locations.get(location)
+                if location_id is None:
+                    reason = "is ambiguous, use its id" if location in locations else "does not exist"
+                    raise CommandError(f"Row {row_number}: location '{location}' {reason}")
+                # A day repeated in the file keeps its last value
+                batch[(location_id, date)] = sales
+                if len(batch) >= options['batch_size']:
+                    self.flush(batch)
+                    batch = {}
+            self.flush(batch)
+        elapsed = time.perf_counter() - start
+
+        verb = "Validated" if self.dry_run else "Loaded"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.counts['created']} new and {self.counts['updated']} replaced day(s) in {elapsed:.2f}s"
+        ))
+
+    def flush(self, batch):
+        if not batch:
+            return
+        dates = [date for _, date in batch]
+        existing = SalesHistory.objects.filter(
+            location_id__in={location_id for location_id, _ in batch}, date__range=(min(dates), max(dates)),
+        ).values_list('location_id', 'date', 'id')
+        ids = {(location_id, date): pk for location_id, date, pk in existing if (location_id, date) in batch}
+        self.counts['created'] += len(batch) - len(ids)
+        self.counts['updated'] += len(ids)
+        if self.dry_run:
+            return
+        SalesHistory.objects.bulk_update(
+            [SalesHistory(pk=pk, sales=batch[key]) for key, pk in ids.items()], ['sales'], batch_size=500,
+        )
+        SalesHistory.objects.bulk_create(
+            SalesHistory(location_id=location_id, date=date, sales=sales)
+            for (location_id, date), sales in batch.items() if (location_id, date) not in ids
+        )
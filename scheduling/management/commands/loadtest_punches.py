@@ -0,0 +1,99 @@
+import datetime
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Location, Profile
+from scheduling.models import Kiosk, TimePunch
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Send punch batches from concurrent kiosks through the ingestion endpoint and report punches per second."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kiosks', type=int, default=8)
+        parser.add_argument('--batches', type=int, default=50, help="Batches per kiosk.")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--resend', type=float, default=0.1, help="Share of batches sent a second time.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        # The kiosks run on their own threads and connections, so the data is committed and removed afterwards
+        location = Location.objects.create(name="Punch Load Test")
+        try:
+            self._run(location, options)
+        finally:
+            TimePunch.objects.filter(kiosk__location=location).delete()
+            User.objects.filter(username__startswith="punch-load-").delete()
+            location.delete()
+
+    def _run(self, location, options):
+        User.objects.bulk_create(
+            User(username=f"punch-load-{i}", email=f"punch-load-{i}@example.com") for i in range(options['employees'])
+        )
+        users = User.objects.filter(username__startswith="punch-load-")
+        Profile.objects.bulk_create(Profile(user=user, location=location) for user in users)
+        profiles = list(Profile.objects.filter(user__username__startswith="punch-load-").values_list('id', flat=True))
+        kiosks = [Kiosk.objects.create(name=f"Load {i}", location=location) for i in range(options['kiosks'])]
+
+        url = reverse('punch_ingest')
+        latencies, failures = [], []
+        lock = threading.Lock()
+        now = timezone.now()
+
+        def kiosk_worker(kiosk, seed):
+            rng = random.Random(seed)
+            client = Client()
+            sequence = 0
+            try:
+                for _ in range(options['batches']):
+                    punches = []
+                    for _ in range(options['batch_size']):
+                        sequence += 1
+                        punches.append({
+                            'sequence': sequence, 'profile': rng.choice(profiles), 'kind': rng.choice(('in', 'out')),
+                            'at': (now - datetime.timedelta(seconds=rng.randrange(86400))).isoformat(),
+                        })
+                    body = json.dumps({'punches': punches})
+                    for _ in range(2 if rng.random() < options['resend'] else 1):
+                        started = time.perf_counter()
+                        response = client.post(url, body, content_type='application/json',
+                                               HTTP_AUTHORIZATION=f"Bearer {kiosk.token}")
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            latencies.append(elapsed)
+                            if response.status_code != 200:
+                                failures.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=kiosk_worker, args=(kiosk, options['seed'] + i))
+                   for i, kiosk in enumerate(kiosks)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stored = TimePunch.objects.filter(kiosk__location=location).count()
+        expected = options['kiosks'] * options['batches'] * options['batch_size']
+        latencies.sort()
+        self.stdout.write(f"{len(latencies)} requests from {len(kiosks)} kiosks in {elapsed:.2f} s, "
+                          f"{len(failures)} failed")
+        self.stdout.write(f"{stored} of {expected} punches stored (resent batches deduplicated): "
+                          f"{stored / elapsed:.0f} punches/s")
+        self.stdout.write(f"batch latency: median {statistics.median(latencies) * 1000:.1f} ms, "
+                          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scheduling.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete schedule tombstones older than SCHEDULING_TOMBSTONE_DAYS (run daily)."
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} tombstone(s) older than {settings.SCHEDULING_TOMBSTONE_DAYS} days."
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from scheduling.copying import save_template
+
+
+class Command(BaseCommand):
+    help = "Save a week's assigned shifts as a reusable schedule template."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name')
+        parser.add_argument('week', help="Any date in the week to save (YYYY-MM-DD).")
+        parser.add_argument('--location', type=int, help="Only save shifts at this location id.")
+
+    def handle(self, *args, **options):
+        week = parse_date(options['week'])
+        if week is None:
+            raise CommandError("week must be a date (YYYY-MM-DD).")
+        template = save_template(options['name'], week, options['location'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved template {template.pk} '{template}' with {template.shifts.count()} shift(s)."
+        ))
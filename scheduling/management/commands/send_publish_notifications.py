@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from scheduling.notifications import send_pending_notifications
+
+
+class Command(BaseCommand):
+    help = "Email employees their shifts for newly published weeks, in batches over one mail connection each."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help="Emails per mail connection (defaults to SCHEDULING_NOTIFY_BATCH_SIZE).")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for due jobs instead of exiting.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            job = send_pending_notifications(options['batch_size'])
+            if job is not None:
+                self.stdout.write(f"{job.published}: {job.sent}/{job.total} sent, {job.failed} failed ({job.status})")
+                if job.connection_failed and job.status == job.PENDING:
+                    self.stdout.write(self.style.WARNING(
+                        f"Mail server error ({job.last_error}); retrying at {job.next_attempt_at:%H:%M:%S}."
+                    ))
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS("No notifications due."))
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_customuser_is_active'),
+        ('scheduling', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleday',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_days', to='accounts.location'),
+        ),
+        migrations.AlterField(
+            model_name='scheduleday',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleday',
+            constraint=models.UniqueConstraint(fields=('date', 'location'), name='scheduleday_date_location_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleday',
+            constraint=models.UniqueConstraint(condition=models.Q(('location__isnull', True)), fields=('date',), name='scheduleday_date_company_uniq'),
+        ),
+    ]
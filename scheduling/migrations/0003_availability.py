@@ -0,0 +1,33 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_max_weekly_hours'),
+        ('scheduling', '0002_scheduleday_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Availability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monday', models.BinaryField(default=b'\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff', max_length=12)),
+                ('tuesday', models.BinaryField(default=b'\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff', max_length=12)),
+                ('wednesday', models.BinaryField(default=b'\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff', max_length=12)),
+                ('thursday', models.BinaryField(default=b'\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff', max_length=12)),
+                ('friday', models.BinaryField(default=b'\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff', max_length=12)),
+                ('saturday', models.BinaryField(default=b'\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff', max_length=12)),
+                ('sunday', models.BinaryField(default=b'\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff', max_length=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='accounts.profile')),
+            ],
+            options={
+                'verbose_name_plural': 'availability',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_max_weekly_hours'),
+        ('jobs', '0003_jobbase_department'),
+        ('scheduling', '0003_availability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_schedule_templates', to='accounts.profile')),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_templates', to='accounts.location')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScheduleTemplateShift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('shift_type', models.CharField(blank=True, choices=[('AM', 'Morning'), ('MID', 'Mid'), ('PM', 'Evening')], max_length=4)),
+                ('section_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('employee_job', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='jobs.employeejob')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shifts', to='scheduling.scheduletemplate')),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_max_weekly_hours'),
+        ('scheduling', '0004_schedule_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishedSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('version', models.PositiveIntegerField()),
+                ('payload', models.TextField()),
+                ('etag', models.CharField(max_length=64)),
+                ('is_current', models.BooleanField(default=False)),
+                ('published_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='published_schedules', to='accounts.location')),
+                ('published_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='published_schedules', to='accounts.profile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='publishedschedule',
+            constraint=models.UniqueConstraint(fields=('location', 'week_start', 'version'), name='published_version_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='publishedschedule',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('location', 'week_start'), name='published_current_uniq'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import scheduling.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_max_weekly_hours'),
+        ('scheduling', '0005_published_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=scheduling.models._feed_token, max_length=64, unique=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_feed', to='accounts.profile')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_max_weekly_hours'),
+        ('scheduling', '0006_schedule_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sales', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_history', to='accounts.location')),
+            ],
+            options={
+                'verbose_name_plural': 'sales history',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='saleshistory',
+            constraint=models.UniqueConstraint(fields=('location', 'date'), name='saleshistory_location_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import scheduling.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_max_weekly_hours'),
+        ('scheduling', '0007_sales_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Kiosk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('token', models.CharField(default=scheduling.models._kiosk_token, max_length=64, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kiosks', to='accounts.location')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TimePunch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('in', 'Clock in'), ('out', 'Clock out')], max_length=3)),
+                ('punched_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('kiosk', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='punches', to='scheduling.kiosk')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punches', to='accounts.profile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='timepunch',
+            index=models.Index(fields=['punched_at', 'profile'], name='timepunch_punched_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timepunch',
+            constraint=models.UniqueConstraint(fields=('kiosk', 'sequence'), name='timepunch_kiosk_sequence_uniq'),
+        ),
+    ]
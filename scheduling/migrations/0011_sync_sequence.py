@@ -0,0 +1,45 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:09
+
+from django.db import migrations, models
+
+
+def create_sync_sequence(apps, schema_editor):
+    apps.get_model('scheduling', 'SyncSequence').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0010_publish_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='scheduleday',
+            name='sync_seq',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='scheduletombstone',
+            name='moved',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='scheduletombstone',
+            name='sync_seq',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='sync_seq',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(create_sync_sequence, migrations.RunPython.noop),
+    ]
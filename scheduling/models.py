@@ -1,16 +1,64 @@
-from django.db import models
+import datetime
+import secrets
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Case, DurationField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from accounts.models import Location
 from jobs.models import Profile, EmployeeJob
 
 User = get_user_model()
 
 # Create your models here.
-class ScheduleDay(models.Model):
-    date = models.DateField(unique=True)
+class SyncSequence(models.Model):
+    """
+    Single-row counter handing out delta sync positions. Taking a number locks the row until
+    the taking transaction ends, so numbers become visible in the order they were taken and
+    a client that has seen number n can never be handed a row below it later. Schedule
+    writers queue on the row for the rest of their transaction, so keep those short.
+    """
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def take(cls):
+        """The next number, for rows written in the current transaction."""
+        if not transaction.get_connection().in_atomic_block:
+            raise transaction.TransactionManagementError("Take sync sequence numbers inside the writing transaction.")
+        if not cls.objects.filter(pk=1).update(value=F('value') + 1):
+            cls.objects.get_or_create(pk=1)
+            cls.objects.filter(pk=1).update(value=F('value') + 1)
+        return cls.objects.values_list('value', flat=True).get(pk=1)
+
+
+class SyncedModel(models.Model):
+    """Rows served by delta sync: every save stamps the next SyncSequence number."""
+    # Bulk writes and queryset.update() skip save(), so set it from SyncSequence.take() yourself
+    sync_seq = models.BigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            self.sync_seq = SyncSequence.take()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'sync_seq'}
+            super().save(*args, **kwargs)
+
+
+class ScheduleDay(SyncedModel):
+    date = models.DateField()
+    # Days without a location are company-wide; shifts on them belong to the employee's location
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='schedule_days')
     projected_sales = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Shown to delta sync clients; bulk_update and queryset.update() don't set auto_now fields, so pass it yourself
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     created_by = models.ForeignKey(Profile,
                                    on_delete=models.SET_NULL,
@@ -18,7 +66,17 @@ class ScheduleDay(models.Model):
                                    blank=True,
                                    related_name='created_schedules'
                                    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'location'], name='scheduleday_date_location_uniq'),
+            models.UniqueConstraint(fields=['date'], condition=Q(location__isnull=True),
+                                    name='scheduleday_date_company_uniq'),
+        ]
+
     def __str__(self):
+        if self.location_id:
+            return f"Schedule for {self.date} ({self.location})"
         return f"Schedule for {self.date}"
 
 
@@ -26,7 +84,45 @@ class ScheduleDay(models.Model):
 
 schedule_day.created_by = request.user.profile
 """
-class Shift(models.Model):
+class ShiftQuerySet(models.QuerySet):
+    def with_related(self):
+        """Everything __str__, hours and the schedule pages touch, joined in the same query."""
+        return self.select_related(
+            'day__location',
+            'employee_job__job',
+            'employee_job__profile__user',
+            'employee_job__profile__location',
+        )
+
+    def with_location(self):
+        """Annotate the shift's location: the day's location, else the employee's."""
+        return self.annotate(
+            location_key=Coalesce('day__location_id', 'employee_job__profile__location_id'),
+            location_name=Coalesce('day__location__name', 'employee_job__profile__location__name'),
+        )
+
+    def at_location(self, location_id):
+        return self.filter(
+            Q(day__location_id=location_id)
+            | Q(day__location__isnull=True, employee_job__profile__location_id=location_id)
+        )
+
+    def with_hours(self):
+        """
+        Annotate `duration` (a timedelta) computed by the database, matching Shift.hours:
+        a shift whose end is before its start runs past midnight, so a day is added.
+        Shifts missing a start or end time get NULL, which Sum() skips.
+        """
+        span = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+        return self.annotate(duration=Case(
+            When(end_time__lt=F('start_time'),
+                 then=ExpressionWrapper(span + Value(datetime.timedelta(days=1)), output_field=DurationField())),
+            default=span,
+            output_field=DurationField(),
+        ))
+
+
+class Shift(SyncedModel):
     SHIFT_CHOICES = (
         ('AM','Morning'),
         ('MID','Mid'),
@@ -40,9 +136,22 @@ class Shift(models.Model):
 
     start_time = models.TimeField(null=True, blank=False)
     end_time = models.TimeField(null=True, blank=False)
+    # Shown to delta sync clients; bulk_update and queryset.update() don't set auto_now fields, so pass it yourself
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ShiftQuerySet.as_manager()
 
     def __str__(self):
-        return f"{self.employee_job.profile.user.username} - {self.shift_type} ({self.day.date})"
+        # Use Shift.objects.with_related() when listing shifts to avoid a lazy load per row
+        employee = self.employee_job.profile.user.username if self.employee_job_id else "Unassigned"
+        return f"{employee} - {self.shift_type} ({self.day.date})"
+
+    def clean(self):
+        # Imported here: scheduling.conflicts queries Shift
+        from .conflicts import shift_conflicts
+        conflicts = shift_conflicts(self)
+        if conflicts:
+            raise ValidationError([conflict['message'] for conflict in conflicts])
 
     @property
     def hours(self):
@@ -50,6 +159,8 @@ class Shift(models.Model):
         Automatically calculate the number of hours based on start/end time.
         Handles shifts that pass midnight.
         """
+        if self.start_time is None or self.end_time is None:
+            return 0
         start = timezone.datetime.combine(self.day.date, self.start_time)
         end = timezone.datetime.combine(self.day.date, self.end_time)
 
@@ -61,3 +172,251 @@ class Shift(models.Model):
         return round(delta.total_seconds() / 3600, 2)
 
 
+
+
+FULL_DAY = b'\xff' * 12  # 96 fifteen-minute slots, all available
+
+
+class Availability(models.Model):
+    """
+    When an employee can work, per weekday, as 96-bit masks of 15-minute slots
+    (bit 0 is 00:00-00:15). Employees without a row are treated as always available.
+    See scheduling.availability for building and querying the masks.
+    """
+    WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='availability')
+    monday = models.BinaryField(max_length=12, default=FULL_DAY)
+    tuesday = models.BinaryField(max_length=12, default=FULL_DAY)
+    wednesday = models.BinaryField(max_length=12, default=FULL_DAY)
+    thursday = models.BinaryField(max_length=12, default=FULL_DAY)
+    friday = models.BinaryField(max_length=12, default=FULL_DAY)
+    saturday = models.BinaryField(max_length=12, default=FULL_DAY)
+    sunday = models.BinaryField(max_length=12, default=FULL_DAY)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'availability'
+
+    def __str__(self):
+        return f"Availability for {self.profile.user.username}"
+
+    def get_mask(self, weekday):
+        return int.from_bytes(bytes(getattr(self, self.WEEKDAYS[weekday])), 'little')
+
+    def set_mask(self, weekday, mask):
+        setattr(self, self.WEEKDAYS[weekday], mask.to_bytes(12, 'little'))
+
+
+class ScheduleTemplate(models.Model):
+    """A reusable week of shifts, applied to date ranges by scheduling.copying."""
+    name = models.CharField(max_length=100)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='schedule_templates')
+    created_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='created_schedule_templates')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ScheduleTemplateShift(models.Model):
+    WEEKDAYS = tuple(enumerate(('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')))
+
+    template = models.ForeignKey(ScheduleTemplate, on_delete=models.CASCADE, related_name='shifts')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAYS)
+    employee_job = models.ForeignKey(EmployeeJob, on_delete=models.SET_NULL, null=True)
+
+    shift_type = models.CharField(max_length=4, choices=Shift.SHIFT_CHOICES, blank=True)
+    section_number = models.PositiveIntegerField(null=True, blank=True)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    def __str__(self):
+        return f"{self.template} - {self.get_weekday_display()} {self.shift_type}"
+
+
+class PublishedSchedule(models.Model):
+    """
+    A frozen, denormalized copy of one location's week, served to readers as-is.
+    Each publish adds a version; exactly one version per location and week is current.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='published_schedules')
+    week_start = models.DateField()
+    version = models.PositiveIntegerField()
+    # Serialized JSON, stored as text so it can be sent without decoding and re-encoding
+    payload = models.TextField()
+    etag = models.CharField(max_length=64)
+    is_current = models.BooleanField(default=False)
+    published_at = models.DateTimeField(default=timezone.now)
+    published_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='published_schedules')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'week_start', 'version'], name='published_version_uniq'),
+            models.UniqueConstraint(fields=['location', 'week_start'], condition=Q(is_current=True),
+                                    name='published_current_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.location} week of {self.week_start} (v{self.version})"
+
+
+def _feed_token():
+    return secrets.token_urlsafe(24)
+
+
+class ScheduleFeed(models.Model):
+    """
+    A profile's private calendar subscription. `version` goes up whenever one of the
+    profile's shifts changes, so feed requests can be answered from this row alone.
+    """
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='schedule_feed')
+    token = models.CharField(max_length=64, unique=True, default=_feed_token)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Calendar feed for {self.profile}"
+
+    def rotate_token(self):
+        self.token = _feed_token()
+        self.save(update_fields=['token'])
+
+
+class SalesHistory(models.Model):
+    """Actual daily sales per location, imported from the POS; the forecast is fitted to these."""
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='sales_history')
+    date = models.DateField()
+    sales = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name_plural = "sales history"
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'date'], name='saleshistory_location_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.location} {self.date}: {self.sales}"
+
+
+def _kiosk_token():
+    return secrets.token_urlsafe(32)
+
+
+class Kiosk(models.Model):
+    """A time clock device. It authenticates its punch uploads with `token`."""
+    name = models.CharField(max_length=100)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='kiosks')
+    token = models.CharField(max_length=64, unique=True, default=_kiosk_token)
+    is_active = models.BooleanField(default=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.location})"
+
+
+class TimePunch(models.Model):
+    """
+    One clock-in or clock-out as recorded by a kiosk. Punches reference neither Shift nor
+    ScheduleDay, so ingesting them never locks schedule rows; they are matched to shifts
+    when variance is computed.
+    """
+    IN = 'in'
+    OUT = 'out'
+    KINDS = ((IN, 'Clock in'), (OUT, 'Clock out'))
+
+    kiosk = models.ForeignKey(Kiosk, on_delete=models.PROTECT, related_name='punches')
+    # Increases per device; a batch sent twice is recognised by it
+    sequence = models.PositiveBigIntegerField()
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='punches')
+    kind = models.CharField(max_length=3, choices=KINDS)
+    punched_at = models.DateTimeField()
+    received_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kiosk', 'sequence'], name='timepunch_kiosk_sequence_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['punched_at', 'profile'], name='timepunch_punched_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.profile} {self.get_kind_display().lower()} at {self.punched_at}"
+
+
+class ScheduleTombstone(models.Model):
+    """
+    A deleted ScheduleDay or Shift, so delta sync clients learn to drop it. Pruned after a retention period.
+    A `moved` tombstone is for a row that still exists but left `location`; only that location's clients get it.
+    """
+    DAY = 'day'
+    SHIFT = 'shift'
+    KINDS = ((DAY, 'Schedule day'), (SHIFT, 'Shift'))
+
+    kind = models.CharField(max_length=5, choices=KINDS)
+    object_id = models.PositiveBigIntegerField()
+    # Location of the deleted row when it was known; tombstones without one go to every client.
+    # Kept without a constraint: a location's own deletion leaves tombstones that still name it
+    location = models.ForeignKey(Location, on_delete=models.DO_NOTHING, null=True, blank=True, related_name='+',
+                                 db_constraint=False)
+    moved = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    sync_seq = models.BigIntegerField(default=0, db_index=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} {'moved' if self.moved else 'deleted'} at {self.deleted_at}"
+
+
+class PublishNotification(models.Model):
+    """
+    Email fan-out for one published version: every scheduled employee gets their shifts.
+    Created by publish_week and sent in batches by `send_publish_notifications`.
+    """
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = ((PENDING, 'Pending'), (DONE, 'Done'), (FAILED, 'Failed'))
+
+    published = models.OneToOneField(PublishedSchedule, on_delete=models.CASCADE, related_name='notification')
+    status = models.CharField(max_length=7, choices=STATUSES, default=PENDING)
+    # Progress, kept up to date after every batch
+    total = models.PositiveIntegerField(null=True, blank=True)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # Connection-level failures: the whole job is retried later with backoff
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification for {self.published} ({self.status})"
+
+
+class NotificationDelivery(models.Model):
+    """One employee's email within a PublishNotification; retried on its own when the server rejects it."""
+    notification = models.ForeignKey(PublishNotification, on_delete=models.CASCADE, related_name='deliveries')
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='+')
+    email = models.EmailField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name_plural = "notification deliveries"
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'profile'], name='delivery_notification_profile_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({'sent' if self.sent_at else 'pending'})"
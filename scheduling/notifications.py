@@ -0,0 +1,173 @@
+import datetime
+import json
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from accounts.models import Profile
+from .models import NotificationDelivery, PublishNotification
+
+MAX_DELIVERY_ATTEMPTS = 3
+MAX_JOB_ATTEMPTS = 5
+# How long a worker holds a job while sending a batch; a crashed worker's job is picked up after this
+CLAIM_SECONDS = 600
+# Doubled after each failed connection attempt
+RETRY_SECONDS = 60
+# The server refused this one message; the connection is still good for the rest of the batch
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+# -------------------------------
+# Rendering
+# -------------------------------
+def employee_shifts(payload):
+    """{profile_id: [shift, ...]} from a decoded published snapshot, in one pass and without queries."""
+    shifts = {}
+    for day in payload['days']:
+        date = parse_date(day['date'])
+        for section in day['sections']:
+            for shift in section['shifts']:
+                if shift['profile_id'] is not None:
+                    shifts.setdefault(shift['profile_id'], []).append({**shift, 'date': date})
+    return shifts
+
+
+def render_summaries(payload, profile_ids=None):
+    """{profile_id: (subject, body)} for the scheduled employees (or just `profile_ids`); the template is compiled once."""
+    template = get_template('scheduling/email/schedule_published.txt')
+    week = parse_date(payload['week_start'])
+    location = payload['location']['name']
+    subject = f"Your schedule at {location} for the week of {week:%b} {week.day}"
+    summaries = {}
+    for profile_id, shifts in employee_shifts(payload).items():
+        if profile_ids is not None and profile_id not in profile_ids:
+            continue
+        # Sections are listed by number, not time
+        shifts.sort(key=lambda shift: (shift['date'], shift['start'] or ''))
+        summaries[profile_id] = (subject, template.render({
+            'name': shifts[0]['employee'],
+            'location': location,
+            'week_start': week,
+            'version': payload.get('version', 1),
+            'shifts': shifts,
+            'hours': round(sum(shift['hours'] for shift in shifts), 2),
+        }))
+    return summaries
+
+
+# -------------------------------
+# Sending
+# -------------------------------
+def _create_deliveries(job, payload):
+    profile_ids = list(employee_shifts(payload))
+    emails = dict(Profile.objects.filter(pk__in=profile_ids).exclude(user__email='')
+                  .values_list('id', 'user__email'))
+    NotificationDelivery.objects.bulk_create(
+        (NotificationDelivery(notification=job, profile_id=profile_id, email=email)
+         for profile_id, email in emails.items()),
+        ignore_conflicts=True,
+    )
+    job.total = len(emails)
+
+
+def _update_progress(job, retry_scheduled):
+    counts = job.deliveries.aggregate(
+        sent=Count('id', filter=Q(sent_at__isnull=False)),
+        failed=Count('id', filter=Q(sent_at__isnull=True, attempts__gte=MAX_DELIVERY_ATTEMPTS)),
+        untried=Count('id', filter=Q(attempts=0)),
+    )
+    job.sent, job.failed = counts['sent'], counts['failed']
+    if job.sent + job.failed >= job.total:
+        job.status, job.finished_at = PublishNotification.DONE, timezone.now()
+    elif not counts['untried'] and not retry_scheduled:
+        # Only refused messages are left: give the server a while before asking again
+        job.next_attempt_at = timezone.now() + datetime.timedelta(seconds=RETRY_SECONDS)
+
+
+def send_batch(job, batch_size=None):
+    """
+    Send up to `batch_size` (default SCHEDULING_NOTIFY_BATCH_SIZE) of the job's pending emails
+    over one SMTP connection and record progress. A refused message is retried on a later batch,
+    up to MAX_DELIVERY_ATTEMPTS; if the connection itself fails, the job is put back with
+    exponential backoff and `job.connection_failed` is set. Runs outside a transaction: each
+    outcome is saved as soon as the server answers, so a crash mid-batch re-sends nothing
+    already recorded.
+    """
+    payload = json.loads(job.published.payload)
+    pending = list(job.deliveries.filter(sent_at__isnull=True, attempts__lt=MAX_DELIVERY_ATTEMPTS)
+                   .order_by('attempts', 'id')[:batch_size or settings.SCHEDULING_NOTIFY_BATCH_SIZE])
+    summaries = render_summaries(payload, {delivery.profile_id for delivery in pending})
+
+    attempted, job.connection_failed = 0, False
+    mail = get_connection()
+    try:
+        if pending:
+            mail.open()
+        for delivery in pending:
+            subject, body = summaries[delivery.profile_id]
+            try:
+                EmailMessage(subject, body, to=[delivery.email], connection=mail).send()
+            except MESSAGE_ERRORS as e:
+                delivery.error = str(e)
+            else:
+                delivery.sent_at, delivery.error = timezone.now(), ''
+            delivery.attempts += 1
+            delivery.save(update_fields=['sent_at', 'attempts', 'error'])
+            attempted += 1
+    except (smtplib.SMTPException, OSError) as e:
+        # Not the recipient's fault, so the message being sent doesn't use up one of its attempts
+        job.connection_failed = True
+        job.attempts += 1
+        job.last_error = str(e) or e.__class__.__name__
+        job.next_attempt_at = timezone.now() + datetime.timedelta(seconds=RETRY_SECONDS * 2 ** (job.attempts - 1))
+        if job.attempts >= MAX_JOB_ATTEMPTS:
+            job.status, job.finished_at = PublishNotification.FAILED, timezone.now()
+    finally:
+        mail.close()
+
+    if not job.connection_failed:
+        # Release the claim: due again straight away unless _update_progress holds it back
+        job.next_attempt_at = timezone.now()
+    if job.status == PublishNotification.PENDING:
+        _update_progress(job, job.connection_failed)
+    job.save(update_fields=['status', 'total', 'sent', 'failed', 'attempts', 'last_error', 'next_attempt_at',
+                            'finished_at'])
+    return attempted
+
+
+def claim_due_notification():
+    """
+    The next due job, claimed for CLAIM_SECONDS by pushing back its next attempt, or None. The
+    claim commits before anything is sent, so no row lock or transaction is held open during SMTP
+    and other workers skip the job until it is released or the claim runs out.
+    """
+    with transaction.atomic():
+        due = PublishNotification.objects.filter(status=PublishNotification.PENDING,
+                                                 next_attempt_at__lte=timezone.now())
+        if connection.features.has_select_for_update_skip_locked:
+            # Only the job row: publishing must not wait on a job being claimed
+            due = due.select_for_update(skip_locked=True, of=('self',))
+        job = due.select_related('published__location').order_by('next_attempt_at', 'id').first()
+        if job is not None:
+            if job.total is None:
+                _create_deliveries(job, json.loads(job.published.payload))
+            job.next_attempt_at = timezone.now() + datetime.timedelta(seconds=CLAIM_SECONDS)
+            job.save(update_fields=['total', 'next_attempt_at'])
+    return job
+
+
+def send_pending_notifications(batch_size=None):
+    """
+    Send one batch of the next due job and return it, or None when nothing is due.
+    Safe to run from several workers: each batch works on a job claimed by claim_due_notification.
+    """
+    job = claim_due_notification()
+    if job is not None:
+        send_batch(job, batch_size)
+    return job
@@ -0,0 +1,124 @@
+import csv
+import datetime
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, Sum, Value, When
+from django.db.models.functions import TruncWeek
+
+from mysite.streaming import Echo
+from .models import Shift
+
+PAYROLL_CHUNK_SIZE = 2000
+
+PAYROLL_HEADERS = (
+    'profile_id', 'username', 'first_name', 'last_name', 'jobs',
+    'regular_hours', 'overtime_hours', 'total_hours', 'regular_pay', 'overtime_pay', 'gross_pay',
+)
+
+
+class PayrollError(ValueError):
+    pass
+
+
+def payroll_rows(start, end, location_id=None):
+    """
+    Hours and pay for each (employee, job, workweek), summed by the database in one query
+    with the overnight-aware durations of ShiftQuerySet.with_hours(). Ordered by employee
+    and streamed with iterator(), so an employee's rows arrive together.
+
+    With a location, only employees who worked there are included, but all of their shifts
+    are summed, since overtime comes from the whole week; rows are marked `at_location`.
+    """
+    if end < start:
+        raise PayrollError("end must not be before start.")
+    # Overtime is counted per workweek; a period cutting one in half would undercount it
+    if start.weekday() != 0 or end.weekday() != 6:
+        raise PayrollError("Payroll periods must start on a Monday and end on a Sunday.")
+    shifts = Shift.objects.filter(day__date__range=(start, end), employee_job__isnull=False)
+    if location_id:
+        shifts = shifts.filter(employee_job__profile__in=shifts.at_location(location_id)
+                               .values('employee_job__profile_id')).with_location()
+        at_location = Case(When(location_key=location_id, then=Value(True)), default=Value(False),
+                           output_field=BooleanField())
+    else:
+        at_location = Value(True)
+    rows = shifts.with_hours().annotate(week=TruncWeek('day__date'), at_location=at_location).values_list(
+        'employee_job__profile_id', 'employee_job__profile__user__username',
+        'employee_job__profile__user__first_name', 'employee_job__profile__user__last_name',
+        'employee_job_id', 'employee_job__pay_rate', 'week', 'at_location',
+    ).annotate(hours=Sum('duration')).order_by('employee_job__profile_id', 'week', 'employee_job_id')
+    return rows.iterator(chunk_size=PAYROLL_CHUNK_SIZE)
+
+
+def _week_pay(jobs, threshold, multiplier):
+    """
+    (regular hours, overtime hours, regular pay, overtime pay) for the `at_location` share of
+    one employee's workweek; the overtime is split across locations by hours worked.
+    """
+    hours = sum(job_hours for job_hours, _, _ in jobs)
+    straight = sum(job_hours * (rate or 0) for job_hours, rate, _ in jobs)
+    overtime = max(hours - threshold, 0.0)
+    # With several jobs the overtime rate comes from the week's blended rate, not any one job's
+    blended = straight / hours if hours else 0.0
+    local_hours = sum(job_hours for job_hours, _, at_location in jobs if at_location)
+    local_straight = sum(job_hours * (rate or 0) for job_hours, rate, at_location in jobs if at_location)
+    local_overtime = overtime * local_hours / hours if hours else 0.0
+    return (local_hours - local_overtime, local_overtime, local_straight - local_overtime * blended,
+            local_overtime * blended * multiplier)
+
+
+def employee_totals(rows):
+    """
+    Fold payroll_rows() into one dict per employee, applying weekly overtime.
+    Only the current employee's rows are held, so memory stays flat.
+    """
+    threshold = settings.SCHEDULING_OVERTIME_WEEKLY_HOURS
+    multiplier = settings.SCHEDULING_OVERTIME_MULTIPLIER
+    employee = week = None
+    jobs, job_ids = [], set()
+    totals = dict.fromkeys(('regular_hours', 'overtime_hours', 'regular_pay', 'overtime_pay'), 0.0)
+
+    def close_week():
+        if jobs:
+            for key, value in zip(totals, _week_pay(jobs, threshold, multiplier)):
+                totals[key] += value
+            jobs.clear()
+
+    def employee_row():
+        regular_hours, overtime_hours = totals['regular_hours'], totals['overtime_hours']
+        regular_pay, overtime_pay = totals['regular_pay'], totals['overtime_pay']
+        return {
+            'profile_id': employee[0], 'username': employee[1], 'first_name': employee[2], 'last_name': employee[3],
+            'jobs': len(job_ids),
+            'regular_hours': round(regular_hours, 2),
+            'overtime_hours': round(overtime_hours, 2),
+            'total_hours': round(regular_hours + overtime_hours, 2),
+            'regular_pay': round(regular_pay, 2),
+            'overtime_pay': round(overtime_pay, 2),
+            'gross_pay': round(regular_pay + overtime_pay, 2),
+        }
+
+    for profile_id, username, first_name, last_name, employee_job_id, pay_rate, row_week, at_location, duration in rows:
+        if employee is None or profile_id != employee[0]:
+            if employee is not None:
+                close_week()
+                yield employee_row()
+            employee, week = (profile_id, username, first_name, last_name), row_week
+            job_ids.clear()
+            totals.update(dict.fromkeys(totals, 0.0))
+        elif row_week != week:
+            close_week()
+            week = row_week
+        if at_location:
+            job_ids.add(employee_job_id)
+        jobs.append(((duration or datetime.timedelta()).total_seconds() / 3600, pay_rate, at_location))
+    if employee is not None:
+        close_week()
+        yield employee_row()
+
+
+def iter_payroll_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(PAYROLL_HEADERS)
+    for employee in employee_totals(rows):
+        yield writer.writerow([employee[header] for header in PAYROLL_HEADERS])
@@ -0,0 +1,142 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import Location
+from .models import PublishedSchedule, PublishNotification
+from .weekly import group_week, week_dates, week_shifts, week_start
+
+PUBLISHED_TIMEOUT = 60 * 60 * 24
+
+
+class PublishError(ValueError):
+    pass
+
+
+def build_snapshot(location, start):
+    """The week's schedule at one location, denormalized into plain JSON-ready data (one query)."""
+    dates = week_dates(start)
+    grouped = group_week(week_shifts(start, location.pk), dates)
+    days = grouped[0]['days'] if grouped else [{'date': date, 'sections': []} for date in dates]
+    total_hours = 0
+    snapshot_days = []
+    for day in days:
+        sections = []
+        for section in day['sections']:
+            shifts = []
+            for shift in section['shifts']:
+                user = shift.employee_job.profile.user if shift.employee_job_id else None
+                total_hours += shift.hours
+                shifts.append({
+                    'id': shift.pk,
+                    'profile_id': shift.employee_job.profile_id if user else None,
+                    'employee': (user.get_full_name() or user.username) if user else "Unassigned",
+                    'job': shift.employee_job.job.title if user else None,
+                    'shift_type': shift.shift_type,
+                    'start': shift.start_time.strftime('%H:%M') if shift.start_time else None,
+                    'end': shift.end_time.strftime('%H:%M') if shift.end_time else None,
+                    'hours': shift.hours,
+                })
+            sections.append({'number': section['number'], 'shifts': shifts})
+        snapshot_days.append({'date': day['date'], 'sections': sections})
+    return {
+        'location': {'id': location.pk, 'name': location.name},
+        'week_start': start,
+        'total_hours': round(total_hours, 2),
+        'days': snapshot_days,
+    }
+
+
+# -------------------------------
+# Current version lookups (cached, so conditional GETs skip the database)
+# -------------------------------
+def current_cache_key(location_id, start):
+    return f"scheduling:published:{location_id}:{start.isoformat()}"
+
+
+def get_current(location_id, start):
+    """{'pk', 'version', 'etag', 'published_at'} of the current version, or None if never published."""
+    key = current_cache_key(location_id, start)
+    current = cache.get(key)
+    if current is None:
+        row = (PublishedSchedule.objects.filter(location_id=location_id, week_start=start, is_current=True)
+               .values('pk', 'version', 'etag', 'published_at').first())
+        current = row or {}
+        cache.set(key, current, PUBLISHED_TIMEOUT)
+    return current or None
+
+
+def _forget_current(location_id, start):
+    # Again after commit, in case a reader re-cached the old version while the transaction ran
+    key = current_cache_key(location_id, start)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+# -------------------------------
+# Publishing
+# -------------------------------
+def publish_week(location, day, published_by=None, notify=True):
+    """
+    Freeze the week containing `day` at `location` as a new current version.
+    The snapshot is built and swapped in inside one transaction, so readers see
+    either the old version or the new one. With `notify`, emailing the scheduled
+    employees is queued for `send_publish_notifications`.
+    """
+    start = week_start(day)
+    with transaction.atomic():
+        # Lock the location row so concurrent publishes of the same week queue up
+        Location.objects.select_for_update().filter(pk=location.pk).first()
+        versions = PublishedSchedule.objects.filter(location=location, week_start=start)
+        version = (versions.aggregate(latest=Max('version'))['latest'] or 0) + 1
+
+        snapshot = build_snapshot(location, start)
+        snapshot['version'] = version
+        snapshot['published_at'] = timezone.now()
+        payload = json.dumps(snapshot, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+        versions.filter(is_current=True).update(is_current=False)
+        published = PublishedSchedule.objects.create(
+            location=location, week_start=start, version=version, payload=payload,
+            etag=hashlib.sha256(payload.encode()).hexdigest()[:32], is_current=True,
+            published_at=snapshot['published_at'], published_by=published_by,
+        )
+        if notify:
+            PublishNotification.objects.create(published=published)
+        _forget_current(location.pk, start)
+    return published
+
+
+def rollback_week(location, day, version=None):
+    """
+    Make an earlier version current again: the previous one, or `version`.
+    Two updates; nothing is rebuilt.
+    """
+    start = week_start(day)
+    with transaction.atomic():
+        Location.objects.select_for_update().filter(pk=location.pk).first()
+        versions = PublishedSchedule.objects.filter(location=location, week_start=start)
+        current = versions.filter(is_current=True).values_list('version', flat=True).first()
+        if version is None:
+            if current is None:
+                raise PublishError("This week has not been published.")
+            version = versions.filter(version__lt=current).aggregate(previous=Max('version'))['previous']
+            if version is None:
+                raise PublishError("There is no earlier version to roll back to.")
+        elif not versions.filter(version=version).exists():
+            raise PublishError(f"Version {version} does not exist.")
+
+        versions.filter(is_current=True).update(is_current=False)
+        versions.filter(version=version).update(is_current=True)
+        _forget_current(location.pk, start)
+    return version
+
+
+def published_payload(pk):
+    return PublishedSchedule.objects.filter(pk=pk).values_list('payload', flat=True).first()
+
@@ -0,0 +1,274 @@
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import Profile
+from .conflicts import shift_interval
+from .models import Kiosk, Shift, TimePunch
+
+MAX_BATCH = 500
+KIOSK_TIMEOUT = 60 * 5
+# last_seen_at is refreshed at most this often, so busy kiosks don't write their row on every batch
+SEEN_INTERVAL = 60
+# A clock-in this long before a shift starts still counts toward it
+MATCH_WINDOW = datetime.timedelta(hours=2)
+# Minutes of lateness or leaving early that are not flagged
+GRACE_MINUTES = 5
+
+
+class PunchError(ValueError):
+    pass
+
+
+# -------------------------------
+# Ingestion
+# -------------------------------
+def kiosk_cache_key(token):
+    return f"scheduling:kiosk:{token}"
+
+
+def get_kiosk(token):
+    """{'id', 'token', 'location_id', 'last_seen_at'} of the active kiosk with this token, or None. Cached."""
+    if not token:
+        return None
+    key = kiosk_cache_key(token)
+    kiosk = cache.get(key)
+    if kiosk is None:
+        kiosk = (Kiosk.objects.filter(token=token, is_active=True)
+                 .values('id', 'token', 'location_id', 'last_seen_at').first())
+        cache.set(key, kiosk or {}, KIOSK_TIMEOUT)
+    return kiosk or None
+
+
+def forget_kiosk(token):
+    cache.delete(kiosk_cache_key(token))
+
+
+def parse_punches(records):
+    """Validate a batch of {"sequence", "profile", "kind", "at"} dicts; returns (punches, rejected)."""
+    if not isinstance(records, list):
+        raise PunchError("'punches' must be a list.")
+    if len(records) > MAX_BATCH:
+        raise PunchError(f"At most {MAX_BATCH} punches per batch.")
+    punches, rejected = [], []
+    for index, record in enumerate(records):
+        record = record if isinstance(record, dict) else {}
+        sequence, profile_id, kind = record.get('sequence'), record.get('profile'), record.get('kind')
+        at = parse_datetime(str(record.get('at') or ''))
+        if not isinstance(sequence, int) or sequence < 0 or not isinstance(profile_id, int):
+            rejected.append({'index': index, 'error': "sequence and profile must be integers."})
+        elif kind not in (TimePunch.IN, TimePunch.OUT):
+            rejected.append({'index': index, 'error': "kind must be 'in' or 'out'."})
+        elif at is None or timezone.is_naive(at):
+            rejected.append({'index': index, 'error': "at must be an ISO 8601 time with a UTC offset."})
+        else:
+            punches.append((index, sequence, profile_id, kind, at))
+    return punches, rejected
+
+
+def ingest_punches(kiosk, records):
+    """
+    Store a kiosk's batch with one bulk insert. Sequences the kiosk already sent are
+    counted as duplicates and skipped by the unique (kiosk, sequence) constraint, so a
+    retried batch is harmless. Three queries per batch, none touching schedule tables.
+    """
+    punches, rejected = parse_punches(records)
+    profiles = set(Profile.objects.filter(pk__in={p[2] for p in punches}).values_list('id', flat=True))
+    valid = []
+    for punch in punches:
+        if punch[2] in profiles:
+            valid.append(punch)
+        else:
+            rejected.append({'index': punch[0], 'error': "unknown profile."})
+
+    sequences = {sequence for _, sequence, _, _, _ in valid}
+    seen = set(TimePunch.objects.filter(kiosk_id=kiosk['id'], sequence__in=sequences)
+               .values_list('sequence', flat=True)) if sequences else set()
+    received_at = timezone.now()
+    new = {}
+    for _, sequence, profile_id, kind, at in valid:
+        if sequence not in seen:
+            new.setdefault(sequence, TimePunch(kiosk_id=kiosk['id'], sequence=sequence, profile_id=profile_id,
+                                               kind=kind, punched_at=at, received_at=received_at))
+    # ignore_conflicts covers a retry racing this request past the duplicate check
+    TimePunch.objects.bulk_create(new.values(), ignore_conflicts=True)
+
+    last_seen = kiosk.get('last_seen_at')
+    if last_seen is None or (received_at - last_seen).total_seconds() > SEEN_INTERVAL:
+        Kiosk.objects.filter(pk=kiosk['id']).update(last_seen_at=received_at)
+        # The kiosk is the cache's copy: store it back, or every later batch would see the old time
+        kiosk['last_seen_at'] = received_at
+        cache.set(kiosk_cache_key(kiosk['token']), kiosk, KIOSK_TIMEOUT)
+    return {
+        'accepted': len(new),
+        'duplicates': len(valid) - len(new),
+        'rejected': sorted(rejected, key=lambda r: r['index']),
+        'last_sequence': max(sequences) if sequences else None,
+    }
+
+
+# -------------------------------
+# Scheduled vs actual
+# -------------------------------
+def _local(moment):
+    return timezone.localtime(moment).replace(tzinfo=None)
+
+
+def _hours(start, end):
+    return round((end - start).total_seconds() / 3600, 2) if start and end else None
+
+
+def _minutes(delta):
+    return round(delta.total_seconds() / 60)
+
+
+def worked_intervals(punches):
+    """
+    Pair one employee's (time, kind) punches, sorted by time, into [clock_in, clock_out]
+    intervals. A missing clock-out or clock-in leaves that end None.
+    """
+    intervals, open_at = [], None
+    for at, kind in punches:
+        if kind == TimePunch.IN:
+            if open_at is not None:
+                intervals.append([open_at, None])
+            open_at = at
+        else:
+            intervals.append([open_at, at])
+            open_at = None
+    if open_at is not None:
+        intervals.append([open_at, None])
+    return intervals
+
+
+def match_intervals(shifts, intervals):
+    """
+    Assign worked intervals to one employee's shifts with a single sweep over both lists,
+    each sorted by start. An interval goes to the shift it overlaps most, or failing that
+    to the next shift starting within MATCH_WINDOW of the clock-in.
+    Returns ({shift index: interval}, [unmatched intervals]).
+    """
+    matched, unmatched = {}, []
+    first = 0
+    for interval in intervals:
+        clock_in, clock_out = interval
+        anchor = clock_in or clock_out
+        # Shifts that ended before this interval began can't take it or any later one
+        while first < len(shifts) and shifts[first][1] < anchor - MATCH_WINDOW:
+            first += 1
+        best, best_score = None, None
+        index = first
+        while index < len(shifts) and shifts[index][0] <= (clock_out or anchor) + MATCH_WINDOW:
+            start, end = shifts[index]
+            if index not in matched:
+                overlap = (min(end, clock_out or end) - max(start, clock_in or start)).total_seconds()
+                distance = abs((start - clock_in).total_seconds()) if clock_in else abs((end - clock_out).total_seconds())
+                if overlap > 0 or distance <= MATCH_WINDOW.total_seconds():
+                    score = (overlap > 0, overlap, -distance)
+                    if best_score is None or score > best_score:
+                        best, best_score = index, score
+            index += 1
+        if best is None:
+            unmatched.append(interval)
+        else:
+            matched[best] = interval
+    return matched, unmatched
+
+
+def punch_variance(start, end, location_id=None):
+    """
+    Scheduled vs actual for every assigned shift from start to end (inclusive): clock-in and
+    clock-out, minutes late or left early, worked and variance hours. Punches that match no
+    shift are listed as unscheduled. Two queries; the matching is a sort and a sweep per employee.
+    """
+    shifts = Shift.objects.filter(
+        day__date__range=(start, end), employee_job__isnull=False, start_time__isnull=False, end_time__isnull=False,
+    )
+    if location_id:
+        shifts = shifts.at_location(location_id)
+    shift_rows = list(shifts.values_list(
+        'id', 'employee_job__profile_id', 'employee_job__profile__user__username', 'day__date',
+        'start_time', 'end_time',
+    ))
+
+    # A day either side catches early clock-ins and overnight clock-outs
+    window = (timezone.make_aware(datetime.datetime.combine(start - datetime.timedelta(days=1), datetime.time())),
+              timezone.make_aware(datetime.datetime.combine(end + datetime.timedelta(days=2), datetime.time())))
+    punches = TimePunch.objects.filter(punched_at__range=window)
+    if location_id:
+        punches = punches.filter(Q(kiosk__location_id=location_id)
+                                 | Q(profile_id__in={row[1] for row in shift_rows}))
+    punch_rows = punches.values_list('profile_id', 'profile__user__username', 'punched_at', 'kind')
+
+    by_profile, names = {}, {}
+    for shift_id, profile_id, username, date, start_time, end_time in shift_rows:
+        by_profile.setdefault(profile_id, ([], []))[0].append((*shift_interval(date, start_time, end_time), shift_id, date))
+        names[profile_id] = username
+    for profile_id, username, punched_at, kind in punch_rows:
+        by_profile.setdefault(profile_id, ([], []))[1].append((_local(punched_at), kind))
+        names[profile_id] = username
+
+    rows, unscheduled = [], []
+    for profile_id, (profile_shifts, profile_punches) in by_profile.items():
+        profile_shifts.sort()
+        profile_punches.sort(key=lambda punch: (punch[0], punch[1] == TimePunch.OUT))
+        matched, unmatched = match_intervals([s[:2] for s in profile_shifts], worked_intervals(profile_punches))
+        for index, (shift_start, shift_end, shift_id, date) in enumerate(profile_shifts):
+            clock_in, clock_out = matched.get(index, (None, None))
+            scheduled = _hours(shift_start, shift_end)
+            worked = _hours(clock_in, clock_out)
+            late = _minutes(clock_in - shift_start) if clock_in else None
+            early = _minutes(shift_end - clock_out) if clock_out else None
+            if index not in matched:
+                status = 'no_show'
+            elif clock_in is None or clock_out is None:
+                status = 'missing_punch'
+            elif late > GRACE_MINUTES:
+                status = 'late'
+            elif early > GRACE_MINUTES:
+                status = 'left_early'
+            else:
+                status = 'ok'
+            rows.append({
+                'shift_id': shift_id,
+                'profile_id': profile_id,
+                'employee': names[profile_id],
+                'date': date,
+                'scheduled_start': shift_start,
+                'scheduled_end': shift_end,
+                'clock_in': clock_in,
+                'clock_out': clock_out,
+                'scheduled_hours': scheduled,
+                'worked_hours': worked,
+                'variance_hours': round(worked - scheduled, 2) if worked is not None else None,
+                'late_minutes': late,
+                'left_early_minutes': early,
+                'status': status,
+            })
+        for clock_in, clock_out in unmatched:
+            # Punches from the padding days belong to the neighbouring periods
+            if start <= (clock_in or clock_out).date() <= end:
+                unscheduled.append({
+                    'profile_id': profile_id,
+                    'employee': names[profile_id],
+                    'clock_in': clock_in,
+                    'clock_out': clock_out,
+                    'worked_hours': _hours(clock_in, clock_out),
+                })
+
+    rows.sort(key=lambda row: (row['scheduled_start'], row['employee']))
+    unscheduled.sort(key=lambda row: (row['clock_in'] or row['clock_out'], row['employee']))
+    worked = [row['worked_hours'] for row in rows if row['worked_hours'] is not None]
+    return {
+        'shifts': rows,
+        'unscheduled': unscheduled,
+        'totals': {
+            'scheduled_hours': round(sum(row['scheduled_hours'] for row in rows), 2),
+            'worked_hours': round(sum(worked) + sum(row['worked_hours'] or 0 for row in unscheduled), 2),
+            'no_shows': sum(row['status'] == 'no_show' for row in rows),
+            'late': sum(row['status'] == 'late' for row in rows),
+        },
+    }
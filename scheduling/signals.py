@@ -0,0 +1,168 @@
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from accounts.models import Location, Profile
+from jobs.models import EmployeeJob, JobBase
+from .models import Availability, Kiosk, ScheduleDay, ScheduleTombstone, Shift, SyncSequence
+from .availability import invalidate_availability
+from .feeds import invalidate_feeds, invalidate_feeds_for_shifts
+from .labor import invalidate_all_labor, invalidate_labor
+from .punches import forget_kiosk
+from .sync import move_company_shifts, record_moves, record_tombstone
+
+# Sent with `days=[(date, location_id), ...]` after bulk writes, which skip the Shift and ScheduleDay signals
+schedule_bulk_changed = Signal()
+
+
+@receiver(pre_save, sender=Shift)
+def remember_shift_day(sender, instance, **kwargs):
+    # A shift moved to another day or employee changes both weeks, both calendars and maybe its location
+    previous = Shift.objects.filter(pk=instance.pk).with_location().values_list(
+        'day_id', 'day__date', 'employee_job__profile_id', 'employee_job_id', 'location_key',
+    ).first() if instance.pk else None
+    (instance._previous_day_id, instance._previous_date, instance._previous_profile_id,
+     instance._previous_employee_job_id, instance._previous_location_id) = previous or (None,) * 5
+
+
+@receiver([post_save, post_delete], sender=Shift)
+def shift_changed(sender, instance, **kwargs):
+    day_ids = {instance.day_id, getattr(instance, '_previous_day_id', None)} - {None}
+    dates = dict(ScheduleDay.objects.filter(pk__in=day_ids).values_list('id', 'date'))
+    invalidate_labor(dates.values())
+
+    profile_id = (EmployeeJob.objects.filter(pk=instance.employee_job_id).values_list('profile_id', flat=True).first()
+                  if instance.employee_job_id else None)
+    invalidate_feeds([(profile_id, dates.get(instance.day_id)),
+                      (getattr(instance, '_previous_profile_id', None), getattr(instance, '_previous_date', None))])
+
+
+@receiver(post_save, sender=Shift)
+def shift_moved(sender, instance, created, **kwargs):
+    # Delta sync clients of the location the shift left must drop it
+    if created or (instance.day_id, instance.employee_job_id) == (instance._previous_day_id,
+                                                                  instance._previous_employee_job_id):
+        return
+    location_id = Shift.objects.filter(pk=instance.pk).with_location().values_list('location_key', flat=True).first()
+    record_moves(ScheduleTombstone.SHIFT, [(instance.pk, instance._previous_location_id, location_id)])
+
+
+@receiver(pre_save, sender=ScheduleDay)
+def remember_day_date(sender, instance, **kwargs):
+    previous = (ScheduleDay.objects.filter(pk=instance.pk).values_list('date', 'location_id').first()
+                if instance.pk else None)
+    instance._previous_date, instance._previous_location_id = previous or (None, None)
+
+
+@receiver([post_save, post_delete], sender=ScheduleDay)
+def schedule_day_changed(sender, instance, created=False, **kwargs):
+    invalidate_labor([instance.date])
+    if not created and kwargs['signal'] is post_save:
+        # The day's date or location shows up in every calendar with a shift on it
+        previous = getattr(instance, '_previous_date', None) or instance.date
+        invalidate_feeds((profile_id, date) for profile_id in instance.shifts.values_list(
+            'employee_job__profile_id', flat=True) for date in {previous, instance.date})
+
+
+@receiver(post_save, sender=ScheduleDay)
+def schedule_day_moved(sender, instance, created, **kwargs):
+    old_location_id = instance._previous_location_id
+    if created or old_location_id == instance.location_id:
+        return
+    # The day and every shift on it leave the old location's delta sync clients; a shift on a
+    # company-wide day is at its employee's location instead
+    record_moves(ScheduleTombstone.DAY, [(instance.pk, old_location_id, instance.location_id)])
+    shifts = list(instance.shifts.values_list('id', 'employee_job__profile__location_id'))
+    record_moves(ScheduleTombstone.SHIFT, [(pk, old_location_id or home, instance.location_id or home)
+                                           for pk, home in shifts])
+    # Same transaction as the day's save, so its sequence number still sorts in commit order
+    instance.shifts.update(sync_seq=instance.sync_seq, updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=EmployeeJob)
+def employee_job_deleted(sender, instance, **kwargs):
+    # Its shifts are unassigned with a bulk update, which sends no Shift signals and leaves updated_at alone
+    shifts = Shift.objects.filter(employee_job=instance)
+    invalidate_feeds(shifts.values_list('employee_job__profile_id', 'day__date'))
+    schedule_bulk_changed.send(sender=Shift, days=set(shifts.values_list('day__date', 'day__location_id')))
+    # Unassigned shifts on company-wide days have no location any more
+    home = Profile.objects.filter(pk=instance.profile_id).values_list('location_id', flat=True).first()
+    record_moves(ScheduleTombstone.SHIFT, [(pk, home, None) for pk in shifts.filter(
+        day__location__isnull=True).values_list('id', flat=True)])
+    shifts.update(sync_seq=SyncSequence.take(), updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Profile)
+def remember_profile_location(sender, instance, **kwargs):
+    instance._previous_location_id = (
+        Profile.objects.filter(pk=instance.pk).values_list('location_id', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Profile)
+def profile_moved(sender, instance, created, **kwargs):
+    if not created and instance._previous_location_id != instance.location_id:
+        move_company_shifts(Shift.objects.filter(employee_job__profile=instance),
+                            instance._previous_location_id, instance.location_id)
+
+
+@receiver(pre_save, sender=EmployeeJob)
+def remember_employee_job_profile(sender, instance, **kwargs):
+    previous = EmployeeJob.objects.filter(pk=instance.pk).values_list(
+        'profile_id', 'profile__location_id').first() if instance.pk else None
+    instance._previous_profile_id, instance._previous_location_id = previous or (None, None)
+
+
+@receiver(post_save, sender=EmployeeJob)
+def employee_job_moved(sender, instance, created, **kwargs):
+    # Handing a job to another employee moves its shifts on company-wide days to their location
+    if not created and instance._previous_profile_id != instance.profile_id:
+        location_id = Profile.objects.filter(pk=instance.profile_id).values_list('location_id', flat=True).first()
+        move_company_shifts(Shift.objects.filter(employee_job=instance), instance._previous_location_id, location_id)
+
+
+@receiver(post_save, sender=JobBase)
+def job_renamed(sender, instance, created, **kwargs):
+    # Calendar events show the job title, so every feed with the job's shifts must stop answering 304
+    if not created:
+        invalidate_feeds_for_shifts(Shift.objects.filter(employee_job__job=instance))
+
+
+@receiver(post_save, sender=Location)
+def location_renamed(sender, instance, created, **kwargs):
+    # ... and the location name, which also comes from the employee's home location on company-wide days
+    if not created:
+        invalidate_feeds_for_shifts(Shift.objects.at_location(instance.pk))
+
+
+@receiver(post_delete, sender=ScheduleDay)
+def schedule_day_deleted(sender, instance, **kwargs):
+    record_tombstone(ScheduleTombstone.DAY, instance.pk, instance.location_id)
+
+
+@receiver(post_delete, sender=Shift)
+def shift_deleted(sender, instance, **kwargs):
+    # Days are deleted after their shifts, so the day row is still there to read
+    location_id = ScheduleDay.objects.filter(pk=instance.day_id).values_list('location_id', flat=True).first()
+    record_tombstone(ScheduleTombstone.SHIFT, instance.pk, location_id)
+
+
+@receiver([post_save, post_delete], sender=EmployeeJob)
+@receiver([post_save, post_delete], sender=JobBase)
+@receiver([post_save, post_delete], sender=Location)
+@receiver(post_save, sender=Profile)
+def labor_inputs_changed(sender, instance, **kwargs):
+    # Pay rates, departments and home locations feed every week
+    invalidate_all_labor()
+
+
+@receiver([post_save, post_delete], sender=Availability)
+@receiver([post_save, post_delete], sender=EmployeeJob)
+@receiver(post_save, sender=Profile)
+def availability_inputs_changed(sender, instance, **kwargs):
+    invalidate_availability()
+
+
+@receiver([post_save, post_delete], sender=Kiosk)
+def kiosk_changed(sender, instance, **kwargs):
+    # A deactivated or deleted kiosk must stop authenticating straight away
+    forget_kiosk(instance.token)
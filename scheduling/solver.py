@@ -0,0 +1,304 @@
+import datetime
+import math
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from jobs.models import EmployeeJob
+from .availability import get_availability_index
+from .conflicts import min_rest_hours, shift_interval
+from .feeds import invalidate_feeds
+from .labor import invalidate_labor
+from .models import ScheduleDay, Shift, SyncSequence
+from .signals import schedule_bulk_changed
+
+# An unfilled slot costs more than any realistic shift, so coverage always comes first
+UNFILLED_PENALTY = 10_000
+
+
+class Slot:
+    """One shift the schedule needs: a department at a location for a shift template on a day."""
+
+    __slots__ = ('day', 'date', 'location_id', 'department', 'shift_type', 'section_number',
+                 'start_time', 'end_time', 'starts', 'ends', 'hours')
+
+    def __init__(self, day, date, location_id, department, shift_type, section_number, start_time, end_time):
+        self.day = day  # ScheduleDay id
+        self.date = date
+        self.location_id = location_id
+        self.department = department
+        self.shift_type = shift_type
+        self.section_number = section_number
+        self.start_time = start_time
+        self.end_time = end_time
+        self.starts, self.ends = shift_interval(date, start_time, end_time)
+        self.hours = (self.ends - self.starts).total_seconds() / 3600
+
+
+class Candidate:
+    """An EmployeeJob that can fill slots of its department at the employee's location."""
+
+    __slots__ = ('employee_job_id', 'profile_id', 'pay_rate')
+
+    def __init__(self, employee_job_id, profile_id, pay_rate):
+        self.employee_job_id = employee_job_id
+        self.profile_id = profile_id
+        self.pay_rate = pay_rate or 0
+
+
+def _parse_time(value):
+    return value if isinstance(value, datetime.time) else datetime.time.fromisoformat(value)
+
+
+def staff_needed(sales, share, ratio):
+    if not ratio.get('sales_per_staff'):
+        return ratio.get('minimum', 0)
+    return max(ratio.get('minimum', 0), math.ceil(float(sales) * share / ratio['sales_per_staff']))
+
+
+class ScheduleSolver:
+    """
+    Fill a week of ScheduleDays with shifts.
+
+    Demand comes from each day's projected_sales, SCHEDULING_STAFFING_RATIOS and
+    SCHEDULING_SHIFT_TEMPLATES; shifts that already exist count toward it. A greedy pass
+    fills the hardest slots first with the least-scheduled eligible employee, then a
+    seeded local search fills gaps through two-step reassignments and swaps in
+    cheaper employees. Employees are only placed inside their Availability, work at
+    most one shift a day, get at least SCHEDULING_MIN_REST_HOURS between shifts and
+    never exceed Profile.max_weekly_hours.
+    """
+
+    def __init__(self, start, location_ids=None, seed=0, iterations=None, ratios=None, templates=None):
+        self.start = start
+        self.end = start + datetime.timedelta(days=6)
+        self.location_ids = location_ids
+        self.rng = random.Random(seed)
+        self.iterations = iterations
+        self.rest = datetime.timedelta(hours=min_rest_hours())
+        self.ratios = ratios or settings.SCHEDULING_STAFFING_RATIOS
+        self.templates = {
+            shift_type: (_parse_time(t['start']), _parse_time(t['end']), t.get('sales_share', 0))
+            for shift_type, t in (templates or settings.SCHEDULING_SHIFT_TEMPLATES).items()
+        }
+
+    # -------------------------------
+    # Loading
+    # -------------------------------
+    def load(self):
+        """
+        Three queries (the week's located days, eligible employee jobs and existing
+        shifts) plus the availability index, which is cached between runs.
+        """
+        days = ScheduleDay.objects.filter(date__range=(self.start, self.end), location__isnull=False)
+        if self.location_ids:
+            days = days.filter(location_id__in=self.location_ids)
+        days = list(days.values_list('id', 'date', 'location_id', 'projected_sales').order_by('date', 'location_id'))
+        location_ids = {location_id for _, _, location_id, _ in days}
+
+        self.candidates = {}  # (location_id, department) -> [Candidate]
+        self.caps = {}  # profile_id -> hours available this week
+        jobs = EmployeeJob.objects.filter(
+            profile__location_id__in=location_ids, job__department__in=list(self.ratios),
+        ).values_list('id', 'profile_id', 'profile__location_id', 'job__department', 'pay_rate',
+                      'profile__max_weekly_hours').order_by('id')
+        for employee_job_id, profile_id, location_id, department, pay_rate, cap in jobs:
+            self.candidates.setdefault((location_id, department), []).append(
+                Candidate(employee_job_id, profile_id, pay_rate)
+            )
+            self.caps[profile_id] = float(cap)
+
+        self.hours = {profile_id: 0.0 for profile_id in self.caps}
+        self.busy = {}  # (profile_id, date) -> (start, end) of the shift worked that day
+        existing = {}  # (day id, department, shift_type) -> count
+        # A day either side is included so rest periods across the week boundary are respected
+        shifts = Shift.objects.filter(
+            Q(day__location_id__in=location_ids) | Q(employee_job__profile__location_id__in=location_ids),
+            day__date__range=(self.start - datetime.timedelta(days=1), self.end + datetime.timedelta(days=1)),
+        ).with_hours().values_list(
+            'day_id', 'day__date', 'employee_job__profile_id', 'employee_job__job__department',
+            'shift_type', 'start_time', 'end_time', 'duration',
+        )
+        for day_id, date, profile_id, department, shift_type, start_time, end_time, duration in shifts:
+            key = (day_id, department, shift_type)
+            existing[key] = existing.get(key, 0) + 1
+            if profile_id is None or start_time is None or end_time is None:
+                continue
+            starts, ends = shift_interval(date, start_time, end_time)
+            if (profile_id, date) in self.busy:
+                worked = self.busy[(profile_id, date)]
+                starts, ends = min(starts, worked[0]), max(ends, worked[1])
+            self.busy[(profile_id, date)] = (starts, ends)
+            if self.start <= date <= self.end:
+                self.hours[profile_id] = self.hours.get(profile_id, 0) + duration.total_seconds() / 3600
+
+        self.slots = []
+        for day_id, date, location_id, sales in days:
+            for department, ratio in self.ratios.items():
+                for shift_type, (start_time, end_time, share) in self.templates.items():
+                    have = existing.get((day_id, department, shift_type), 0)
+                    for section in range(have + 1, staff_needed(sales, share, ratio) + 1):
+                        self.slots.append(Slot(day_id, date, location_id, department, shift_type,
+                                               section, start_time, end_time))
+        self.sales = sum(float(sales) for _, _, _, sales in days)
+
+        # Who is free for each weekday/shift template, from the availability bitmaps
+        availability = get_availability_index()
+        self.free = {}
+        for slot in self.slots:
+            key = (slot.date.weekday(), slot.shift_type)
+            if key not in self.free:
+                self.free[key] = set(availability.free(key[0], slot.start_time, slot.end_time).tolist())
+        return self
+
+    # -------------------------------
+    # Assignment bookkeeping
+    # -------------------------------
+    def can_take(self, candidate, slot):
+        profile_id = candidate.profile_id
+        if (profile_id, slot.date) in self.busy:
+            return False
+        if profile_id not in self.free[(slot.date.weekday(), slot.shift_type)]:
+            return False
+        if self.hours[profile_id] + slot.hours > self.caps[profile_id]:
+            return False
+        before = self.busy.get((profile_id, slot.date - datetime.timedelta(days=1)))
+        after = self.busy.get((profile_id, slot.date + datetime.timedelta(days=1)))
+        return ((before is None or slot.starts - before[1] >= self.rest)
+                and (after is None or after[0] - slot.ends >= self.rest))
+
+    def assign(self, index, candidate):
+        slot = self.slots[index]
+        self.assignment[index] = candidate
+        self.busy[(candidate.profile_id, slot.date)] = (slot.starts, slot.ends)
+        self.day_slot[(candidate.profile_id, slot.date)] = index
+        self.hours[candidate.profile_id] += slot.hours
+
+    def unassign(self, index):
+        slot, candidate = self.slots[index], self.assignment[index]
+        self.assignment[index] = None
+        del self.busy[(candidate.profile_id, slot.date)]
+        del self.day_slot[(candidate.profile_id, slot.date)]
+        self.hours[candidate.profile_id] -= slot.hours
+        return candidate
+
+    def eligible(self, slot):
+        return self.candidates.get((slot.location_id, slot.department), ())
+
+    # -------------------------------
+    # Solving
+    # -------------------------------
+    def greedy(self):
+        self.assignment = [None] * len(self.slots)
+        self.day_slot = {}  # (profile_id, date) -> index of the generated slot they work
+        # Slots with the fewest candidates first, random order among equals
+        order = sorted(range(len(self.slots)),
+                       key=lambda i: (len(self.eligible(self.slots[i])), self.rng.random()))
+        for index in order:
+            slot = self.slots[index]
+            best = None
+            for candidate in self.eligible(slot):
+                if self.can_take(candidate, slot):
+                    key = (self.hours[candidate.profile_id], candidate.pay_rate)
+                    if best is None or key < best[0]:
+                        best = (key, candidate)
+            if best:
+                self.assign(index, best[1])
+
+    def _fill(self, index):
+        """Fill an empty slot directly or by moving its candidate's same-day shift to someone free."""
+        slot = self.slots[index]
+        candidates = list(self.eligible(slot))
+        self.rng.shuffle(candidates)
+        for candidate in candidates:
+            if self.can_take(candidate, slot):
+                self.assign(index, candidate)
+                return True
+        for candidate in candidates:
+            other = self.day_slot.get((candidate.profile_id, slot.date))
+            if other is None:
+                continue
+            other_slot = self.slots[other]
+            self.unassign(other)
+            if not self.can_take(candidate, slot):
+                self.assign(other, candidate)
+                continue
+            for replacement in self.eligible(other_slot):
+                if replacement.profile_id != candidate.profile_id and self.can_take(replacement, other_slot):
+                    self.assign(other, replacement)
+                    self.assign(index, candidate)
+                    return True
+            self.assign(other, candidate)
+        return False
+
+    def _cheapen(self, index):
+        """Hand a filled slot to a cheaper eligible employee who is free that day."""
+        slot = self.slots[index]
+        current = self.assignment[index]
+        cheaper = [c for c in self.eligible(slot) if c.pay_rate < current.pay_rate and self.can_take(c, slot)]
+        if not cheaper:
+            return False
+        self.unassign(index)
+        self.assign(index, self.rng.choice(cheaper))
+        return True
+
+    def local_search(self):
+        iterations = self.iterations if self.iterations is not None else 20 * len(self.slots)
+        for _ in range(iterations):
+            if not self.slots:
+                break
+            index = self.rng.randrange(len(self.slots))
+            if self.assignment[index] is None:
+                self._fill(index)
+            else:
+                self._cheapen(index)
+
+    def solve(self):
+        self.load()
+        self.greedy()
+        self.greedy_objective = self.objective()
+        self.local_search()
+        return self
+
+    # -------------------------------
+    # Results
+    # -------------------------------
+    def objective(self):
+        filled = [(slot, candidate) for slot, candidate in zip(self.slots, self.assignment) if candidate]
+        cost = sum(slot.hours * candidate.pay_rate for slot, candidate in filled)
+        unfilled = len(self.slots) - len(filled)
+        return {
+            'slots': len(self.slots),
+            'filled': len(filled),
+            'unfilled': unfilled,
+            'hours': round(sum(slot.hours for slot, _ in filled), 2),
+            'cost': round(cost, 2),
+            'labor_pct': round(cost / self.sales * 100, 2) if self.sales else None,
+            'score': round(unfilled * UNFILLED_PENALTY + cost, 2),
+        }
+
+    def shifts(self):
+        return [
+            Shift(day_id=slot.day, employee_job_id=candidate.employee_job_id, shift_type=slot.shift_type,
+                  section_number=slot.section_number, start_time=slot.start_time, end_time=slot.end_time)
+            for slot, candidate in zip(self.slots, self.assignment) if candidate
+        ]
+
+    def save(self):
+        """Insert the generated shifts in one bulk write."""
+        with transaction.atomic():
+            sequence = SyncSequence.take()
+            shifts = self.shifts()
+            for shift in shifts:
+                shift.sync_seq = sequence
+            shifts = Shift.objects.bulk_create(shifts)
+        # bulk_create skips the Shift signals, so invalidate the labor cache and calendar feeds explicitly
+        invalidate_labor([self.start])
+        invalidate_feeds((candidate.profile_id, slot.date)
+                         for slot, candidate in zip(self.slots, self.assignment) if candidate)
+        schedule_bulk_changed.send(sender=Shift, days={(slot.date, slot.location_id)
+                                                       for slot, candidate in zip(self.slots, self.assignment)
+                                                       if candidate})
+        return shifts
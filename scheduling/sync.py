@@ -0,0 +1,200 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, IntegerField, Q, Value
+from django.utils import timezone
+
+from .models import ScheduleDay, ScheduleTombstone, Shift, SyncSequence
+
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+# Change kinds, in the order they sort within one sequence number
+DAY, SHIFT, DELETED = 0, 1, 2
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+# Tombstones outlive the cursors that could need them by this much, in case a long transaction
+# stamped its tombstone before a cursor was issued and committed after
+PRUNE_MARGIN = datetime.timedelta(days=1)
+
+
+class SyncCursorError(ValueError):
+    pass
+
+
+class SyncResetRequired(Exception):
+    """The cursor is older than the tombstones kept, so deletes may have been missed: resync from scratch."""
+
+
+# -------------------------------
+# Cursors
+# -------------------------------
+def encode_cursor(sequence, kind, pk, issued_at):
+    # The issue time only decides expiry; integer microseconds, as a float would not round-trip exactly
+    return f"{sequence}-{kind}-{pk}-{(issued_at - EPOCH) // MICROSECOND}"
+
+
+def decode_cursor(cursor):
+    """(sequence, kind, pk, issued_at) of a cursor from encode_cursor, or None for a client that has nothing yet."""
+    if not cursor:
+        return None
+    try:
+        sequence, kind, pk, micros = (int(part) for part in cursor.split('-'))
+    except ValueError:
+        raise SyncCursorError("Malformed cursor.")
+    if kind not in (DAY, SHIFT, DELETED):
+        raise SyncCursorError("Malformed cursor.")
+    return sequence, kind, pk, EPOCH + micros * MICROSECOND
+
+
+def _after(kind, position):
+    """
+    Rows of one kind that sort after the cursor on (sync_seq, kind, id). The kind is fixed
+    per table, so each side of the union stays a plain range on its own sync_seq index.
+    """
+    if position is None:
+        return Q()
+    sequence, cursor_kind, pk, _ = position
+    if kind > cursor_kind:
+        return Q(sync_seq__gte=sequence)
+    if kind < cursor_kind:
+        return Q(sync_seq__gt=sequence)
+    return Q(sync_seq__gt=sequence) | Q(sync_seq=sequence, pk__gt=pk)
+
+
+# -------------------------------
+# Recording deletes and moves
+# -------------------------------
+def record_tombstone(kind, object_id, location_id=None):
+    ScheduleTombstone.objects.create(kind=kind, object_id=object_id, location_id=location_id,
+                                     sync_seq=SyncSequence.take())
+
+
+def record_moves(kind, moves):
+    """
+    Tombstone rows for the location they left, given (object_id, old location id, new location id)
+    triples; returns whether any row changed location. Earlier move tombstones at the location a
+    row arrives at are dropped, since the restamped row supersedes them. Call inside the transaction.
+    """
+    left, arrived = {}, {}
+    for object_id, old, new in moves:
+        if old != new:
+            if old is not None:
+                left.setdefault(old, []).append(object_id)
+            if new is not None:
+                arrived.setdefault(new, []).append(object_id)
+    for location_id, object_ids in arrived.items():
+        ScheduleTombstone.objects.filter(kind=kind, moved=True, location_id=location_id,
+                                         object_id__in=object_ids).delete()
+    if left:
+        sequence = SyncSequence.take()
+        ScheduleTombstone.objects.bulk_create(
+            ScheduleTombstone(kind=kind, object_id=object_id, location_id=location_id, moved=True, sync_seq=sequence)
+            for location_id, object_ids in left.items() for object_id in object_ids
+        )
+    return bool(left or arrived)
+
+
+def move_company_shifts(shifts, old_location_id, new_location_id):
+    """
+    Shifts on company-wide days belong to their employee's location. When that changes, tombstone
+    them for the old location and restamp them so the new location's clients fetch them.
+    """
+    with transaction.atomic():
+        shift_ids = list(shifts.filter(day__location__isnull=True).values_list('id', flat=True))
+        if record_moves(ScheduleTombstone.SHIFT, [(pk, old_location_id, new_location_id) for pk in shift_ids]):
+            Shift.objects.filter(pk__in=shift_ids).update(sync_seq=SyncSequence.take(), updated_at=timezone.now())
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones past SCHEDULING_TOMBSTONE_DAYS (and PRUNE_MARGIN); returns how many."""
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=settings.SCHEDULING_TOMBSTONE_DAYS) - PRUNE_MARGIN
+    return ScheduleTombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
+
+
+# -------------------------------
+# Deltas
+# -------------------------------
+def _changes(position, location_id, limit):
+    """(sync_seq, kind, id) of the next `limit` changes after `position`: one UNION query."""
+    days = ScheduleDay.objects.filter(_after(DAY, position))
+    shifts = Shift.objects.filter(_after(SHIFT, position))
+    deleted = ScheduleTombstone.objects.filter(_after(DELETED, position))
+    if location_id:
+        days = days.filter(location_id=location_id)
+        shifts = shifts.at_location(location_id)
+        deleted = deleted.filter(Q(location_id=location_id) | Q(location__isnull=True))
+    else:
+        # Rows that only changed location are still there for a client that sees every location
+        deleted = deleted.filter(moved=False)
+
+    # Annotations only, added in the same order, so the three SELECT lists line up
+    def keys(queryset, kind):
+        return queryset.annotate(change_seq=F('sync_seq'), change_kind=Value(kind, output_field=IntegerField()),
+                                 change_id=F('pk')).values_list('change_seq', 'change_kind', 'change_id')
+
+    parts = [keys(days, DAY), keys(shifts, SHIFT), keys(deleted, DELETED)]
+    if connection.features.supports_slicing_ordering_in_compound:
+        # Let each index stop early instead of unioning every change since the cursor
+        parts = [part.order_by('change_seq', 'change_id')[:limit] for part in parts]
+    return list(parts[0].union(*parts[1:], all=True).order_by('change_seq', 'change_kind', 'change_id')[:limit])
+
+
+def _shift_row(shift):
+    return {
+        'id': shift['id'],
+        'day_id': shift['day_id'],
+        'date': shift['day__date'],
+        'location_id': shift['location_key'],
+        'employee_job_id': shift['employee_job_id'],
+        'profile_id': shift['employee_job__profile_id'],
+        'employee': shift['employee_job__profile__user__username'],
+        'job': shift['employee_job__job__title'],
+        'shift_type': shift['shift_type'],
+        'section_number': shift['section_number'],
+        'start': shift['start_time'].strftime('%H:%M') if shift['start_time'] else None,
+        'end': shift['end_time'].strftime('%H:%M') if shift['end_time'] else None,
+        'updated_at': shift['updated_at'],
+    }
+
+
+def schedule_delta(cursor=None, location_id=None, limit=SYNC_PAGE_SIZE, now=None):
+    """
+    Days, shifts and deletions changed after `cursor`, in commit order, at most `limit` of
+    them, with the cursor to ask from next. A client that is up to date costs the one UNION
+    query; a page with changes adds one query per kind present.
+
+    Changes are ordered by their SyncSequence number rather than a timestamp, so a slow
+    transaction can't commit rows behind a cursor that was already handed out.
+    """
+    position = decode_cursor(cursor)
+    now = now or timezone.now()
+    if position and position[3] < now - datetime.timedelta(days=settings.SCHEDULING_TOMBSTONE_DAYS):
+        raise SyncResetRequired
+    limit = max(1, min(limit, MAX_SYNC_PAGE_SIZE))
+    changes = _changes(position, location_id, limit)
+
+    ids = {DAY: [], SHIFT: [], DELETED: []}
+    for _, kind, pk in changes:
+        ids[kind].append(pk)
+    days = shifts = deleted = []
+    if ids[DAY]:
+        days = list(ScheduleDay.objects.filter(pk__in=ids[DAY]).values(
+            'id', 'date', 'location_id', 'projected_sales', 'updated_at').order_by('sync_seq', 'id'))
+    if ids[SHIFT]:
+        shifts = [_shift_row(shift) for shift in Shift.objects.filter(pk__in=ids[SHIFT]).with_location().values(
+            'id', 'day_id', 'day__date', 'location_key', 'employee_job_id', 'employee_job__profile_id',
+            'employee_job__profile__user__username', 'employee_job__job__title', 'shift_type', 'section_number',
+            'start_time', 'end_time', 'updated_at',
+        ).order_by('sync_seq', 'id')]
+    if ids[DELETED]:
+        deleted = list(ScheduleTombstone.objects.filter(pk__in=ids[DELETED]).values(
+            'kind', 'object_id', 'deleted_at').order_by('sync_seq', 'id'))
+
+    return {
+        'days': days,
+        'shifts': shifts,
+        'deleted': deleted,
+        'cursor': encode_cursor(*(changes[-1] if changes else position[:3]), now) if changes or position else None,
+        'has_more': len(changes) == limit,
+    }
@@ -1,3 +1,1272 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Location
+from jobs.models import JobBase, EmployeeJob
+from scheduling.models import (
+    Availability, Kiosk, NotificationDelivery, PublishNotification, SalesHistory, ScheduleDay, ScheduleFeed,
+    ScheduleTemplate, ScheduleTombstone, Shift, TimePunch,
+)
+from scheduling.availability import (
+    get_availability_index, mask_windows, suggest_fill_ins, window_mask, windows_mask,
+)
+from scheduling.copying import CopyError, apply_template, copy_week, save_template
+from scheduling.conflicts import find_conflicts, week_conflicts
+from scheduling.feeds import _fold, feed_events, feed_window
+from scheduling.forecast import ForecastError, fit_forecast, forecast_sales, quarter_bounds, score_forecast
+from scheduling.hours import hours_by
+from scheduling.labor import build_labor_plan, get_labor_plan, get_week_labor
+from scheduling.notifications import MAX_DELIVERY_ATTEMPTS, claim_due_notification, send_pending_notifications
+from scheduling.payroll import PayrollError, employee_totals, payroll_rows
+from scheduling.punches import (
+    SEEN_INTERVAL, ingest_punches, kiosk_cache_key, match_intervals, punch_variance, worked_intervals,
+)
+from scheduling.publishing import PublishError, publish_week, rollback_week
+from scheduling.solver import ScheduleSolver
+from scheduling.sync import prune_tombstones, schedule_delta
+from scheduling.weekly import group_week, week_dates, week_shifts, week_start
+
+User = get_user_model()
+
+
+def employee_job(username, job, location=None, **fields):
+    """An EmployeeJob for a new user with a matching email address and home `location`."""
+    profile = User.objects.create_user(username=username, email=f"{username}@email.com", password="x").profile
+    profile.location = location
+    profile.save()
+    return EmployeeJob.objects.create(profile=profile, job=job, **fields)
+
+
+class WeeklyScheduleTests(TestCase):
+    def setUp(self):
+        self.monday = datetime.date(2025, 3, 3)
+        self.downtown = Location.objects.create(name="Downtown")
+        self.uptown = Location.objects.create(name="Uptown")
+        self.job = JobBase.objects.create(title="Server", department="FOH")
+        self.user = User.objects.create_user(username="manager", email="manager@email.com", password="testpass123")
+        self.client.login(username="manager", password="testpass123")
+        self.days = [ScheduleDay.objects.create(date=date) for date in week_dates(self.monday)]
+
+    def _shift(self, employee_job, day=0, section=1, start="09:00", end="17:00"):
+        return Shift.objects.create(
+            day=self.days[day], employee_job=employee_job, shift_type="AM", section_number=section,
+            start_time=start, end_time=end,
+        )
+
+    def _schedule_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("weekly_schedule"), {"week": "2025-03-05"})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_shifts(self):
+        self._shift(employee_job("a", self.job, self.downtown, is_primary=True))
+        self._shift(employee_job("b", self.job, self.uptown, is_primary=True), day=3)
+        self._schedule_queries()  # warm the navigation training status cache
+        few = self._schedule_queries()
+
+        for i in range(18):
+            location = self.downtown if i % 2 else self.uptown
+            self._shift(employee_job(f"emp{i}", self.job, location, is_primary=True), day=i % 7, section=i % 3 + 1)
+        self.assertEqual(self._schedule_queries(), few)
+        with self.assertNumQueries(1):
+            group_week(week_shifts(self.monday), week_dates(self.monday))
+
+    def test_shifts_are_grouped_by_location_day_and_section(self):
+        alice = employee_job("alice", self.job, self.downtown, is_primary=True)
+        bob = employee_job("bob", self.job, self.uptown, is_primary=True)
+        self._shift(alice, day=0, section=2)
+        self._shift(bob, day=0, section=1)
+        self._shift(alice, day=2, section=1)
+        Shift.objects.create(day=self.days[0], shift_type="PM", start_time="17:00", end_time="22:00")
+
+        schedule = group_week(week_shifts(self.monday), week_dates(self.monday))
+        self.assertEqual([loc['location'] for loc in schedule], ["Downtown", "Uptown", "Unassigned"])
+        downtown = schedule[0]['days']
+        self.assertEqual(len(downtown), 7)
+        self.assertEqual([section['number'] for section in downtown[0]['sections']], [2])
+        self.assertEqual([section['number'] for section in downtown[2]['sections']], [1])
+        self.assertEqual(downtown[1]['sections'], [])
+
+        only_uptown = group_week(week_shifts(self.monday, self.uptown.pk), week_dates(self.monday))
+        self.assertEqual([loc['location'] for loc in only_uptown], ["Uptown"])
+
+    def test_week_start_is_monday(self):
+        self.assertEqual(week_start(datetime.date(2025, 3, 9)), self.monday)
+        self.assertEqual(week_start(self.monday), self.monday)
+
+    def test_unassigned_shift_str_and_hours(self):
+        shift = Shift.objects.create(day=self.days[0], shift_type="PM", start_time="22:00", end_time="02:00")
+        self.assertEqual(str(shift), "Unassigned - PM (2025-03-03)")
+        self.assertEqual(Shift.objects.get(pk=shift.pk).hours, 4)
+        self.assertEqual(Shift(day=self.days[0]).hours, 0)
+
+
+class ShiftHoursTests(TestCase):
+    def setUp(self):
+        self.downtown = Location.objects.create(name="Downtown")
+        self.uptown = Location.objects.create(name="Uptown")
+        self.server = JobBase.objects.create(title="Server", department="FOH")
+        self.cook = JobBase.objects.create(title="Cook", department="BOH")
+        self.day = ScheduleDay.objects.create(date=datetime.date(2025, 3, 3))
+        self.next_day = ScheduleDay.objects.create(date=datetime.date(2025, 3, 4))
+        self.staff = User.objects.create_user(username="boss", email="boss@email.com", password="testpass123",
+                                              is_staff=True)
+        self.client.login(username="boss", password="testpass123")
+
+    def test_duration_matches_python_property(self):
+        cases = [
+            ("09:00", "17:00"), ("22:00", "02:00"), ("23:30", "00:15"), ("00:00", "00:00"),
+            ("18:45", "23:59"), ("12:00", "11:45"),
+        ]
+        for start, end in cases:
+            Shift.objects.create(day=self.day, start_time=start, end_time=end)
+        Shift.objects.create(day=self.day, start_time="09:00")
+
+        for shift in Shift.objects.with_related().with_hours():
+            expected = shift.hours
+            actual = round(shift.duration.total_seconds() / 3600, 2) if shift.duration is not None else 0
+            self.assertEqual(actual, expected, (shift.start_time, shift.end_time))
+
+    def test_hours_grouped_in_one_query(self):
+        alice = employee_job("alice", self.server, self.downtown)
+        bob = employee_job("bob", self.cook, self.uptown)
+        Shift.objects.create(day=self.day, employee_job=alice, start_time="09:00", end_time="17:00")
+        Shift.objects.create(day=self.next_day, employee_job=alice, start_time="22:00", end_time="02:30")
+        Shift.objects.create(day=self.day, employee_job=bob, start_time="06:00", end_time="10:00")
+
+        with self.assertNumQueries(1):
+            rows = hours_by('employee', self.day.date, self.next_day.date)
+        self.assertEqual([(r['username'], r['shifts'], r['hours']) for r in rows],
+                         [("alice", 2, 12.5), ("bob", 1, 4.0)])
+
+        response = self.client.get(reverse("shift_hours", args=["department"]),
+                                   {"start": "2025-03-03", "end": "2025-03-03"})
+        self.assertEqual({r['department']: r['hours'] for r in response.json()['rows']}, {"BOH": 4.0, "FOH": 8.0})
+
+        response = self.client.get(reverse("shift_hours", args=["location"]),
+                                   {"start": "2025-03-01", "end": "2025-03-31", "location": self.downtown.pk})
+        self.assertEqual(response.json()['rows'], [
+            {'location_id': self.downtown.pk, 'location': "Downtown", 'shifts': 2, 'hours': 12.5},
+        ])
+
+    def test_bad_filters_are_rejected(self):
+        url = reverse("shift_hours", args=["employee"])
+        self.assertEqual(self.client.get(url, {"start": "2025-03-05", "end": "2025-03-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"start": "nope", "end": "2025-03-01"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("shift_hours", args=["shoe"]),
+                                         {"start": "2025-03-01", "end": "2025-03-02"}).status_code, 400)
+
+
+class LaborPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.downtown = Location.objects.create(name="Downtown")
+        self.uptown = Location.objects.create(name="Uptown")
+        self.server = JobBase.objects.create(title="Server", department="FOH")
+        self.cook = JobBase.objects.create(title="Cook", department="BOH")
+        self.monday = datetime.date(2025, 3, 3)
+        self.downtown_day = ScheduleDay.objects.create(date=self.monday, location=self.downtown,
+                                                       projected_sales=1000)
+        self.uptown_day = ScheduleDay.objects.create(date=self.monday, location=self.uptown, projected_sales=500)
+        self.alice = employee_job("alice", self.server, self.downtown, pay_rate=10)
+        self.bob = employee_job("bob", self.cook, self.downtown, pay_rate=20)
+        self.carol = employee_job("carol", self.server, self.uptown, pay_rate=15)
+
+    def _shift(self, day, employee_job, start, end):
+        return Shift.objects.create(day=day, employee_job=employee_job, start_time=start, end_time=end)
+
+    def test_cost_and_labor_percent_per_location_and_department(self):
+        self._shift(self.downtown_day, self.alice, "09:00", "17:00")  # 8h x 10
+        self._shift(self.downtown_day, self.bob, "22:00", "02:00")  # 4h x 20, overnight
+        self._shift(self.uptown_day, self.carol, "10:00", "14:00")  # 4h x 15
+
+        with self.assertNumQueries(3):
+            plan = build_labor_plan(self.monday, self.monday + datetime.timedelta(days=6))
+        monday = plan.days()[0]
+        self.assertEqual((monday['hours'], monday['cost'], monday['sales'], monday['labor_pct']),
+                         (16.0, 220.0, 1500.0, 14.67))
+        downtown, uptown = monday['locations']
+        self.assertEqual((downtown['cost'], downtown['labor_pct']), (160.0, 16.0))
+        self.assertEqual(downtown['departments']['BOH'], {'hours': 4.0, 'cost': 80.0, 'labor_pct': 8.0})
+        self.assertEqual((uptown['cost'], uptown['labor_pct']), (60.0, 12.0))
+        self.assertIsNone(plan.days()[1]['labor_pct'])
+
+    def test_what_if_matches_a_rebuild(self):
+        keep = self._shift(self.downtown_day, self.alice, "09:00", "17:00")
+        drop = self._shift(self.downtown_day, self.bob, "12:00", "18:00")
+        plan = get_week_labor(self.monday)
+
+        extra = Shift(day=self.uptown_day, employee_job=self.carol,
+                      start_time=datetime.time(17, 0), end_time=datetime.time(23, 30))
+        with self.assertNumQueries(0):
+            edited = plan.what_if(add=[extra], remove=[drop.pk])
+
+        drop.delete()
+        extra.save()
+        rebuilt = build_labor_plan(self.monday, self.monday + datetime.timedelta(days=6))
+        self.assertEqual(edited.days(), rebuilt.days())
+        self.assertEqual(plan.days()[0]['cost'], 200.0)  # the cached plan is untouched
+        self.assertIn(keep.pk, edited.shifts)
+
+    def test_week_cache_is_invalidated_by_shift_writes(self):
+        shift = self._shift(self.downtown_day, self.alice, "09:00", "17:00")
+        self.assertEqual(get_week_labor(self.monday).totals()['cost'], 80.0)
+        with self.assertNumQueries(0):
+            get_week_labor(self.monday)
+
+        shift.end_time = datetime.time(13, 0)
+        shift.save()
+        self.assertEqual(get_week_labor(self.monday).totals()['cost'], 40.0)
+
+        self.alice.pay_rate = 12
+        self.alice.save()
+        self.assertEqual(get_week_labor(self.monday).totals()['cost'], 48.0)
+
+    def test_week_cache_is_invalidated_by_department_changes(self):
+        self._shift(self.downtown_day, self.alice, "09:00", "17:00")
+        self.assertIn('FOH', get_week_labor(self.monday).days()[0]['locations'][0]['departments'])
+        self.server.department = "BOH"
+        self.server.save()
+        departments = get_week_labor(self.monday).days()[0]['locations'][0]['departments']
+        self.assertEqual((list(departments), departments['BOH']['cost']), (['BOH'], 80.0))
+
+    def test_range_spanning_weeks(self):
+        sunday = ScheduleDay.objects.create(date=self.monday - datetime.timedelta(days=1), location=self.downtown,
+                                            projected_sales=400)
+        self._shift(sunday, self.alice, "10:00", "18:00")
+        self._shift(self.downtown_day, self.alice, "09:00", "17:00")
+
+        plan = get_labor_plan(sunday.date, self.monday)
+        self.assertEqual([day['date'] for day in plan.days()], [sunday.date, self.monday])
+        self.assertEqual(plan.totals()['cost'], 160.0)
+        self.assertEqual(plan.days()[0]['labor_pct'], 20.0)
+        self.assertEqual(plan.days(), build_labor_plan(sunday.date, self.monday).days())
+
+
+@override_settings(
+    SCHEDULING_STAFFING_RATIOS={'FOH': {'sales_per_staff': 500, 'minimum': 1}, 'BOH': {'sales_per_staff': 0, 'minimum': 1}},
+    SCHEDULING_SHIFT_TEMPLATES={'AM': {'start': '08:00', 'end': '16:00', 'sales_share': 0.5},
+                                'PM': {'start': '16:00', 'end': '00:00', 'sales_share': 0.5}},
+)
+class ScheduleSolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.monday = datetime.date(2025, 3, 3)
+        self.location = Location.objects.create(name="Downtown")
+        self.server = JobBase.objects.create(title="Server", department="FOH")
+        self.cook = JobBase.objects.create(title="Cook", department="BOH")
+        self.days = [
+            ScheduleDay.objects.create(date=self.monday + datetime.timedelta(days=d), location=self.location,
+                                       projected_sales=1500 if d < 5 else 2500)
+            for d in range(7)
+        ]
+        self.servers = [employee_job(f"server{i}", self.server, self.location, pay_rate=15 + i) for i in range(8)]
+        self.cooks = [employee_job(f"cook{i}", self.cook, self.location, pay_rate=18) for i in range(3)]
+
+    def test_fills_demand_within_caps(self):
+        solver = ScheduleSolver(self.monday, seed=3).solve()
+        result = solver.objective()
+        # FOH: 2 per shift on weekdays, 3 on weekends; BOH: 1 per shift
+        self.assertEqual(result['slots'], 5 * 2 * 2 + 2 * 2 * 3 + 7 * 2)
+        self.assertEqual(result['unfilled'], 0)
+        self.assertLessEqual(result['score'], solver.greedy_objective['score'])
+
+        solver.save()
+        shifts = list(Shift.objects.with_related().filter(day__in=self.days))
+        self.assertEqual(len(shifts), result['slots'])
+        worked = {}
+        for shift in shifts:
+            key = (shift.employee_job.profile_id, shift.day.date)
+            self.assertNotIn(key, worked)
+            worked[key] = shift.hours
+        for profile_id in {profile_id for profile_id, _ in worked}:
+            self.assertLessEqual(sum(h for (p, _), h in worked.items() if p == profile_id), 40)
+        self.assertEqual(week_conflicts(self.monday), [])
+
+    def test_same_seed_gives_same_schedule(self):
+        def plan(seed):
+            solver = ScheduleSolver(self.monday, seed=seed).solve()
+            return [(s.day_id, s.employee_job_id, s.shift_type, s.section_number) for s in solver.shifts()]
+        self.assertEqual(plan(7), plan(7))
+
+    def test_existing_shifts_count_toward_demand(self):
+        Shift.objects.create(day=self.days[0], employee_job=self.cooks[0], shift_type="AM",
+                             start_time="08:00", end_time="16:00")
+        solver = ScheduleSolver(self.monday, seed=1).solve()
+        monday_cook = [s for s in solver.shifts() if s.day_id == self.days[0].pk and s.employee_job_id in
+                       {c.pk for c in self.cooks}]
+        self.assertEqual([s.shift_type for s in monday_cook], ["PM"])
+        self.assertNotEqual(monday_cook[0].employee_job_id, self.cooks[0].pk)
+
+    def test_unfillable_slots_are_reported_and_save_invalidates_labor(self):
+        EmployeeJob.objects.filter(job=self.cook).delete()
+        self.assertEqual(get_week_labor(self.monday).totals()['hours'], 0)
+        solver = ScheduleSolver(self.monday, seed=1).solve()
+        self.assertEqual(solver.objective()['unfilled'], 14)
+        # The insert and the calendar feed version bump, plus the savepoint and the sync sequence number
+        with self.assertNumQueries(6):
+            solver.save()
+        self.assertEqual(get_week_labor(self.monday).totals()['hours'], solver.objective()['hours'])
+
+
+class ShiftConflictTests(TestCase):
+    def setUp(self):
+        self.monday = datetime.date(2025, 3, 3)
+        self.days = [ScheduleDay.objects.create(date=self.monday + datetime.timedelta(days=d)) for d in range(-1, 8)]
+        self.job = JobBase.objects.create(title="Server", department="FOH")
+        self.other_job = JobBase.objects.create(title="Host", department="FOH")
+        profile = User.objects.create_user(username="alice", email="alice@email.com", password="x").profile
+        self.server = EmployeeJob.objects.create(profile=profile, job=self.job)
+        self.host = EmployeeJob.objects.create(profile=profile, job=self.other_job)
+        bob = User.objects.create_user(username="bob", email="bob@email.com", password="x").profile
+        self.bob = EmployeeJob.objects.create(profile=bob, job=self.job)
+
+    def _shift(self, day, start, end, employee_job=None):
+        # day 0 is the Monday; -1 is the Sunday before
+        return Shift.objects.create(day=self.days[day + 1], employee_job=employee_job or self.server,
+                                    start_time=start, end_time=end)
+
+    def test_sweep_finds_overlaps_and_short_rest(self):
+        at = datetime.datetime
+        intervals = [
+            (1, 7, at(2025, 3, 3, 9), at(2025, 3, 3, 17)),
+            (2, 7, at(2025, 3, 3, 16), at(2025, 3, 3, 20)),
+            (3, 7, at(2025, 3, 4, 2), at(2025, 3, 4, 6)),
+            (4, 7, at(2025, 3, 4, 20), at(2025, 3, 5, 2)),
+            (5, 8, at(2025, 3, 3, 10), at(2025, 3, 3, 12)),
+        ]
+        conflicts = find_conflicts(intervals, rest_hours=8)
+        self.assertEqual([(c['type'], c['shift_ids'], c['hours']) for c in conflicts],
+                         [('overlap', [1, 2], 1.0), ('rest', [2, 3], 6.0)])
+
+    def test_overnight_shift_overlaps_next_morning_across_jobs(self):
+        night = self._shift(0, "22:00", "04:00")
+        morning = self._shift(1, "03:00", "09:00", employee_job=self.host)
+        self._shift(1, "03:00", "09:00", employee_job=self.bob)
+        with self.assertNumQueries(1):
+            conflicts = week_conflicts(self.monday)
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0]['type'], 'overlap')
+        self.assertEqual(conflicts[0]['shift_ids'], [night.pk, morning.pk])
+        self.assertEqual(conflicts[0]['employee'], "alice")
+
+    def test_rest_across_the_week_boundary(self):
+        self._shift(-1, "17:00", "23:30")
+        monday = self._shift(0, "06:00", "12:00")
+        self._shift(7, "09:00", "17:00")  # next Monday, outside the week and far from its neighbours
+        conflicts = week_conflicts(self.monday)
+        self.assertEqual([(c['type'], c['shift_ids'][1], c['hours']) for c in conflicts], [('rest', monday.pk, 6.5)])
+
+    def test_clean_rejects_conflicting_shift(self):
+        self._shift(0, "09:00", "17:00")
+        shift = Shift(day=self.days[1], employee_job=self.host, start_time=datetime.time(12), end_time=datetime.time(18))
+        with self.assertRaises(ValidationError):
+            shift.clean()
+        Shift(day=self.days[2], employee_job=self.host, start_time=datetime.time(9),
+              end_time=datetime.time(17)).clean()
+
+    def test_weekly_view_and_endpoint_flag_conflicts(self):
+        first = self._shift(0, "09:00", "17:00")
+        second = self._shift(0, "20:00", "23:00", employee_job=self.host)
+        User.objects.create_user(username="boss", email="boss@email.com", password="testpass123", is_staff=True)
+        self.client.login(username="boss", password="testpass123")
+
+        response = self.client.get(reverse("weekly_schedule"), {"week": "2025-03-03"})
+        self.assertEqual(response.context['conflict_ids'], {first.pk, second.pk})
+        response = self.client.get(reverse("shift_conflicts"), {"week": "2025-03-05"})
+        self.assertEqual([c['type'] for c in response.json()['conflicts']], ['rest'])
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tuesday = datetime.date(2025, 3, 4)
+        self.location = Location.objects.create(name="Downtown")
+        self.elsewhere = Location.objects.create(name="Uptown")
+        self.server = JobBase.objects.create(title="Server", department="FOH")
+        self.cook = JobBase.objects.create(title="Cook", department="BOH")
+        self.day = ScheduleDay.objects.create(date=self.tuesday, location=self.location)
+        self.evenings = self._available("evenings", self.server, [(datetime.time(16), datetime.time(0))])
+        self.mornings = self._available("mornings", self.server, [(datetime.time(6), datetime.time(14))])
+        self.anytime = self._available("anytime", self.server, None)
+        self.cook_job = self._available("cook", self.cook, None)
+        self.far_away = self._available("far", self.server, None, location=self.elsewhere)
+
+    def _available(self, username, job, tuesday, location=None):
+        assignment = employee_job(username, job, location or self.location, pay_rate=15)
+        if tuesday is not None:
+            availability = Availability(profile=assignment.profile)
+            availability.set_mask(1, windows_mask(tuesday))
+            availability.save()
+        return assignment
+
+    def test_window_masks(self):
+        today, tomorrow = window_mask(datetime.time(22), datetime.time(2))
+        self.assertEqual(bin(today).count('1'), 8)
+        self.assertEqual(tomorrow, 0b11111111)
+        self.assertEqual(window_mask(datetime.time(9, 10), datetime.time(9, 50))[0], 0b1111 << 36)
+        mask = windows_mask([(datetime.time(6), datetime.time(14)), (datetime.time(18), datetime.time(0))])
+        self.assertEqual(mask_windows(mask), [(datetime.time(6), datetime.time(14)), (datetime.time(18), datetime.time(0))])
+
+    def test_free_and_qualified(self):
+        with self.assertNumQueries(2):
+            index = get_availability_index()
+        with self.assertNumQueries(0):
+            free = index.free(1, datetime.time(17), datetime.time(22), self.server.pk, self.location.pk)
+        self.assertEqual(sorted(free.tolist()), sorted([self.evenings.profile_id, self.anytime.profile_id]))
+        # Overnight into Wednesday: "evenings" has no row for Wednesday, so the default full day applies
+        free = index.free(1, datetime.time(20), datetime.time(1), self.server.pk)
+        self.assertEqual(sorted(free.tolist()),
+                         sorted([self.evenings.profile_id, self.anytime.profile_id, self.far_away.profile_id]))
+
+        availability = Availability.objects.get(profile_id=self.evenings.profile_id)
+        availability.set_mask(1, 0)
+        availability.save()
+        free = get_availability_index().free(1, datetime.time(17), datetime.time(22), self.server.pk, self.location.pk)
+        self.assertEqual(free.tolist(), [self.anytime.profile_id])
+
+    def test_suggest_fill_ins_skips_busy_and_ranks_by_hours(self):
+        Shift.objects.create(day=self.day, employee_job=self.anytime, start_time="10:00", end_time="15:00")
+        suggestions = suggest_fill_ins(self.tuesday, datetime.time(16), datetime.time(22), self.server.pk, self.location.pk)
+        # "anytime" would only get one hour of rest
+        self.assertEqual([s['name'] for s in suggestions], ["evenings"])
+
+        monday = ScheduleDay.objects.create(date=self.tuesday - datetime.timedelta(days=1), location=self.location)
+        Shift.objects.create(day=monday, employee_job=self.evenings, start_time="08:00", end_time="12:00")
+        suggestions = suggest_fill_ins(self.tuesday, datetime.time(20), datetime.time(23), self.server.pk)
+        self.assertEqual([(s['name'], s['week_hours']) for s in suggestions],
+                         [("far", 0), ("evenings", 4.0)])
+
+    def test_fill_in_view_for_existing_shift(self):
+        shift = Shift.objects.create(day=self.day, employee_job=self.evenings, start_time="17:00", end_time="21:00")
+        User.objects.create_user(username="boss", email="boss@email.com", password="testpass123", is_staff=True)
+        self.client.login(username="boss", password="testpass123")
+        response = self.client.get(reverse("fill_ins"), {"shift": shift.pk})
+        self.assertEqual([s['profile_id'] for s in response.json()['suggestions']], [self.anytime.profile_id])
+        self.assertEqual(self.client.get(reverse("fill_ins"), {"date": "2025-03-04"}).status_code, 400)
+
+    @override_settings(
+        SCHEDULING_STAFFING_RATIOS={'FOH': {'sales_per_staff': 0, 'minimum': 1}},
+        SCHEDULING_SHIFT_TEMPLATES={'AM': {'start': '07:00', 'end': '13:00'}, 'PM': {'start': '17:00', 'end': '23:00'}},
+    )
+    def test_solver_only_uses_available_employees(self):
+        self.anytime.delete()
+        self.far_away.delete()
+        solver = ScheduleSolver(self.tuesday, seed=0).solve()
+        assigned = {s.shift_type: s.employee_job_id for s in solver.shifts() if s.day_id == self.day.pk}
+        self.assertEqual(assigned, {'AM': self.mornings.pk, 'PM': self.evenings.pk})
+
+
+class CopyWeekTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.monday = datetime.date(2025, 3, 3)
+        self.location = Location.objects.create(name="Downtown")
+        self.job = JobBase.objects.create(title="Server", department="FOH")
+        self.days = [ScheduleDay.objects.create(date=self.monday + datetime.timedelta(days=d), location=self.location)
+                     for d in range(7)]
+        self.employees = []
+        for i in range(4):
+            self.employees.append(employee_job(f"emp{i}", self.job))
+
+    def _fill_week(self, per_day):
+        Shift.objects.bulk_create(
+            Shift(day=day, employee_job=self.employees[i % 4], shift_type="AM", section_number=i + 1,
+                  start_time=datetime.time(6 + i % 4 * 4), end_time=datetime.time(9 + i % 4 * 4))
+            for day in self.days for i in range(per_day)
+        )
+
+    def test_copy_week_query_count_does_not_grow(self):
+        self._fill_week(1)
+        with CaptureQueriesContext(connection) as small:
+            copy_week(self.monday, self.monday + datetime.timedelta(weeks=1))
+        self._fill_week(3)
+        with CaptureQueriesContext(connection) as large:
+            result = copy_week(self.monday, self.monday + datetime.timedelta(weeks=2))
+        self.assertEqual(len(large), len(small))
+        self.assertEqual((result['shifts_created'], result['days_created']), (28, 7))
+
+        copied = Shift.objects.filter(day__date=self.monday + datetime.timedelta(weeks=2)).order_by('section_number')
+        self.assertEqual([(s.day.location_id, s.section_number) for s in copied][:2],
+                         [(self.location.pk, 1), (self.location.pk, 1)])
+
+    def test_copy_skips_deleted_employees_and_reports_conflicts(self):
+        Shift.objects.create(day=self.days[0], employee_job=self.employees[0], start_time="09:00", end_time="17:00")
+        Shift.objects.create(day=self.days[0], employee_job=self.employees[1], start_time="09:00", end_time="17:00")
+        self.employees[1].delete()
+        next_monday = ScheduleDay.objects.create(date=self.monday + datetime.timedelta(weeks=1), location=self.location)
+        Shift.objects.create(day=next_monday, employee_job=self.employees[0], start_time="12:00", end_time="20:00")
+
+        with self.assertRaises(CopyError):
+            copy_week(self.monday, next_monday.date)
+        result = copy_week(self.monday, next_monday.date, allow_existing=True)
+        self.assertEqual((result['shifts_created'], result['skipped'], result['days_created']), (1, 1, 0))
+        self.assertEqual([c['type'] for c in result['conflicts']], ['overlap'])
+
+    def test_copy_invalidates_labor(self):
+        target = self.monday + datetime.timedelta(weeks=1)
+        self.assertEqual(get_week_labor(target).totals()['hours'], 0)
+        self._fill_week(1)
+        copy_week(self.monday, target)
+        self.assertEqual(get_week_labor(target).totals()['hours'], 21)
+
+    def test_save_and_apply_template(self):
+        self._fill_week(2)
+        template = save_template("Standard week", self.monday, self.location.pk)
+        self.assertEqual(template.shifts.count(), 14)
+        self.employees[1].delete()  # works the second shift every day
+
+        start = datetime.date(2025, 4, 7)
+        result = apply_template(template, start, start + datetime.timedelta(days=13))
+        self.assertEqual((result['shifts_created'], result['days_created'], result['skipped']), (14, 14, 7))
+        self.assertEqual(Shift.objects.filter(day__date__range=(start, start + datetime.timedelta(days=13)),
+                                              day__location=self.location, employee_job=self.employees[0]).count(), 14)
+
+    def test_commands(self):
+        self._fill_week(1)
+        out = StringIO()
+        call_command("copy_schedule_week", "2025-03-05", "--weeks", "1", stdout=out)
+        self.assertIn("Created 7 shift(s)", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("copy_schedule_week", "2025-03-05", "--weeks", "1", stdout=StringIO())
+
+        call_command("save_schedule_template", "Base", "2025-03-03", stdout=StringIO())
+        template = ScheduleTemplate.objects.get(name="Base")
+        out = StringIO()
+        call_command("apply_schedule_template", str(template.pk), "2025-05-05", "2025-05-11", stdout=out)
+        self.assertIn("Created 7 shift(s) and 7 day(s)", out.getvalue())
+
+
+class PublishedScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.monday = datetime.date(2025, 3, 3)
+        self.location = Location.objects.create(name="Downtown")
+        job = JobBase.objects.create(title="Server", department="FOH")
+        self.user = User.objects.create_user(username="emp", email="emp@email.com", password="x")
+        self.user.profile.location = self.location
+        self.user.profile.save()
+        employee_job = EmployeeJob.objects.create(profile=self.user.profile, job=job)
+        self.day = ScheduleDay.objects.create(date=self.monday, location=self.location)
+        self.shift = Shift.objects.create(day=self.day, employee_job=employee_job, section_number=1,
+                                          start_time=datetime.time(9), end_time=datetime.time(17))
+        self.url = reverse('published_schedule', args=[self.location.pk]) + "?week=2025-03-05"
+
+    def test_publish_versions_and_snapshot(self):
+        first = publish_week(self.location, self.monday)
+        second = publish_week(self.location, self.monday + datetime.timedelta(days=2))
+        self.assertEqual((first.version, second.version), (1, 2))
+        first.refresh_from_db()
+        self.assertFalse(first.is_current)
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual((data['version'], data['total_hours']), (2, 8))
+        self.assertEqual(data['days'][0]['sections'][0]['shifts'][0]['employee'], "emp")
+        self.assertEqual(data['days'][0]['sections'][0]['shifts'][0]['start'], "09:00")
+
+    def test_unpublished_week_is_404(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_matching_etag_is_304_without_queries(self):
+        publish_week(self.location, self.monday)
+        self.client.force_login(self.user)
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Only the session and user lookups done by the auth middleware
+        self.assertFalse([q for q in queries if 'published' in q['sql']])
+
+    def test_readers_keep_published_version_while_drafts_change(self):
+        publish_week(self.location, self.monday)
+        self.shift.end_time = datetime.time(13)
+        self.shift.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).json()['total_hours'], 8)
+        response = self.client.get(reverse('weekly_schedule') + "?week=2025-03-03")
+        self.assertEqual(response.context['published']['total_hours'], 8)
+        self.assertNotIn('schedule', response.context)
+
+    def test_rollback(self):
+        with self.assertRaises(PublishError):
+            rollback_week(self.location, self.monday)
+        publish_week(self.location, self.monday)
+        self.shift.delete()
+        publish_week(self.location, self.monday)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).json()['total_hours'], 0)
+
+        self.assertEqual(rollback_week(self.location, self.monday), 1)
+        self.assertEqual(self.client.get(self.url).json()['total_hours'], 8)
+        with self.assertRaises(PublishError):
+            rollback_week(self.location, self.monday)
+
+    def test_staff_publish_and_rollback_views(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        query = f"?week=2025-03-03&location={self.location.pk}"
+        response = self.client.post(reverse('publish_week') + query)
+        self.assertRedirects(response, reverse('weekly_schedule') + query)
+        self.client.post(reverse('publish_week') + query)
+        self.assertEqual(self.client.get(reverse('weekly_schedule') + query).context['current']['version'], 2)
+        self.client.post(reverse('rollback_week') + query)
+        self.assertEqual(self.client.get(self.url).json()['version'], 1)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.monday = week_start(datetime.date.today())
+        self.location = Location.objects.create(name="Downtown, East")
+        job = JobBase.objects.create(title="Server", department="FOH")
+        self.user = User.objects.create_user(username="emp", email="emp@email.com", password="x")
+        self.employee_job = EmployeeJob.objects.create(profile=self.user.profile, job=job)
+        self.day = ScheduleDay.objects.create(date=self.monday, location=self.location)
+        self.shift = Shift.objects.create(day=self.day, employee_job=self.employee_job, shift_type="PM",
+                                          start_time=datetime.time(18), end_time=datetime.time(2))
+        self.feed = ScheduleFeed.objects.create(profile=self.user.profile)
+        self.url = reverse('calendar_feed', args=[self.feed.token])
+
+    def test_feed_renders_shifts(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn(f'UID:shift-{self.shift.pk}@scheduling', body)
+        self.assertIn(f'DTSTART:{self.monday:%Y%m%d}T180000Z', body)
+        # Overnight shifts end the next day
+        self.assertIn(f'DTEND:{self.monday + datetime.timedelta(days=1):%Y%m%d}T020000Z', body)
+        self.assertIn('SUMMARY:Server (PM)', body)
+        self.assertIn('LOCATION:Downtown\\, East', body)
+        self.assertEqual(self.client.get(reverse('calendar_feed', args=['nope'])).status_code, 404)
+
+    def test_unchanged_feed_is_304_from_the_version_row(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('scheduling_schedulefeed', queries[0]['sql'])
+
+    def test_job_and_location_renames_bump_the_version(self):
+        etag = self.client.get(self.url)['ETag']
+        job = self.employee_job.job
+        job.title = "Captain"
+        job.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Captain (PM)', response.content.decode())
+
+        self.location.name = "Harbour"
+        self.location.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('LOCATION:Harbour', response.content.decode())
+
+    def test_shift_changes_bump_the_version(self):
+        etag = self.client.get(self.url)['ETag']
+        self.shift.end_time = datetime.time(23)
+        self.shift.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'DTEND:{self.monday:%Y%m%d}T230000Z', response.content.decode())
+
+        # Moving the shift to someone else changes both calendars
+        other = EmployeeJob.objects.create(
+            profile=User.objects.create_user(username="other", email="o@email.com", password="x").profile,
+            job=self.employee_job.job,
+        )
+        self.shift.employee_job = other
+        self.shift.save()
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.version, 3)
+        self.assertNotIn('BEGIN:VEVENT', self.client.get(self.url).content.decode())
+
+    def test_weeks_are_cached_and_rendered_incrementally(self):
+        weeks = feed_window()
+        feed_events(self.user.profile.pk, weeks)
+        with CaptureQueriesContext(connection) as queries:
+            feed_events(self.user.profile.pk, weeks)
+        self.assertEqual(len(queries), 0)
+
+        # Bulk copies skip signals but still refresh only the touched week
+        copy_week(self.monday, self.monday + datetime.timedelta(weeks=1))
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.version, 2)
+        with CaptureQueriesContext(connection) as queries:
+            events = feed_events(self.user.profile.pk, weeks)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(events.count('BEGIN:VEVENT'), 2)
+
+    def test_link_and_token_rotation(self):
+        self.client.force_login(self.user)
+        url = self.client.get(reverse('calendar_feed_link')).json()['url']
+        self.assertTrue(url.endswith(self.url))
+        rotated = self.client.post(reverse('calendar_feed_link')).json()['url']
+        self.assertNotEqual(rotated, url)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_long_lines_are_folded(self):
+        folded = _fold("SUMMARY:" + "é" * 60)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), "SUMMARY:" + "é" * 60)
+
+
+class SalesForecastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.location = Location.objects.create(name="Downtown")
+        self.quarter = datetime.date(2025, 7, 1)
+        # Weekends sell twice as much, and sales grow slowly
+        SalesHistory.objects.bulk_create(
+            SalesHistory(location=self.location, date=date,
+                         sales=Decimal(1000 * (2 if date.weekday() >= 5 else 1) * (1 + i / 1000)).quantize(Decimal('0.01')))
+            for i, date in enumerate(self.quarter - datetime.timedelta(days=120 - d) for d in range(120))
+        )
+
+    def test_quarter_bounds(self):
+        self.assertEqual(quarter_bounds(datetime.date(2025, 11, 5)), (datetime.date(2025, 10, 1), datetime.date(2025, 12, 31)))
+        self.assertEqual(quarter_bounds(datetime.date(2025, 2, 28)), (datetime.date(2025, 1, 1), datetime.date(2025, 3, 31)))
+
+    def test_fit_recovers_weekday_pattern(self):
+        from scheduling.management.commands.backtest_sales_forecast import synthetic_history
+        ids, dates, sales = synthetic_history(5, 456, datetime.date(2025, 12, 31))
+        forecast = fit_forecast(ids, dates[:365], sales[:, :365])
+        self.assertLess(score_forecast(sales[:, 365:], forecast.predict(dates[365:]))['wape'], 0.1)
+
+    def test_forecast_fills_the_quarter(self):
+        short = Location.objects.create(name="New store")
+        SalesHistory.objects.create(location=short, date=self.quarter - datetime.timedelta(days=1), sales=500)
+        manual = ScheduleDay.objects.create(date=self.quarter, location=self.location, projected_sales=1234)
+        self.assertEqual(get_week_labor(self.quarter, self.location.pk).totals()['sales'], 1234)
+
+        # History, then days read, inserted and re-read, current projections and one update (plus the savepoint),
+        # and a sync sequence number for the new days and another for the updated ones
+        with self.assertNumQueries(12):
+            result = forecast_sales(*quarter_bounds(self.quarter))
+        self.assertEqual((result['locations'], result['days_created'], result['days_updated']), (1, 91, 91))
+        self.assertEqual(result['skipped_locations'], [short.pk])
+        manual.refresh_from_db()
+        self.assertEqual(manual.projected_sales, 1234)
+
+        saturday = ScheduleDay.objects.get(date=datetime.date(2025, 7, 5), location=self.location)
+        friday = ScheduleDay.objects.get(date=datetime.date(2025, 7, 4), location=self.location)
+        self.assertAlmostEqual(float(saturday.projected_sales / friday.projected_sales), 2, delta=0.15)
+        self.assertGreater(get_week_labor(self.quarter, self.location.pk).totals()['sales'], 1234)
+
+        forecast_sales(*quarter_bounds(self.quarter), overwrite=True)
+        manual.refresh_from_db()
+        self.assertNotEqual(manual.projected_sales, 1234)
+        with self.assertRaises(ForecastError):
+            forecast_sales(datetime.date(2020, 1, 1), datetime.date(2020, 3, 31))
+
+    def test_import_sales_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(f"location,date,sales\nDowntown,2025-06-30,2000\n{self.location.pk},2025-07-01,\"1,500.50\"\n"
+                    "Downtown,2025-07-01,1600\n")
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command("import_sales", f.name, stdout=out)
+        self.assertIn("Loaded 1 new and 1 replaced day(s)", out.getvalue())
+        self.assertEqual(SalesHistory.objects.get(date=datetime.date(2025, 7, 1)).sales, Decimal('1600.00'))
+        self.assertEqual(SalesHistory.objects.get(date=datetime.date(2025, 6, 30)).sales, Decimal('2000.00'))
+
+        with open(f.name, 'w') as bad:
+            bad.write("location,date,sales\nUptown,2025-07-01,10\n")
+        with self.assertRaisesMessage(CommandError, "Row 2: location 'Uptown' does not exist"):
+            call_command("import_sales", f.name, stdout=StringIO())
+
+    def test_forecast_and_backtest_commands(self):
+        out = StringIO()
+        call_command("forecast_sales", "2025-08-15", stdout=out)
+        self.assertIn("Forecast 2025-07-01 to 2025-09-30 for 1 location(s)", out.getvalue())
+        out = StringIO()
+        call_command("backtest_sales_forecast", "--history", "90", "--holdout", "28", "--end", "2025-06-30", stdout=out)
+        self.assertIn("1 location(s), 90 day(s) of history", out.getvalue())
+
+
+class TimePunchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.date = datetime.date(2024, 3, 4)
+        self.location = Location.objects.create(name="Downtown")
+        self.kiosk = Kiosk.objects.create(name="Front", location=self.location)
+        job = JobBase.objects.create(title="Server", department="FOH")
+        self.user = User.objects.create_user(username="emp", email="emp@email.com", password="x")
+        self.employee_job = EmployeeJob.objects.create(profile=self.user.profile, job=job)
+        day = ScheduleDay.objects.create(date=self.date, location=self.location)
+        self.shift = Shift.objects.create(day=day, employee_job=self.employee_job,
+                                          start_time=datetime.time(9), end_time=datetime.time(17))
+        self.url = reverse('punch_ingest')
+
+    def at(self, hour, minute=0, days=0):
+        moment = datetime.datetime.combine(self.date + datetime.timedelta(days=days), datetime.time(hour, minute))
+        return timezone.make_aware(moment).isoformat()
+
+    def post(self, punches, token=None):
+        return self.client.post(self.url, json.dumps({'punches': punches}), content_type='application/json',
+                                HTTP_AUTHORIZATION=f"Bearer {token or self.kiosk.token}")
+
+    def test_resent_batches_are_deduplicated(self):
+        batch = [
+            {'sequence': 1, 'profile': self.user.profile.pk, 'kind': 'in', 'at': self.at(9, 10)},
+            {'sequence': 2, 'profile': self.user.profile.pk, 'kind': 'out', 'at': self.at(17)},
+            {'sequence': 3, 'profile': 999, 'kind': 'in', 'at': self.at(9)},
+            {'sequence': 4, 'profile': self.user.profile.pk, 'kind': 'in', 'at': '2024-03-04T09:00'},
+        ]
+        result = self.post(batch).json()
+        self.assertEqual((result['accepted'], result['duplicates'], result['last_sequence']), (2, 0, 2))
+        self.assertEqual([row['index'] for row in result['rejected']], [2, 3])
+        result = self.post(batch[:2] + [{**batch[1], 'sequence': 5}]).json()
+        self.assertEqual((result['accepted'], result['duplicates']), (1, 2))
+        self.assertEqual(TimePunch.objects.count(), 3)
+        self.kiosk.refresh_from_db()
+        self.assertIsNotNone(self.kiosk.last_seen_at)
+
+    def test_kiosk_authentication(self):
+        self.assertEqual(self.post([], token="nope").status_code, 401)
+        self.assertEqual(self.post([{}] * 501).status_code, 400)
+        self.assertEqual(self.client.post(self.url, b'{"punches": "\xff"}', content_type='application/json',
+                                          HTTP_AUTHORIZATION=f"Bearer {self.kiosk.token}").status_code, 400)
+        self.kiosk.is_active = False
+        self.kiosk.save()
+        # Cached lookups are dropped when the kiosk changes
+        self.assertEqual(self.post([]).status_code, 401)
+
+    def test_ingestion_leaves_schedule_tables_alone(self):
+        kiosk = {'id': self.kiosk.pk, 'token': self.kiosk.token, 'location_id': self.location.pk,
+                 'last_seen_at': timezone.now()}
+        records = [{'sequence': i, 'profile': self.user.profile.pk, 'kind': 'in', 'at': self.at(9)} for i in range(100)]
+        with CaptureQueriesContext(connection) as queries:
+            ingest_punches(kiosk, records)
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any('scheduling_shift' in q['sql'] or 'scheduling_scheduleday' in q['sql'] for q in queries))
+
+    def test_last_seen_is_written_at_most_once_an_interval(self):
+        def kiosk_updates(sequence):
+            with CaptureQueriesContext(connection) as queries:
+                self.post([{'sequence': sequence, 'profile': self.user.profile.pk, 'kind': 'in', 'at': self.at(9)}])
+            return sum(q['sql'].startswith('UPDATE "scheduling_kiosk"') for q in queries)
+
+        self.assertEqual(kiosk_updates(1), 1)
+        self.assertEqual(kiosk_updates(2), 0)
+        # Let the interval pass
+        key = kiosk_cache_key(self.kiosk.token)
+        kiosk = cache.get(key)
+        cache.set(key, {**kiosk, 'last_seen_at': kiosk['last_seen_at'] - datetime.timedelta(seconds=SEEN_INTERVAL + 1)})
+        self.assertEqual(kiosk_updates(3), 1)
+        self.assertEqual(kiosk_updates(4), 0)
+        self.assertEqual(kiosk_updates(5), 0)
+
+    def test_variance_matches_punches_to_shifts(self):
+        other = User.objects.create_user(username="late", email="late@email.com", password="x")
+        late_job = EmployeeJob.objects.create(profile=other.profile, job=self.employee_job.job)
+        Shift.objects.create(day=self.shift.day, employee_job=late_job,
+                             start_time=datetime.time(18), end_time=datetime.time(2))
+        self.post([
+            {'sequence': 1, 'profile': self.user.profile.pk, 'kind': 'in', 'at': self.at(8, 58)},
+            {'sequence': 2, 'profile': self.user.profile.pk, 'kind': 'out', 'at': self.at(16, 30)},
+            # An unscheduled second visit the same evening
+            {'sequence': 3, 'profile': self.user.profile.pk, 'kind': 'in', 'at': self.at(20)},
+            {'sequence': 4, 'profile': self.user.profile.pk, 'kind': 'out', 'at': self.at(21)},
+            # Twenty minutes late to an overnight shift, clocking out after midnight
+            {'sequence': 5, 'profile': other.profile.pk, 'kind': 'in', 'at': self.at(18, 20)},
+            {'sequence': 6, 'profile': other.profile.pk, 'kind': 'out', 'at': self.at(2, days=1)},
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            variance = punch_variance(self.date, self.date, self.location.pk)
+        self.assertEqual(len(queries), 2)
+        first, second = variance['shifts']
+        self.assertEqual((first['status'], first['late_minutes'], first['left_early_minutes']), ('left_early', -2, 30))
+        self.assertEqual((first['worked_hours'], first['variance_hours']), (7.53, -0.47))
+        self.assertEqual((second['status'], second['late_minutes'], second['worked_hours']), ('late', 20, 7.67))
+        self.assertEqual([row['worked_hours'] for row in variance['unscheduled']], [1.0])
+        self.assertEqual(variance['totals']['scheduled_hours'], 16.0)
+
+        self.client.force_login(User.objects.create_user(username="boss", password="x", is_staff=True))
+        response = self.client.get(reverse('punch_variance'), {'start': self.date, 'end': self.date})
+        self.assertEqual(response.json()['totals']['late'], 1)
+
+    def test_interval_pairing_and_no_shows(self):
+        t = lambda hour: datetime.datetime(2024, 3, 4, hour)
+        intervals = worked_intervals([(t(9), 'in'), (t(12), 'in'), (t(15), 'out'), (t(16), 'out')])
+        self.assertEqual(intervals, [[t(9), None], [t(12), t(15)], [None, t(16)]])
+        matched, unmatched = match_intervals([(t(6), t(8)), (t(11), t(15))], [[t(12), t(15)], [t(20), t(21)]])
+        self.assertEqual(matched, {1: [t(12), t(15)]})
+        self.assertEqual(unmatched, [[t(20), t(21)]])
+
+
+class PayrollExportTests(TestCase):
+    def setUp(self):
+        self.monday = datetime.date(2024, 3, 4)
+        self.location = Location.objects.create(name="Downtown")
+        server = JobBase.objects.create(title="Server", department="FOH")
+        bartender = JobBase.objects.create(title="Bartender", department="FOH")
+        self.user = User.objects.create_user(username="emp", email="emp@email.com", password="x")
+        self.serving = EmployeeJob.objects.create(profile=self.user.profile, job=server, pay_rate=10)
+        self.bartending = EmployeeJob.objects.create(profile=self.user.profile, job=bartender, pay_rate=20)
+        other = User.objects.create_user(username="other", email="other@email.com", password="x")
+        unpaid = EmployeeJob.objects.create(profile=other.profile, job=server, pay_rate=None)
+
+        days = {i: ScheduleDay.objects.create(date=self.monday + datetime.timedelta(days=i), location=self.location)
+                for i in range(8)}
+        nine, five = datetime.time(9), datetime.time(17)
+        Shift.objects.bulk_create(
+            # Week one: 40 hours serving plus a 10 hour overnight bar shift
+            [Shift(day=days[i], employee_job=self.serving, start_time=nine, end_time=five) for i in range(5)]
+            + [Shift(day=days[5], employee_job=self.bartending, start_time=datetime.time(20), end_time=datetime.time(6)),
+               # Week two: one serving shift
+               Shift(day=days[7], employee_job=self.serving, start_time=nine, end_time=five),
+               Shift(day=days[0], employee_job=unpaid, start_time=nine, end_time=five),
+               Shift(day=days[0], employee_job=None, start_time=nine, end_time=five)]
+        )
+        self.end = self.monday + datetime.timedelta(days=13)
+
+    def test_weekly_overtime_at_the_blended_rate(self):
+        with CaptureQueriesContext(connection) as queries:
+            employees = list(employee_totals(payroll_rows(self.monday, self.end)))
+        self.assertEqual(len(queries), 1)
+        first, second = employees
+        # Week one: 50 hours for $600 straight time, so 10 overtime hours at 1.5 x $12
+        self.assertEqual((first['jobs'], first['regular_hours'], first['overtime_hours'], first['total_hours']),
+                         (2, 48.0, 10.0, 58.0))
+        self.assertEqual((first['regular_pay'], first['overtime_pay'], first['gross_pay']), (560.0, 180.0, 740.0))
+        self.assertEqual((second['username'], second['regular_hours'], second['gross_pay']), ("other", 8.0, 0.0))
+
+    def test_csv_export(self):
+        self.client.force_login(User.objects.create_user(username="boss", password="x", is_staff=True))
+        url = reverse('payroll_export')
+        response = self.client.get(url, {'start': self.monday, 'end': self.end})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['profile_id', 'username', 'first_name'])
+        self.assertEqual(lines[1].split(',')[-1], '740.0')
+        self.assertEqual(len(lines), 3)
+        bad = self.client.get(url, {'start': self.monday + datetime.timedelta(days=1), 'end': self.end})
+        self.assertEqual(bad.status_code, 400)
+        with self.assertRaises(PayrollError):
+            payroll_rows(self.end, self.monday)
+
+    def test_overtime_spans_locations(self):
+        uptown = Location.objects.create(name="Uptown")
+        roamer = User.objects.create_user(username="roamer", email="roamer@email.com", password="x")
+        job = EmployeeJob.objects.create(profile=roamer.profile, job=self.serving.job, pay_rate=10)
+        # 30 hours at each location in week one
+        Shift.objects.bulk_create(
+            Shift(day=ScheduleDay.objects.get_or_create(date=self.monday + datetime.timedelta(days=i),
+                                                        location=self.location if i < 3 else uptown)[0],
+                  employee_job=job, start_time=datetime.time(8), end_time=datetime.time(18))
+            for i in range(6)
+        )
+
+        def totals(location_id=None):
+            rows = employee_totals(payroll_rows(self.monday, self.end, location_id))
+            return {row['username']: (row['regular_hours'], row['overtime_hours'], row['gross_pay']) for row in rows}
+
+        self.assertEqual(totals()['roamer'], (40.0, 20.0, 700.0))
+        downtown = totals(self.location.pk)
+        self.assertEqual(downtown['roamer'], (20.0, 10.0, 350.0))
+        self.assertEqual(downtown['emp'][1], 10.0)
+        self.assertEqual(totals(uptown.pk), {'roamer': (20.0, 10.0, 350.0)})
+
+
+class ScheduleDeltaTests(TestCase):
+    def setUp(self):
+        self.date = datetime.date(2024, 3, 4)
+        self.location = Location.objects.create(name="Downtown")
+        self.other_location = Location.objects.create(name="Uptown")
+        job = JobBase.objects.create(title="Server", department="FOH")
+        self.user = User.objects.create_user(username="emp", email="emp@email.com", password="x")
+        self.employee_job = EmployeeJob.objects.create(profile=self.user.profile, job=job)
+        self.day = ScheduleDay.objects.create(date=self.date, location=self.location)
+        self.shifts = [
+            Shift.objects.create(day=self.day, employee_job=self.employee_job, start_time=datetime.time(hour),
+                                 end_time=datetime.time(hour + 4))
+            for hour in (8, 12, 16)
+        ]
+
+    def sync(self, cursor=None, **kwargs):
+        changes = {'days': [], 'shifts': [], 'deleted': []}
+        while True:
+            delta = schedule_delta(cursor, **kwargs)
+            for key in changes:
+                changes[key].extend(delta[key])
+            cursor = delta['cursor']
+            if not delta['has_more']:
+                return changes, cursor
+
+    def test_pages_through_ties_and_current_clients_cost_one_query(self):
+        # Rows written under one sequence number, as bulk writes are, are told apart by kind and id
+        Shift.objects.update(sync_seq=1)
+        ScheduleDay.objects.update(sync_seq=1)
+        changes, cursor = self.sync(limit=2)
+        self.assertEqual([day['id'] for day in changes['days']], [self.day.pk])
+        self.assertEqual([shift['id'] for shift in changes['shifts']], [shift.pk for shift in self.shifts])
+        self.assertEqual(changes['shifts'][0]['start'], '08:00')
+
+        with CaptureQueriesContext(connection) as queries:
+            delta = schedule_delta(cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((delta['days'], delta['shifts'], delta['deleted']), ([], [], []))
+        # Same position, reissued now
+        self.assertEqual(delta['cursor'].rsplit('-', 1)[0], cursor.rsplit('-', 1)[0])
+
+    def test_edits_and_deletes_after_the_cursor(self):
+        _, cursor = self.sync()
+        first, second, third = self.shifts
+        first.end_time = datetime.time(13)
+        first.save()
+        second_id = second.pk
+        second.delete()
+        changes, cursor = self.sync(cursor)
+        self.assertEqual([shift['id'] for shift in changes['shifts']], [first.pk])
+        self.assertEqual([(row['kind'], row['object_id']) for row in changes['deleted']],
+                         [(ScheduleTombstone.SHIFT, second_id)])
+
+        # Unassigning through a deleted job is a bulk update, which still has to reach clients
+        self.employee_job.delete()
+        changes, cursor = self.sync(cursor)
+        self.assertEqual({shift['id']: shift['employee_job_id'] for shift in changes['shifts']},
+                         {first.pk: None, third.pk: None})
+
+        # Other locations' clients don't hear about this day, but its deletion cascades to its shifts
+        other_cursor = self.sync(location_id=self.other_location.pk)[1]
+        day_id = self.day.pk
+        self.day.delete()
+        changes, _ = self.sync(cursor)
+        self.assertEqual(sorted((row['kind'], row['object_id']) for row in changes['deleted']),
+                         sorted([(ScheduleTombstone.DAY, day_id), (ScheduleTombstone.SHIFT, first.pk),
+                                 (ScheduleTombstone.SHIFT, third.pk)]))
+        self.assertEqual(self.sync(other_cursor, location_id=self.other_location.pk)[0]['deleted'], [])
+
+    def test_view_cursor_errors_and_expiry(self):
+        self.client.force_login(User.objects.create_user(username="boss", password="x", is_staff=True))
+        url = reverse('schedule_delta')
+        body = self.client.get(url, {'location': self.location.pk}).json()
+        self.assertEqual(len(body['shifts']), 3)
+        self.assertEqual(self.client.get(url, {'cursor': 'nope'}).status_code, 400)
+        expired = f"{body['cursor'].rsplit('-', 1)[0]}-{(timezone.now() - datetime.timedelta(days=31)).timestamp() * 1_000_000:.0f}"
+        self.assertEqual(self.client.get(url, {'cursor': expired}).status_code, 410)
+
+        # Tombstones outlive the cursors by a day
+        self.shifts[0].delete()
+        ScheduleTombstone.objects.update(deleted_at=timezone.now() - datetime.timedelta(days=30, hours=12))
+        self.assertEqual(prune_tombstones(), 0)
+        ScheduleTombstone.objects.update(deleted_at=timezone.now() - datetime.timedelta(days=32))
+        self.assertEqual(prune_tombstones(), 1)
+
+    def test_rows_leaving_a_location_are_deleted_for_its_clients(self):
+        uptown_day = ScheduleDay.objects.create(date=self.date, location=self.other_location)
+        _, everywhere = self.sync()
+        _, downtown = self.sync(location_id=self.location.pk)
+        _, uptown = self.sync(location_id=self.other_location.pk)
+
+        first = self.shifts[0]
+        first.day = uptown_day
+        first.save()
+        changes, downtown = self.sync(downtown, location_id=self.location.pk)
+        self.assertEqual(changes['shifts'], [])
+        self.assertEqual([(row['kind'], row['object_id']) for row in changes['deleted']],
+                         [(ScheduleTombstone.SHIFT, first.pk)])
+        changes, uptown = self.sync(uptown, location_id=self.other_location.pk)
+        self.assertEqual(([shift['id'] for shift in changes['shifts']], changes['deleted']), ([first.pk], []))
+        changes, everywhere = self.sync(everywhere)
+        self.assertEqual(([shift['id'] for shift in changes['shifts']], changes['deleted']), ([first.pk], []))
+
+        # Moving back supersedes the old move, and a company-wide day's shifts follow their employee's location
+        first.day = self.day
+        first.save()
+        self.assertEqual(self.sync(location_id=self.location.pk)[0]['deleted'], [])
+        self.user.profile.location = self.location
+        self.user.profile.save()
+        company_day = ScheduleDay.objects.create(date=self.date + datetime.timedelta(days=1))
+        company_shift = Shift.objects.create(day=company_day, employee_job=self.employee_job)
+        _, downtown = self.sync(downtown, location_id=self.location.pk)
+        self.user.profile.location = self.other_location
+        self.user.profile.save()
+        changes, _ = self.sync(downtown, location_id=self.location.pk)
+        self.assertEqual([(row['kind'], row['object_id']) for row in changes['deleted']],
+                         [(ScheduleTombstone.SHIFT, company_shift.pk)])
+        changes, _ = self.sync(uptown, location_id=self.other_location.pk)
+        self.assertIn(company_shift.pk, [shift['id'] for shift in changes['shifts']])
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        recipients = []
+        for line in self.rfile:
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == 'RCPT':
+                address = command.split(':', 1)[1].strip().strip('<>')
+                if address in server.refuse:
+                    self.reply("550 No such user")
+                    continue
+                recipients.append(address)
+            elif verb in ('MAIL', 'RSET'):
+                recipients = []
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                body = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                server.messages.append((recipients, body.decode()))
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            self.reply("250 OK")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of an SMTP server for smtplib: records messages, refuses addresses in `refuse`, counts connections."""
+    daemon_threads = True
+
+    def __init__(self, refuse=()):
+        self.refuse, self.messages, self.connections = set(refuse), [], 0
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def settings(self):
+        return override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                                 EMAIL_HOST='127.0.0.1', EMAIL_PORT=self.server_address[1], EMAIL_TIMEOUT=5)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class CrashingEmailBackend(locmem.EmailBackend):
+    """Delivers one message, then dies the way a killed worker would: with no SMTP error to handle."""
+    def send_messages(self, messages):
+        if mail.outbox:
+            raise RuntimeError("worker killed")
+        return super().send_messages(messages)
+
+
+class PublishNotificationTests(TestCase):
+    def setUp(self):
+        self.monday = datetime.date(2025, 3, 3)
+        self.location = Location.objects.create(name="Downtown")
+        job = JobBase.objects.create(title="Server", department="FOH")
+        self.day = ScheduleDay.objects.create(date=self.monday, location=self.location)
+        for username, email, hour in (("alice", "alice@email.com", 9), ("bob", "bob@email.com", 12),
+                                      ("carol", "carol@email.com", 16), ("nomail", "", 9)):
+            profile = User.objects.create_user(username=username, email=email, password="x").profile
+            Shift.objects.create(day=self.day, employee_job=EmployeeJob.objects.create(profile=profile, job=job),
+                                 start_time=datetime.time(hour), end_time=datetime.time(hour + 4))
+        Shift.objects.create(day=self.day, start_time=datetime.time(9), end_time=datetime.time(17))
+
+    def run_due(self, batch_size=100):
+        PublishNotification.objects.update(next_attempt_at=timezone.now())
+        return send_pending_notifications(batch_size)
+
+    def test_publishing_queues_a_batched_fan_out(self):
+        published = publish_week(self.location, self.monday)
+        job = send_pending_notifications(batch_size=2)
+        self.assertEqual((job.published, job.total, job.sent, job.status), (published, 3, 2, PublishNotification.PENDING))
+        out = StringIO()
+        call_command("send_publish_notifications", stdout=out)
+        self.assertIn("3/3 sent, 0 failed (done)", out.getvalue())
+        self.assertIsNone(send_pending_notifications())
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ["alice@email.com", "bob@email.com", "carol@email.com"])
+        alice = next(message for message in mail.outbox if message.to == ["alice@email.com"])
+        self.assertEqual(alice.subject, "Your schedule at Downtown for the week of Mar 3")
+        self.assertIn("Mon Mar 3  09:00-13:00  Server", alice.body)
+        self.assertNotIn("12:00", alice.body)
+        publish_week(self.location, self.monday, notify=False)
+        self.assertEqual(PublishNotification.objects.count(), 1)
+
+    def test_one_connection_per_batch_and_refused_addresses_are_retried(self):
+        server = SMTPStandIn(refuse={"bob@email.com"})
+        self.addCleanup(server.stop)
+        publish_week(self.location, self.monday)
+        with server.settings():
+            job = send_pending_notifications()
+            self.assertEqual(server.connections, 1)
+            self.assertEqual(sorted(to for to, _ in server.messages), [["alice@email.com"], ["carol@email.com"]])
+            # Only the refused message is left, so the next try waits, and that's no mail server error
+            self.assertGreater(job.next_attempt_at, timezone.now())
+            self.assertIsNone(send_pending_notifications())
+            PublishNotification.objects.update(next_attempt_at=timezone.now())
+            out = StringIO()
+            call_command("send_publish_notifications", stdout=out)
+            self.assertNotIn("Mail server error", out.getvalue())
+            for _ in range(MAX_DELIVERY_ATTEMPTS - 2):
+                job = self.run_due()
+        self.assertEqual((job.status, job.sent, job.failed), (PublishNotification.DONE, 2, 1))
+        bob = NotificationDelivery.objects.get(email="bob@email.com")
+        self.assertEqual((bob.attempts, bob.sent_at), (MAX_DELIVERY_ATTEMPTS, None))
+        self.assertIn("No such user", bob.error)
+        self.assertEqual(len(server.messages), 2)
+
+    def test_connection_failures_back_off_without_using_up_deliveries(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            closed_port = probe.getsockname()[1]
+        publish_week(self.location, self.monday)
+        out = StringIO()
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                               EMAIL_HOST='127.0.0.1', EMAIL_PORT=closed_port, EMAIL_TIMEOUT=5):
+            call_command("send_publish_notifications", stdout=out)
+        self.assertIn("Mail server error", out.getvalue())
+        job = PublishNotification.objects.get()
+        self.assertEqual((job.status, job.attempts, job.sent), (PublishNotification.PENDING, 1, 0))
+        self.assertTrue(job.last_error)
+        self.assertGreater(job.next_attempt_at, timezone.now() + datetime.timedelta(seconds=30))
+        self.assertFalse(NotificationDelivery.objects.filter(attempts__gt=0).exists())
+
+        server = SMTPStandIn()
+        self.addCleanup(server.stop)
+        with server.settings():
+            self.run_due()
+        staff = User.objects.create_user(username="boss", email="boss@email.com", password="x", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('publish_notifications'), {'week': self.monday, 'location': self.location.pk})
+        status = response.json()['notifications'][0]
+        self.assertEqual((status['version'], status['status'], status['sent'], status['attempts']), (1, 'done', 3, 1))
+
+    def test_claimed_jobs_are_skipped_and_recorded_sends_survive_a_crash(self):
+        publish_week(self.location, self.monday)
+        job = claim_due_notification()
+        self.assertEqual((job.total, job.deliveries.count()), (3, 3))
+        # Another worker leaves it alone until the claim runs out
+        self.assertIsNone(send_pending_notifications())
+
+        with override_settings(EMAIL_BACKEND='scheduling.tests.CrashingEmailBackend'):
+            with self.assertRaises(RuntimeError):
+                self.run_due()
+        self.assertEqual(NotificationDelivery.objects.filter(sent_at__isnull=False).count(), 1)
+        job = self.run_due()
+        self.assertEqual((job.status, job.sent), (PublishNotification.DONE, 3))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ["alice@email.com", "bob@email.com", "carol@email.com"])
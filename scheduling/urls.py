@@ -1,7 +1,24 @@
 from django.urls import path
-from .views import ScheduleView
+from .views import (
+    CalendarFeedLinkView, CalendarFeedView, FillInView, LaborView, PayrollExportView, PublishedScheduleView,
+    PublishNotificationView, PublishWeekView, PunchIngestView, PunchVarianceView, RollbackWeekView,
+    ScheduleDeltaView, ScheduleView, ShiftConflictsView, ShiftHoursView,
+)
 
 urlpatterns = [
     path('schedule/',ScheduleView.as_view(),name='weekly_schedule'),
-
-]
\ No newline at end of file
+    path('schedule/published/<int:location_id>/', PublishedScheduleView.as_view(), name='published_schedule'),
+    path('schedule/publish/', PublishWeekView.as_view(), name='publish_week'),
+    path('schedule/publish/notifications/', PublishNotificationView.as_view(), name='publish_notifications'),
+    path('schedule/rollback/', RollbackWeekView.as_view(), name='rollback_week'),
+    path('schedule/calendar/', CalendarFeedLinkView.as_view(), name='calendar_feed_link'),
+    path('schedule/calendar/<str:token>.ics', CalendarFeedView.as_view(), name='calendar_feed'),
+    path('schedule/conflicts/', ShiftConflictsView.as_view(), name='shift_conflicts'),
+    path('schedule/fill-ins/', FillInView.as_view(), name='fill_ins'),
+    path('schedule/hours/<str:group>/', ShiftHoursView.as_view(), name='shift_hours'),
+    path('schedule/labor/', LaborView.as_view(), name='labor'),
+    path('schedule/sync/', ScheduleDeltaView.as_view(), name='schedule_delta'),
+    path('schedule/payroll/', PayrollExportView.as_view(), name='payroll_export'),
+    path('schedule/punches/', PunchIngestView.as_view(), name='punch_ingest'),
+    path('schedule/punches/variance/', PunchVarianceView.as_view(), name='punch_variance'),
+]
@@ -1,7 +1,389 @@
-from django.shortcuts import render
-from django.views.generic import TemplateView
+import datetime
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_time
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic import TemplateView, View
+
+from accounts.models import Location
+from jobs.models import Profile
+from .availability import suggest_fill_ins
+from .conflicts import week_conflicts
+from .feeds import WEEKS_BACK, feed_events, feed_window, render_calendar
+from .hours import HoursFilterError, hours_by, parse_range
+from .labor import get_labor_plan
+from .models import PublishNotification, ScheduleFeed, Shift
+from .payroll import PayrollError, iter_payroll_csv, payroll_rows
+from .punches import PunchError, get_kiosk, ingest_punches, punch_variance
+from .publishing import PublishError, get_current, publish_week, published_payload, rollback_week
+from .sync import SYNC_PAGE_SIZE, SyncCursorError, SyncResetRequired, schedule_delta
+from .weekly import group_week, week_dates, week_shifts, week_start
+
+
+def week_params(request):
+    """(Monday of ?week=YYYY-MM-DD or this week, ?location=<id> or None)."""
+    day = parse_date(request.GET.get('week') or '') or timezone.localdate()
+    location_id = request.GET.get('location')
+    return week_start(day), int(location_id) if location_id and location_id.isdigit() else None
 
 
 # Create your views here.
-class ScheduleView(TemplateView):
-    template_name = "scheduling/weekly_schedule.html"
\ No newline at end of file
+class ScheduleView(LoginRequiredMixin, TemplateView):
+    template_name = "scheduling/weekly_schedule.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        start, location_id = week_params(self.request)
+        dates = week_dates(start)
+        context.update({
+            'week_start': start,
+            'week_end': dates[-1],
+            'previous_week': start - datetime.timedelta(days=7),
+            'next_week': start + datetime.timedelta(days=7),
+            'locations': Location.objects.order_by('name'),
+        })
+        if not self.request.user.is_staff:
+            # Everyone else reads the published version, never the draft being edited
+            if location_id is None:
+                location_id = getattr(getattr(self.request.user, 'profile', None), 'location_id', None)
+            current = get_current(location_id, start) if location_id else None
+            context.update({
+                'location_id': location_id,
+                'published': json.loads(published_payload(current['pk'])) if current else None,
+            })
+            return context
+
+        # One query for the whole week regardless of how many shifts it has
+        context.update({
+            'location_id': location_id,
+            'schedule': group_week(week_shifts(start, location_id), dates),
+            'current': get_current(location_id, start) if location_id else None,
+        })
+        # One more query, also constant, to flag double bookings and short rest periods
+        conflicts = week_conflicts(start, location_id)
+        context.update({
+            'conflicts': conflicts,
+            'conflict_ids': {shift_id for conflict in conflicts for shift_id in conflict['shift_ids']},
+        })
+        return context
+
+
+# -------------------------------
+# Publishing
+# -------------------------------
+class PublishedScheduleView(LoginRequiredMixin, View):
+    """
+    ?week=YYYY-MM-DD -> the current published snapshot of a location's week, sent as stored.
+    The version lookup is cached, so a matching If-None-Match gets a 304 without touching the database.
+    """
+
+    def get(self, request, location_id):
+        start, _ = week_params(request)
+        current = get_current(location_id, start)
+        if current is None:
+            raise Http404("This week has not been published.")
+        etag = f'"{current["etag"]}"'
+        last_modified = current['published_at'].timestamp()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(published_payload(current['pk']), content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class PublishWeekView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """POST ?week=YYYY-MM-DD&location=<id> -> publish the draft as a new version, then back to the schedule."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def action(self, location, start):
+        publish_week(location, start, published_by=getattr(self.request.user, 'profile', None))
+
+    def post(self, request):
+        start, location_id = week_params(request)
+        if location_id is None:
+            return HttpResponseBadRequest("Pick a location to publish.")
+        location = get_object_or_404(Location, pk=location_id)
+        try:
+            self.action(location, start)
+        except PublishError as e:
+            return HttpResponseBadRequest(str(e))
+        return HttpResponseRedirect(f"{reverse('weekly_schedule')}?week={start.isoformat()}&location={location_id}")
+
+
+class RollbackWeekView(PublishWeekView):
+    """POST ?week=YYYY-MM-DD&location=<id>[&version=<n>] -> make an earlier version current again."""
+
+    def action(self, location, start):
+        version = self.request.GET.get('version')
+        rollback_week(location, start, int(version) if version and version.isdigit() else None)
+
+
+class PublishNotificationView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """?week=YYYY-MM-DD&location=<id> -> progress of the emails for each published version of the week, newest first."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        start, location_id = week_params(request)
+        if location_id is None:
+            return HttpResponseBadRequest("Pick a location.")
+        jobs = PublishNotification.objects.filter(
+            published__location_id=location_id, published__week_start=start,
+        ).order_by('-published__version').values(
+            'published__version', 'status', 'total', 'sent', 'failed', 'attempts', 'last_error',
+            'created_at', 'finished_at',
+        )
+        return JsonResponse({'week_start': start.isoformat(), 'notifications': [
+            {'version': job.pop('published__version'), **job} for job in jobs
+        ]})
+
+
+# -------------------------------
+# Calendar feeds
+# -------------------------------
+class CalendarFeedView(View):
+    """
+    A profile's shifts as iCalendar, for calendar apps to subscribe to; the token is the credential.
+    The ETag comes from the feed's version row, so an unchanged calendar costs one small query.
+    """
+
+    def get(self, request, token):
+        feed = ScheduleFeed.objects.filter(token=token).values('profile_id', 'version', 'updated_at').first()
+        if feed is None:
+            raise Http404("Unknown calendar feed.")
+        weeks = feed_window()
+        # The window moves every Monday, which changes the calendar as much as an edit does
+        etag = f'"{feed["version"]}-{weeks[0]:%Y%m%d}"'
+        rolled_over = datetime.datetime.combine(weeks[WEEKS_BACK], datetime.time(), tzinfo=datetime.timezone.utc)
+        last_modified = max(feed['updated_at'], rolled_over).timestamp()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(render_calendar(feed_events(feed['profile_id'], weeks)),
+                                    content_type='text/calendar; charset=utf-8')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class CalendarFeedLinkView(LoginRequiredMixin, View):
+    """GET -> the signed-in user's feed URL as JSON; POST issues a new token, so old links stop working."""
+
+    def feed(self, request):
+        return ScheduleFeed.objects.get_or_create(profile=get_object_or_404(Profile, user=request.user))[0]
+
+    def response(self, request, feed):
+        return JsonResponse({'url': request.build_absolute_uri(reverse('calendar_feed', args=[feed.token]))})
+
+    def get(self, request):
+        return self.response(request, self.feed(request))
+
+    def post(self, request):
+        feed = self.feed(request)
+        feed.rotate_token()
+        return self.response(request, feed)
+
+
+class ShiftConflictsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """?week=YYYY-MM-DD[&location=<id>] -> overlapping shifts and short rest periods as JSON."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        start, location_id = week_params(request)
+        return JsonResponse({
+            'week_start': start.isoformat(),
+            'conflicts': week_conflicts(start, location_id),
+        })
+
+
+class FillInView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Who could work a shift, from the availability index.
+    ?shift=<id> finds cover for an existing shift; otherwise pass
+    ?date=YYYY-MM-DD&start=HH:MM&end=HH:MM&job=<id>[&location=<id>].
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        shift_id = request.GET.get('shift')
+        if shift_id and shift_id.isdigit():
+            shift = get_object_or_404(Shift.objects.with_related(), pk=shift_id, employee_job__isnull=False)
+            if shift.start_time is None or shift.end_time is None:
+                return HttpResponseBadRequest("The shift has no start or end time.")
+            date, start, end = shift.day.date, shift.start_time, shift.end_time
+            job_id = shift.employee_job.job_id
+            location_id = shift.day.location_id or shift.employee_job.profile.location_id
+            exclude = [shift.employee_job.profile_id]
+        else:
+            date = parse_date(request.GET.get('date') or '')
+            start = parse_time(request.GET.get('start') or '')
+            end = parse_time(request.GET.get('end') or '')
+            job_id, location_id = request.GET.get('job', ''), request.GET.get('location', '')
+            if None in (date, start, end) or not job_id.isdigit() or (location_id and not location_id.isdigit()):
+                return HttpResponseBadRequest("Pass shift=<id>, or date, start, end, job and optionally location.")
+            job_id, location_id, exclude = int(job_id), int(location_id) if location_id else None, []
+
+        return JsonResponse({
+            'date': date.isoformat(),
+            'start': start.isoformat(timespec='minutes'),
+            'end': end.isoformat(timespec='minutes'),
+            'suggestions': suggest_fill_ins(date, start, end, job_id, location_id, exclude_profile_ids=exclude),
+        })
+
+
+# -------------------------------
+# Labor hours
+# -------------------------------
+class ShiftHoursView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """?start=YYYY-MM-DD&end=YYYY-MM-DD[&location=<id>] -> scheduled hours per group as JSON."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, group):
+        location_id = request.GET.get('location')
+        if location_id and not location_id.isdigit():
+            return HttpResponseBadRequest("location must be a numeric id.")
+        try:
+            start, end = parse_range(request.GET.get('start'), request.GET.get('end'))
+            rows = hours_by(group, start, end, location_id=location_id)
+        except HoursFilterError as e:
+            return HttpResponseBadRequest(str(e))
+        return JsonResponse({
+            'group': group,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'total_hours': round(sum(row['hours'] for row in rows), 2),
+            'rows': rows,
+        })
+
+
+class LaborView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """?start=YYYY-MM-DD&end=YYYY-MM-DD[&location=<id>] -> labor cost vs projected sales as JSON."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        location_id = request.GET.get('location')
+        if location_id and not location_id.isdigit():
+            return HttpResponseBadRequest("location must be a numeric id.")
+        try:
+            start, end = parse_range(request.GET.get('start'), request.GET.get('end'))
+        except HoursFilterError as e:
+            return HttpResponseBadRequest(str(e))
+        # Assembled from per-week plans that are cached until a shift, day or pay rate changes
+        plan = get_labor_plan(start, end, int(location_id) if location_id else None)
+        return JsonResponse({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'totals': plan.totals(),
+            'days': plan.days(),
+        })
+
+
+class PayrollExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """?start=YYYY-MM-DD&end=YYYY-MM-DD[&location=<id>] -> regular and overtime pay per employee, streamed as CSV."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        location_id = request.GET.get('location')
+        if location_id and not location_id.isdigit():
+            return HttpResponseBadRequest("location must be a numeric id.")
+        try:
+            start, end = parse_range(request.GET.get('start'), request.GET.get('end'))
+            rows = payroll_rows(start, end, int(location_id) if location_id else None)
+        except (HoursFilterError, PayrollError) as e:
+            return HttpResponseBadRequest(str(e))
+        response = StreamingHttpResponse(iter_payroll_csv(rows), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="payroll_{start}_{end}.csv"'
+        return response
+
+
+# -------------------------------
+# Delta sync
+# -------------------------------
+class ScheduleDeltaView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    ?cursor=<from the last response>[&location=<id>][&limit=<n>] -> days, shifts and deletions
+    changed since, as JSON. Omit the cursor for a first sync, and keep asking while has_more.
+    410 means the cursor is too old and the client should start over without one.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        location_id, limit = request.GET.get('location'), request.GET.get('limit')
+        if (location_id and not location_id.isdigit()) or (limit and not limit.isdigit()):
+            return HttpResponseBadRequest("location and limit must be numbers.")
+        try:
+            delta = schedule_delta(request.GET.get('cursor'), int(location_id) if location_id else None,
+                                   int(limit) if limit else SYNC_PAGE_SIZE)
+        except SyncCursorError as e:
+            return HttpResponseBadRequest(str(e))
+        except SyncResetRequired:
+            return JsonResponse({'error': "The cursor has expired; sync again without one."}, status=410)
+        return JsonResponse(delta)
+
+
+# -------------------------------
+# Time clock
+# -------------------------------
+@method_decorator(csrf_exempt, name='dispatch')
+class PunchIngestView(View):
+    """
+    Kiosks POST {"punches": [{"sequence", "profile", "kind", "at"}, ...]} with
+    "Authorization: Bearer <token>". Resending a batch is safe: known sequences are skipped.
+    """
+
+    def post(self, request):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        kiosk = get_kiosk(token.strip()) if scheme.lower() == 'bearer' else None
+        if kiosk is None:
+            return JsonResponse({'error': "Unknown or inactive kiosk."}, status=401)
+        try:
+            body = json.loads(request.body)
+            result = ingest_punches(kiosk, body.get('punches') if isinstance(body, dict) else None)
+        except (json.JSONDecodeError, UnicodeDecodeError, PunchError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(result)
+
+
+class PunchVarianceView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """?start=YYYY-MM-DD&end=YYYY-MM-DD[&location=<id>] -> scheduled vs punched times per shift as JSON."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        location_id = request.GET.get('location')
+        if location_id and not location_id.isdigit():
+            return HttpResponseBadRequest("location must be a numeric id.")
+        try:
+            start, end = parse_range(request.GET.get('start'), request.GET.get('end'))
+        except HoursFilterError as e:
+            return HttpResponseBadRequest(str(e))
+        variance = punch_variance(start, end, int(location_id) if location_id else None)
+        return JsonResponse({'start': start.isoformat(), 'end': end.isoformat(), **variance})
@@ -0,0 +1,62 @@
+import datetime
+
+from .models import Shift
+
+UNASSIGNED_LOCATION = "Unassigned"
+
+
+def week_start(day):
+    """Monday of the week containing `day`."""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def week_dates(start):
+    return [start + datetime.timedelta(days=i) for i in range(7)]
+
+
+def week_shifts(start, location_id=None):
+    """All shifts of the week in one query, with every relation the schedule shows."""
+    shifts = Shift.objects.with_related().filter(
+        day__date__range=(start, start + datetime.timedelta(days=6))
+    )
+    if location_id:
+        shifts = shifts.at_location(location_id)
+    return shifts.order_by('day__date', 'section_number', 'start_time', 'id')
+
+
+def shift_location(shift):
+    if shift.day.location_id:
+        return shift.day.location.name
+    if shift.employee_job_id and shift.employee_job.profile.location_id:
+        return shift.employee_job.profile.location.name
+    return UNASSIGNED_LOCATION
+
+
+def group_week(shifts, dates):
+    """
+    Group shifts by location -> day -> section in Python.
+    Every location gets all the week's dates so the tables line up.
+    """
+    grouped = {}
+    for shift in shifts:
+        days = grouped.setdefault(shift_location(shift), {date: {} for date in dates})
+        sections = days.setdefault(shift.day.date, {})
+        sections.setdefault(shift.section_number, []).append(shift)
+
+    return [
+        {
+            'location': location,
+            'days': [
+                {
+                    'date': date,
+                    'sections': [
+                        {'number': number, 'shifts': sections[number]}
+                        # Unnumbered sections go last
+                        for number in sorted(sections, key=lambda n: (n is None, n or 0))
+                    ],
+                }
+                for date, sections in sorted(grouped[location].items())
+            ],
+        }
+        for location in sorted(grouped, key=lambda name: (name == UNASSIGNED_LOCATION, name))
+    ]
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Exam, Question, Choice
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
+from .models import Exam, Question, Choice, ExamStats
+from .analytics import get_item_analysis
 
 # Register your models here.
 class ChoiceInline(admin.TabularInline):
@@ -18,6 +21,42 @@ class ExamAdmin(admin.ModelAdmin):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('text', 'exam', 'order')
+    list_display = ('text', 'exam', 'order', 'responses', 'difficulty', 'discrimination')
+    list_select_related = ('exam',)
+    readonly_fields = ('item_analysis',)
     inlines = [ChoiceInline]
 
+    # Item analysis is computed once per exam and cached (see training.analytics)
+    def _analysis(self, obj):
+        return get_item_analysis(obj.exam_id)['questions'].get(obj.id, {})
+
+    @admin.display(description='Responses')
+    def responses(self, obj):
+        return self._analysis(obj).get('responses', 0)
+
+    @admin.display(description='Difficulty')
+    def difficulty(self, obj):
+        return self._analysis(obj).get('difficulty')
+
+    @admin.display(description='Discrimination')
+    def discrimination(self, obj):
+        return self._analysis(obj).get('discrimination')
+
+    @admin.display(description='Choice selection rates')
+    def item_analysis(self, obj):
+        if obj.pk is None:
+            return '-'
+        rates = self._analysis(obj).get('choices', {})
+        return format_html_join(
+            mark_safe('<br>'), '{}{}: {}%',
+            (
+                (choice.text, ' (correct)' if choice.is_correct else '', round(rates.get(choice.id, 0) * 100, 1))
+                for choice in obj.choices.all()
+            ),
+        ) or '-'
+
+
+@admin.register(ExamStats)
+class ExamStatsAdmin(admin.ModelAdmin):
+    list_display = ('exam', 'takers', 'passes', 'attempts', 'mean_score', 'last_submitted_at')
+    list_select_related = ('exam__job',)
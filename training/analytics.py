@@ -0,0 +1,107 @@
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+from .models import ExamAnswer, Question
+
+ITEM_ANALYSIS_TIMEOUT = 60 * 15
+
+
+def item_analysis_cache_key(exam_id):
+    return f"training:item_analysis:{exam_id}"
+
+
+def _load_answers(exam_id):
+    """Pull every answer for the exam as flat integer arrays (one query, no model instances)."""
+    rows = (
+        ExamAnswer.objects.filter(result__exam_id=exam_id)
+        .annotate(choice_key=Coalesce('choice_id', Value(0)))
+        .values_list('result_id', 'question_id', 'choice_key', 'is_correct')
+        .order_by()
+    )
+    data = np.array(list(rows.iterator(chunk_size=5000)), dtype=np.int64).reshape(-1, 4)
+    return data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+
+
+def compute_item_analysis(exam_id):
+    """
+    Classical item analysis for every question of an exam.
+
+    - difficulty: share of takers who answered the question correctly
+    - discrimination: correlation between getting the item right and the rest
+      of the taker's score (corrected point-biserial)
+    - choices: selection rate of every choice among takers who answered the question
+    """
+    key_rows = Question.objects.filter(exam_id=exam_id).values_list('id', 'choices__id').order_by('id')
+    question_ids, choice_ids = [], []
+    for question_id, choice_id in key_rows:
+        if not question_ids or question_ids[-1] != question_id:
+            question_ids.append(question_id)
+        if choice_id is not None:
+            choice_ids.append(choice_id)
+    question_ids = np.array(question_ids, dtype=np.int64)
+    choice_ids = np.sort(np.array(choice_ids, dtype=np.int64))
+
+    result_ids, answer_questions, answer_choices, answer_correct = _load_answers(exam_id)
+    _, rows = np.unique(result_ids, return_inverse=True)
+    takers = int(rows.max()) + 1 if rows.size else 0
+    cols = np.searchsorted(question_ids, answer_questions)
+
+    # takers x questions matrix of correct answers; skipped questions count as wrong
+    correct = np.zeros((takers, question_ids.size), dtype=np.float64)
+    correct[rows, cols] = answer_correct
+    responses = np.bincount(cols, minlength=question_ids.size)
+
+    if takers:
+        difficulty = correct.mean(axis=0)
+        rest = correct.sum(axis=1, keepdims=True) - correct
+        item_dev = correct - difficulty
+        rest_dev = rest - rest.mean(axis=0)
+        numerator = (item_dev * rest_dev).sum(axis=0)
+        denominator = np.sqrt((item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            discrimination = np.where(denominator > 0, numerator / denominator, np.nan)
+    else:
+        difficulty = np.full(question_ids.size, np.nan)
+        discrimination = np.full(question_ids.size, np.nan)
+
+    # Selection rate per choice, relative to the number of answers its question received
+    chosen = answer_choices > 0
+    choice_index = np.searchsorted(choice_ids, answer_choices[chosen])
+    selections = np.bincount(choice_index, minlength=choice_ids.size)
+
+    choice_rates = {}
+    for question_id, choice_id in key_rows:
+        if choice_id is None:
+            continue
+        col = np.searchsorted(question_ids, question_id)
+        index = np.searchsorted(choice_ids, choice_id)
+        rate = selections[index] / responses[col] if responses[col] else 0.0
+        choice_rates.setdefault(question_id, {})[choice_id] = round(float(rate), 4)
+
+    return {
+        'takers': takers,
+        'questions': {
+            int(question_id): {
+                'responses': int(responses[col]),
+                'difficulty': None if np.isnan(difficulty[col]) else round(float(difficulty[col]), 4),
+                'discrimination': None if np.isnan(discrimination[col]) else round(float(discrimination[col]), 4),
+                'choices': choice_rates.get(int(question_id), {}),
+            }
+            for col, question_id in enumerate(question_ids)
+        },
+    }
+
+
+def get_item_analysis(exam_id):
+    key = item_analysis_cache_key(exam_id)
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = compute_item_analysis(exam_id)
+        cache.set(key, analysis, ITEM_ANALYSIS_TIMEOUT)
+    return analysis
+
+
+def invalidate_item_analysis(exam_id):
+    cache.delete(item_analysis_cache_key(exam_id))
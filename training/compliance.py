@@ -0,0 +1,152 @@
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.safestring import mark_safe
+
+from accounts.models import Profile
+from jobs.models import EmployeeJob
+from .models import Exam, ExamResult
+
+COMPLIANCE_TIMEOUT = 60 * 60
+
+NOT_REQUIRED = -1
+NOT_TAKEN = 0
+FAILED = 1
+PASSED = 2
+
+# Indexed by status + 1 so a numpy row maps straight onto cell markup
+CELL_HTML = (
+    '<td class="text-muted">-</td>',
+    '<td><span class="badge bg-secondary">Not taken</span></td>',
+    '<td><span class="badge bg-danger">Failed</span></td>',
+    '<td><span class="badge bg-success">Passed</span></td>',
+)
+
+
+class ComplianceMatrix:
+    """Employees x required exams for one location, stored as a compact int8 array."""
+
+    def __init__(self, location_id, employees, exams, status):
+        self.location_id = location_id
+        self.employees = employees  # [(profile_id, name), ...]
+        self.exams = exams  # [(exam_id, label), ...]
+        self.status = status  # int8 array, shape (len(employees), len(exams))
+
+    def totals(self):
+        """Per-exam counts of passed / failed / not taken among employees who need it."""
+        return [
+            {'exam': label, 'passed': int(passed), 'failed': int(failed), 'not_taken': int(not_taken)}
+            for (_, label), passed, failed, not_taken in zip(
+                self.exams,
+                (self.status == PASSED).sum(axis=0),
+                (self.status == FAILED).sum(axis=0),
+                (self.status == NOT_TAKEN).sum(axis=0),
+            )
+        ]
+
+    def rows(self):
+        """Rows ready for the template: the cell markup is joined per row, not per cell."""
+        for (profile_id, name), statuses in zip(self.employees, self.status + 1):
+            yield {
+                'profile_id': profile_id,
+                'name': name,
+                'cells': mark_safe(''.join([CELL_HTML[s] for s in statuses.tolist()])),
+                'missing': int((statuses == NOT_TAKEN + 1).sum() + (statuses == FAILED + 1).sum()),
+            }
+
+
+def build_compliance_matrix(location_id):
+    """Build the matrix for one location with three set-based queries."""
+    assignments = list(
+        EmployeeJob.objects.filter(profile__location_id=location_id)
+        .values_list('profile_id', 'job_id', 'profile__user__username',
+                     'profile__user__first_name', 'profile__user__last_name')
+        .order_by('profile__user__username', 'job_id')
+    )
+    job_ids = {job_id for _, job_id, _, _, _ in assignments}
+    exams = list(
+        Exam.objects.filter(job_id__in=job_ids)
+        .values_list('id', 'job_id', 'title', 'season', 'year')
+        .order_by('job_id', '-year', 'title')
+    )
+
+    employees, employee_index = [], {}
+    for profile_id, _, username, first_name, last_name in assignments:
+        if profile_id not in employee_index:
+            employee_index[profile_id] = len(employees)
+            full_name = f"{first_name} {last_name}".strip()
+            employees.append((profile_id, full_name or username))
+
+    exam_index = {exam_id: i for i, (exam_id, _, _, _, _) in enumerate(exams)}
+    seasons = dict(Exam.SEASONS)
+    exam_labels = [(exam_id, f"{title} ({seasons.get(season, season)} {year})")
+                   for exam_id, _, title, season, year in exams]
+
+    status = np.full((len(employees), len(exams)), NOT_REQUIRED, dtype=np.int8)
+    if employees and exams:
+        # employees x jobs and jobs x exams incidence matrices; their product marks required cells
+        job_index = {job_id: i for i, job_id in enumerate(sorted(job_ids))}
+        holds = np.zeros((len(employees), len(job_index)), dtype=np.int32)
+        holds[
+            [employee_index[profile_id] for profile_id, _, _, _, _ in assignments],
+            [job_index[job_id] for _, job_id, _, _, _ in assignments],
+        ] = 1
+        covers = np.zeros((len(job_index), len(exams)), dtype=np.int32)
+        covers[[job_index[job_id] for _, job_id, _, _, _ in exams], list(range(len(exams)))] = 1
+        required = (holds @ covers) > 0
+        status[required] = NOT_TAKEN
+
+        results = (
+            ExamResult.objects.filter(profile__location_id=location_id, exam_id__in=list(exam_index))
+            .values_list('profile_id', 'exam_id')
+            .annotate(passes=Count('id', filter=Q(passed=True)))
+            .order_by()
+        )
+        rows, cols, passes = [], [], []
+        for profile_id, exam_id, n_passed in results:
+            if profile_id in employee_index:
+                rows.append(employee_index[profile_id])
+                cols.append(exam_index[exam_id])
+                passes.append(n_passed)
+        if rows:
+            rows, cols = np.array(rows), np.array(cols)
+            taken = np.where(np.array(passes) > 0, PASSED, FAILED).astype(np.int8)
+            keep = required[rows, cols]
+            status[rows[keep], cols[keep]] = taken[keep]
+
+    return ComplianceMatrix(location_id, employees, exam_labels, status)
+
+
+# -------------------------------
+# Caching
+# -------------------------------
+def _generation():
+    return cache.get_or_set('training:compliance:generation', time.time_ns, None)
+
+
+def compliance_cache_key(location_id):
+    return f"training:compliance:{_generation()}:{location_id}"
+
+
+def get_compliance_matrix(location_id):
+    key = compliance_cache_key(location_id)
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_compliance_matrix(location_id)
+        cache.set(key, matrix, COMPLIANCE_TIMEOUT)
+    return matrix
+
+
+def invalidate_compliance(location_ids):
+    cache.delete_many([compliance_cache_key(location_id) for location_id in set(location_ids) if location_id])
+
+
+def invalidate_compliance_for_profiles(profile_ids):
+    invalidate_compliance(Profile.objects.filter(pk__in=profile_ids).values_list('location_id', flat=True))
+
+
+def invalidate_all_compliance():
+    """Exams change what is required everywhere, so move every location to a new key."""
+    cache.set('training:compliance:generation', time.time_ns(), None)
@@ -0,0 +1,9 @@
+from .status import get_training_status
+
+
+def training_status(request):
+    """Pending/failed/passed exam counts for the navigation badges (cache hit = no queries)."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'training_status': get_training_status(user.pk)}
@@ -0,0 +1,71 @@
+import csv
+import json
+
+from mysite.streaming import Echo
+from .models import Exam, ExamResult
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (header, ORM path) pairs; the ORM paths are joined in a single query
+EXPORT_FIELDS = (
+    ('result_id', 'id'),
+    ('submitted_at', 'submitted_at'),
+    ('score', 'score'),
+    ('passed', 'passed'),
+    ('username', 'profile__user__username'),
+    ('email', 'profile__user__email'),
+    ('location', 'profile__location__name'),
+    ('exam_id', 'exam_id'),
+    ('exam', 'exam__title'),
+    ('season', 'exam__season'),
+    ('year', 'exam__year'),
+    ('job', 'exam__job__title'),
+)
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+class ExportFilterError(ValueError):
+    pass
+
+
+def export_rows(season=None, year=None, job=None, location=None):
+    """
+    Yield exam result rows as tuples, joined with profile, user, exam and job in one query.
+    iterator() streams the rows in chunks (a server-side cursor on PostgreSQL),
+    so memory stays flat however many results there are.
+    """
+    results = ExamResult.objects.all()
+    if season:
+        season = str(season).upper()
+        if season not in dict(Exam.SEASONS):
+            raise ExportFilterError(f"Unknown season '{season}'.")
+        results = results.filter(exam__season=season)
+    try:
+        if year:
+            results = results.filter(exam__year=int(year))
+        if job:
+            results = results.filter(exam__job_id=int(job))
+        if location:
+            results = results.filter(profile__location_id=int(location))
+    except (TypeError, ValueError):
+        raise ExportFilterError("year, job and location must be numeric ids.")
+
+    rows = results.order_by('id').values_list(*(path for _, path in EXPORT_FIELDS))
+    return rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    headers = [header for header, _ in EXPORT_FIELDS]
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=str) + "\n"
+
+
+def iter_export(fmt, rows):
+    return iter_csv(rows) if fmt == 'csv' else iter_ndjson(rows)
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Exam
+
+EXAM_FORM_TIMEOUT = 60 * 60 * 24
+EXAM_FORM_STATS_KEYS = {
+    'hits': 'training:exam_form:hits',
+    'misses': 'training:exam_form:misses',
+}
+
+
+def exam_form_cache_key(exam):
+    return f"training:exam_form:{exam.pk}:v{exam.content_version}"
+
+
+def bump_content_version(exam_ids):
+    """Invalidate cached exam forms by moving the exams to a new content version."""
+    Exam.objects.filter(pk__in=exam_ids).update(content_version=F('content_version') + 1)
+
+
+def _count(name):
+    key = EXAM_FORM_STATS_KEYS[name]
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # evicted between add() and incr(); losing one count is fine
+
+
+def exam_form_cache_stats():
+    values = cache.get_many(EXAM_FORM_STATS_KEYS.values())
+    return {name: values.get(key, 0) for name, key in EXAM_FORM_STATS_KEYS.items()}
+
+
+def render_exam_questions(exam):
+    """Return the rendered question block for an exam, cached under its content version."""
+    key = exam_form_cache_key(exam)
+    html = cache.get(key)
+    if html is None:
+        _count('misses')
+        html = render_to_string('training/_exam_questions.html', {
+            'questions': exam.questions.prefetch_related('choices'),
+        })
+        cache.set(key, html, EXAM_FORM_TIMEOUT)
+    else:
+        _count('hits')
+    return mark_safe(html)
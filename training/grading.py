@@ -0,0 +1,92 @@
+from django.core.cache import cache
+
+from .models import Question
+
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+
+
+class InvalidSubmission(Exception):
+    """Raised when a POST references a choice that does not belong to its question."""
+
+
+class GradeResult:
+    def __init__(self, exam, correct, total, answers):
+        self.exam = exam
+        self.correct = correct
+        self.total = total
+        # list of (question_id, choice_id, is_correct) for answered questions
+        self.answers = answers
+        self.score = round((correct / total) * 100, 2) if total else 0
+        self.passed = bool(total) and self.score >= exam.passing_score
+
+
+def answer_key_cache_key(exam_id):
+    return f"training:answer_key:{exam_id}"
+
+
+def build_answer_key(exam_id):
+    """
+    Load the answer key for an exam in a single query.
+    Returns {question_id: (choice_ids, correct_choice_ids)} using frozensets
+    so the cached value stays small and membership checks are cheap.
+    """
+    rows = Question.objects.filter(exam_id=exam_id).values_list(
+        'id', 'choices__id', 'choices__is_correct'
+    ).order_by()
+
+    choices, correct = {}, {}
+    for question_id, choice_id, is_correct in rows:
+        choices.setdefault(question_id, set())
+        correct.setdefault(question_id, set())
+        if choice_id is None:
+            continue  # question without choices still counts toward the total
+        choices[question_id].add(choice_id)
+        if is_correct:
+            correct[question_id].add(choice_id)
+
+    return {
+        question_id: (frozenset(choices[question_id]), frozenset(correct[question_id]))
+        for question_id in choices
+    }
+
+
+def get_answer_key(exam_id):
+    key = answer_key_cache_key(exam_id)
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = build_answer_key(exam_id)
+        cache.set(key, answer_key, ANSWER_KEY_TIMEOUT)
+    return answer_key
+
+
+def invalidate_answer_key(exam_id):
+    cache.delete(answer_key_cache_key(exam_id))
+
+
+def grade_submission(exam, data):
+    """
+    Grade a submitted exam entirely in memory against the cached answer key.
+    `data` is a mapping like request.POST with `question_<id>` -> choice id.
+    """
+    answer_key = get_answer_key(exam.pk)
+
+    correct = 0
+    answers = []
+    for question_id, (choice_ids, correct_ids) in answer_key.items():
+        selected = data.get(f"question_{question_id}")
+        if not selected:
+            continue  # skipped question
+
+        try:
+            choice_id = int(selected)
+        except (TypeError, ValueError):
+            raise InvalidSubmission(f"Invalid choice for question {question_id}.")
+        if choice_id not in choice_ids:
+            raise InvalidSubmission(f"Choice {choice_id} does not belong to question {question_id}.")
+
+        is_correct = choice_id in correct_ids
+        if is_correct:
+            correct += 1
+        answers.append((question_id, choice_id, is_correct))
+
+    return GradeResult(exam, correct, len(answer_key), answers)
@@ -0,0 +1,93 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Location, Profile
+from jobs.models import JobBase, EmployeeJob
+from training.compliance import build_compliance_matrix, compliance_cache_key
+from training.models import Exam, ExamResult
+from training.views import ComplianceReportView
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time the compliance report for a synthetic location (employees x required exams)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=2000)
+        parser.add_argument('--exams', type=int, default=50)
+        parser.add_argument('--jobs', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        location = Location.objects.create(name="Benchmark Location")
+        jobs = JobBase.objects.bulk_create(JobBase(title=f"Benchmark Job {i}") for i in range(options['jobs']))
+        jobs = list(JobBase.objects.filter(title__startswith="Benchmark Job"))
+        seasons = [key for key, _ in Exam.SEASONS]
+        exams = Exam.objects.bulk_create(
+            Exam(title=f"Exam {i}", job=jobs[i % len(jobs)], season=seasons[i % 4], year=1000 + i)
+            for i in range(options['exams'])
+        )
+        exams = list(Exam.objects.filter(job__in=jobs))
+
+        User.objects.bulk_create(
+            User(username=f"compliance-{i}", email=f"compliance-{i}@example.com")
+            for i in range(options['employees'])
+        )
+        users = User.objects.filter(username__startswith="compliance-")
+        Profile.objects.bulk_create(Profile(user=user, location=location) for user in users)
+        profiles = list(Profile.objects.filter(location=location))
+
+        # Every employee holds every job so the matrix is fully populated
+        EmployeeJob.objects.bulk_create(
+            EmployeeJob(profile=profile, job=job) for profile in profiles for job in jobs
+        )
+        ExamResult.objects.bulk_create(
+            ExamResult(profile=profile, exam=exam, score=rng.random() * 100, passed=rng.random() < 0.7)
+            for profile in profiles for exam in exams if rng.random() < 0.6
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            matrix = build_compliance_matrix(location.pk)
+            built = time.perf_counter() - start
+        self.stdout.write(f"build: {matrix.status.shape[0]} x {matrix.status.shape[1]} in {built * 1000:.1f} ms, "
+                          f"{len(ctx.captured_queries)} queries, {matrix.status.nbytes} bytes of status data")
+
+        staff = User.objects.create_user(username="compliance-staff", email="staff@example.com", is_staff=True)
+        view = ComplianceReportView.as_view()
+
+        def render():
+            request = RequestFactory().get("/compliance/", {'location': location.pk})
+            request.user = staff
+            start = time.perf_counter()
+            response = view(request)
+            response.render()
+            return time.perf_counter() - start, len(response.content)
+
+        cache.delete(compliance_cache_key(location.pk))
+        cold, size = render()
+        warm, _ = render()
+        self.stdout.write(f"render (cache miss): {cold * 1000:.1f} ms, {size // 1024} KiB")
+        self.stdout.write(f"render (cache hit):  {warm * 1000:.1f} ms")
@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from jobs.models import JobBase
+from training.fragments import exam_form_cache_key, exam_form_cache_stats
+from training.models import Exam, Question, Choice
+from training.views import ExamView
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare ExamView.get with a cold and a warm exam form fragment cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--runs', type=int, default=100)
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        job = JobBase.objects.create(title="Benchmark Job")
+        exam = Exam.objects.create(title="Benchmark Exam", job=job, season='FALL', year=1900)
+        questions = Question.objects.bulk_create(
+            Question(exam=exam, text=f"Question {i}?", order=i) for i in range(options['questions'])
+        )
+        Choice.objects.bulk_create(
+            Choice(question=q, text=f"Choice {c}", is_correct=(c == 0))
+            for q in questions for c in range(options['choices'])
+        )
+        user = get_user_model().objects.create_user(username="exam-form-benchmark", email="bench@example.com")
+
+        view = ExamView.as_view()
+        factory = RequestFactory()
+
+        def get():
+            request = factory.get(f"/exam/{exam.pk}/take/")
+            request.user = user
+            return view(request, pk=exam.pk)
+
+        def miss():
+            cache.delete(exam_form_cache_key(exam))
+            get()
+
+        self._report("miss", miss, options['runs'])
+        self._report("hit", get, options['runs'])
+        self.stdout.write(f"counters: {exam_form_cache_stats()}")
+
+    def _report(self, label, func, runs):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        queries = len(ctx.captured_queries)
+
+        elapsed = 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - start
+            reset_queries()  # keep DEBUG query logging from growing
+        elapsed = elapsed / runs * 1000
+
+        self.stdout.write(f"{label:>6}: {queries} queries/request, {elapsed:.3f} ms/request")
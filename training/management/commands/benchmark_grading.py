@@ -0,0 +1,85 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.shortcuts import get_object_or_404
+from django.test.utils import CaptureQueriesContext
+
+from jobs.models import JobBase
+from training.grading import grade_submission, invalidate_answer_key
+from training.models import Exam, Question, Choice
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_grade(exam, data):
+    """The per-question grading loop ExamView.post used before the answer key cache."""
+    questions = exam.questions.prefetch_related('choices')
+    total = questions.count()
+    correct = 0
+    for question in questions:
+        selected_choice_id = data.get(f"question_{question.id}")
+        if not selected_choice_id:
+            continue
+        selected_choice = get_object_or_404(Choice, id=selected_choice_id)
+        if selected_choice.is_correct:
+            correct += 1
+    return round((correct / total) * 100, 2)
+
+
+class Command(BaseCommand):
+    help = "Compare queries and latency per exam submission for legacy vs cached grading."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--runs', type=int, default=200)
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        job = JobBase.objects.create(title="Benchmark Job")
+        exam = Exam.objects.create(title="Benchmark Exam", job=job, season='FALL', year=1900)
+        questions = Question.objects.bulk_create(
+            Question(exam=exam, text=f"Question {i}", order=i) for i in range(options['questions'])
+        )
+        if questions[0].pk is None:
+            questions = list(exam.questions.all())
+        Choice.objects.bulk_create(
+            Choice(question=q, text=f"Choice {c}", is_correct=(c == 0))
+            for q in questions for c in range(options['choices'])
+        )
+        correct_ids = dict(
+            Choice.objects.filter(question__exam=exam, is_correct=True).values_list('question_id', 'id')
+        )
+        data = {f"question_{qid}": str(cid) for qid, cid in correct_ids.items()}
+        invalidate_answer_key(exam.pk)
+
+        self._report("legacy", lambda: legacy_grade(exam, data), options['runs'])
+        grade_submission(exam, data)  # warm the answer key cache
+        self._report("cached", lambda: grade_submission(exam, data), options['runs'])
+
+    def _report(self, label, func, runs):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        queries = len(ctx.captured_queries)
+
+        elapsed = 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - start
+            reset_queries()  # keep DEBUG query logging from growing
+        elapsed = elapsed / runs * 1000
+
+        self.stdout.write(f"{label:>8}: {queries} queries/submission, {elapsed:.3f} ms/submission")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from training.exports import EXPORT_FORMATS, ExportFilterError, export_rows, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream ExamResult history as CSV or NDJSON without loading it into memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--season')
+        parser.add_argument('--year', type=int)
+        parser.add_argument('--job', type=int, help="JobBase id")
+        parser.add_argument('--location', type=int, help="Location id")
+        parser.add_argument('--output', help="File to write (defaults to stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            rows = export_rows(
+                season=options['season'],
+                year=options['year'],
+                job=options['job'],
+                location=options['location'],
+            )
+        except ExportFilterError as e:
+            raise CommandError(str(e))
+
+        chunks = iter_export(options['format'], rows)
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from training.submissions import flush_submissions, prune_submissions
+
+# Seconds between prunes of processed outbox rows with --loop
+PRUNE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = ("Write buffered exam submissions from the outbox as ExamResult rows in batches, "
+            "then delete rows processed more than TRAINING_SUBMISSION_RETENTION_DAYS ago.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        total, pruned_at = 0, None
+        while True:
+            processed = flush_submissions(options['batch_size'])
+            total += processed
+            if processed:
+                self.stdout.write(f"Flushed {processed} submission(s).")
+                continue
+            if pruned_at is None or time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                pruned = prune_submissions()
+                pruned_at = time.monotonic()
+                if pruned:
+                    self.stdout.write(f"Pruned {pruned} processed submission(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} submission(s) flushed."))
@@ -0,0 +1,234 @@
+import csv
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from jobs.models import JobBase
+from training.analytics import invalidate_item_analysis
+from training.fragments import bump_content_version
+from training.grading import invalidate_answer_key
+from training.models import Exam, Question, Choice
+
+SEASONS = {key for key, _ in Exam.SEASONS}
+EXAM_TITLE_MAX_LENGTH = Exam._meta.get_field('title').max_length
+CHOICE_MAX_LENGTH = Choice._meta.get_field('text').max_length
+
+
+def read_jsonl(stream):
+    """
+    One question per line:
+    {"job": "Server", "season": "FALL", "year": 2025, "exam": "Server Knowledge",
+     "passing_score": 90, "description": "...", "order": 1, "question": "...",
+     "choices": [{"text": "...", "is_correct": true}, ...]}
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            raise CommandError(f"Line {line_number}: invalid JSON ({e})")
+
+
+def read_csv(stream):
+    """
+    One question per row with columns job, season, year, exam, passing_score,
+    description, order, question, choices and correct. Choices are separated
+    by "|" and correct lists the 1-based positions of the correct choices.
+    """
+    for row_number, row in enumerate(csv.DictReader(stream), start=2):
+        choices = [text.strip() for text in (row.get('choices') or '').split('|') if text.strip()]
+        correct = {position.strip() for position in (row.get('correct') or '').split('|')}
+        row['choices'] = [
+            {'text': text, 'is_correct': str(position) in correct}
+            for position, text in enumerate(choices, start=1)
+        ]
+        yield row_number, row
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSONL question bank into Exam, Question and Choice rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Input format (defaults to the file extension).")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Questions buffered before each bulk insert.")
+        parser.add_argument('--no-copy', action='store_true',
+                            help="Use bulk_create even when PostgreSQL COPY is available.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate the file without writing anything.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'jsonl')
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+
+        self.jobs = {}
+        self.exams = {}
+        self.touched_exams = set()
+        self.batch = []
+        self.counts = {'exams': 0, 'questions': 0, 'choices': 0}
+
+        start = time.perf_counter()
+        with open(options['path'], newline='', encoding='utf-8') as stream:
+            records = read_csv(stream) if fmt == 'csv' else read_jsonl(stream)
+            with transaction.atomic():
+                for line_number, record in records:
+                    self.add(line_number, record)
+                self.flush()
+        elapsed = time.perf_counter() - start
+
+        # bulk inserts skip the Question/Choice signals, so invalidate explicitly
+        bump_content_version(self.touched_exams)
+        for exam_id in self.touched_exams:
+            invalidate_answer_key(exam_id)
+            invalidate_item_analysis(exam_id)
+
+        rows = sum(self.counts.values())
+        verb = "Validated" if self.dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.counts['exams']} exam(s), {self.counts['questions']} question(s), "
+            f"{self.counts['choices']} choice(s) in {elapsed:.2f}s "
+            f"({rows / elapsed if elapsed else rows:.0f} rows/s, {'COPY' if self.use_copy else 'bulk_create'})"
+        ))
+
+    # -------------------------------
+    # Validation
+    # -------------------------------
+    def add(self, line_number, record):
+        def error(message):
+            return CommandError(f"Line {line_number}: {message}")
+
+        if not isinstance(record, dict):
+            raise error("expected a JSON object")
+        for field in ('job', 'season', 'year', 'exam', 'question'):
+            if not str(record.get(field) or '').strip():
+                raise error(f"missing '{field}'")
+
+        if not isinstance(record['question'], str):
+            raise error("question must be a string")
+        if len(str(record['exam']).strip()) > EXAM_TITLE_MAX_LENGTH:
+            raise error(f"exam title longer than {EXAM_TITLE_MAX_LENGTH} characters")
+
+        season = str(record['season']).strip().upper()
+        if season not in SEASONS:
+            raise error(f"unknown season '{record['season']}'")
+        try:
+            year = int(record['year'])
+            order = int(record.get('order') or 0)
+            passing_score = int(record.get('passing_score') or 90)
+        except (TypeError, ValueError):
+            raise error("year, order and passing_score must be integers")
+        if min(year, order, passing_score) < 0:
+            # Stored in positive integer fields, which would fail the whole import at insert time
+            raise error("year, order and passing_score can't be negative")
+
+        choices = record.get('choices') or []
+        if not isinstance(choices, list) or not all(isinstance(choice, dict) for choice in choices):
+            raise error("choices must be a list of objects")
+        if len(choices) < 2:
+            raise error("a question needs at least two choices")
+        if not any(choice.get('is_correct') for choice in choices):
+            raise error("no correct choice marked")
+        for choice in choices:
+            if not isinstance(choice.get('text'), str):
+                raise error("choice text must be a string")
+            if not choice['text'].strip():
+                raise error("empty choice text")
+            if len(choice['text']) > CHOICE_MAX_LENGTH:
+                raise error(f"choice longer than {CHOICE_MAX_LENGTH} characters")
+
+        job_id = self.resolve_job(str(record['job']).strip(), error)
+        exam_id = self.resolve_exam(job_id, season, year, record, passing_score)
+
+        self.batch.append((exam_id, record['question'], order, choices))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def resolve_job(self, title, error):
+        if title not in self.jobs:
+            job_ids = list(JobBase.objects.filter(title=title).values_list('id', flat=True)[:2])
+            if len(job_ids) != 1:
+                raise error(f"job '{title}' {'is ambiguous' if job_ids else 'does not exist'}")
+            self.jobs[title] = job_ids[0]
+        return self.jobs[title]
+
+    def resolve_exam(self, job_id, season, year, record, passing_score):
+        key = (job_id, season, year)
+        if key not in self.exams:
+            exam_id = Exam.objects.filter(job_id=job_id, season=season, year=year).values_list('id', flat=True).first()
+            if exam_id is None:
+                self.counts['exams'] += 1
+                if not self.dry_run:
+                    exam_id = Exam.objects.create(
+                        job_id=job_id, season=season, year=year,
+                        title=str(record['exam']).strip(),
+                        description=record.get('description') or None,
+                        passing_score=passing_score,
+                    ).id
+            self.exams[key] = exam_id
+        return self.exams[key]
+
+    # -------------------------------
+    # Loading
+    # -------------------------------
+    def flush(self):
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        self.counts['questions'] += len(batch)
+        self.counts['choices'] += sum(len(choices) for _, _, _, choices in batch)
+        if self.dry_run:
+            return
+
+        self.touched_exams.update(exam_id for exam_id, _, _, _ in batch)
+        if self.use_copy:
+            self.copy_batch(batch)
+        else:
+            self.bulk_create_batch(batch)
+
+    def bulk_create_batch(self, batch):
+        questions = Question.objects.bulk_create(
+            Question(exam_id=exam_id, text=text, order=order) for exam_id, text, order, _ in batch
+        )
+        Choice.objects.bulk_create(
+            Choice(question_id=question.id, text=choice['text'], is_correct=bool(choice.get('is_correct')))
+            for question, (_, _, _, choices) in zip(questions, batch)
+            for choice in choices
+        )
+
+    def copy_batch(self, batch):
+        question_table = Question._meta.db_table
+        choice_table = Choice._meta.db_table
+        with connection.cursor() as cursor:
+            # Reserve ids up front so choices can reference questions loaded by the same COPY
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [question_table, len(batch)],
+            )
+            question_ids = [row[0] for row in cursor.fetchall()]
+
+            self._copy(cursor, question_table, ('id', 'exam_id', 'text', 'order'), (
+                (question_id, exam_id, text, order)
+                for question_id, (exam_id, text, order, _) in zip(question_ids, batch)
+            ))
+            self._copy(cursor, choice_table, ('question_id', 'text', 'is_correct'), (
+                (question_id, choice['text'], 't' if choice.get('is_correct') else 'f')
+                for question_id, (_, _, _, choices) in zip(question_ids, batch)
+                for choice in choices
+            ))
+
+    def _copy(self, cursor, table, columns, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        column_list = ', '.join(connection.ops.quote_name(column) for column in columns)
+        cursor.copy_expert(
+            f"COPY {connection.ops.quote_name(table)} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
@@ -0,0 +1,83 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test import RequestFactory, override_settings
+
+from jobs.models import JobBase
+from training.models import Exam, Question, Choice, ExamResult
+from training.submissions import flush_submissions
+from training.views import ExamView
+
+
+class Command(BaseCommand):
+    help = "Measure exam submission throughput with direct writes vs the buffered outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=500)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Writes are committed for realistic timings, so the data is removed afterwards
+        job = JobBase.objects.create(title=f"Load Test {uuid.uuid4().hex[:8]}")
+        users = []
+        try:
+            exam = Exam.objects.create(title="Load Test Exam", job=job, season='FALL', year=1900)
+            questions = Question.objects.bulk_create(
+                Question(exam=exam, text=f"Question {i}?", order=i) for i in range(options['questions'])
+            )
+            Choice.objects.bulk_create(
+                Choice(question=q, text=f"Choice {c}", is_correct=(c == 0)) for q in questions for c in range(4)
+            )
+            data = {
+                f"question_{question_id}": str(choice_id)
+                for question_id, choice_id in Choice.objects.filter(
+                    question__exam=exam, is_correct=True).values_list('question_id', 'id')
+            }
+            users = [
+                get_user_model().objects.create_user(username=f"loadtest-{uuid.uuid4().hex}", email=f"{uuid.uuid4().hex}@example.com")
+                for _ in range(min(options['submissions'], 50))
+            ]
+
+            direct = self._submit(exam, users, data, options, buffered=False)
+            self.stdout.write(f"  direct: {options['submissions'] / direct:8.1f} submissions/s")
+
+            buffered = self._submit(exam, users, data, options, buffered=True)
+            start = time.perf_counter()
+            while flush_submissions(options['batch_size']):
+                pass
+            flushed = time.perf_counter() - start
+            self.stdout.write(f"buffered: {options['submissions'] / buffered:8.1f} submissions/s in the request path, "
+                              f"flush {options['submissions'] / flushed:8.1f} results/s")
+            self.stdout.write(f"results written: {ExamResult.objects.filter(exam=exam).count()}")
+        finally:
+            job.delete()
+            for user in users:
+                user.delete()
+
+    def _submit(self, exam, users, data, options, buffered):
+        view = ExamView.as_view()
+        factory = RequestFactory()
+
+        def submit(i):
+            request = factory.post(f"/exam/{exam.pk}/take/", dict(data, submission_token=str(uuid.uuid4())))
+            request.user = users[i % len(users)]
+            view(request, pk=exam.pk)
+            reset_queries()  # keep DEBUG query logging from growing
+
+        def run(indexes):
+            for i in indexes:
+                submit(i)
+            connection.close()
+
+        threads = options['threads']
+        chunks = [range(t, options['submissions'], threads) for t in range(threads)]
+        start = time.perf_counter()
+        with override_settings(TRAINING_BUFFERED_SUBMISSIONS=buffered), ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(run, chunks))
+        return time.perf_counter() - start
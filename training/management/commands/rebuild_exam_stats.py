@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from training.stats import rebuild_exam_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ExamStats table from ExamResult history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', dest='exam_ids',
+                            help="Only rebuild the given exam id (can be repeated).")
+
+    def handle(self, *args, **options):
+        count = rebuild_exam_stats(options['exam_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} exam(s)."))
@@ -0,0 +1,52 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_exam_stats(apps, schema_editor):
+    ExamResult = apps.get_model('training', 'ExamResult')
+    ExamStats = apps.get_model('training', 'ExamStats')
+    rows = ExamResult.objects.values('exam_id').annotate(
+        n_attempts=models.Count('id'),
+        n_takers=models.Count('profile', distinct=True),
+        n_passes=models.Count('profile', filter=models.Q(passed=True), distinct=True),
+        avg_score=models.Avg('score'),
+        last=models.Max('submitted_at'),
+    ).order_by()
+    ExamStats.objects.bulk_create([
+        ExamStats(
+            exam_id=row['exam_id'],
+            attempts=row['n_attempts'],
+            takers=row['n_takers'],
+            passes=row['n_passes'],
+            mean_score=row['avg_score'] or 0,
+            last_submitted_at=row['last'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStats',
+            fields=[
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='training.exam')),
+                ('takers', models.PositiveIntegerField(default=0)),
+                ('passes', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('mean_score', models.FloatField(default=0)),
+                ('last_submitted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'exam stats',
+            },
+        ),
+        migrations.RunPython(backfill_exam_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0002_examstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examresult',
+            index=models.Index(fields=['profile', 'exam', '-submitted_at'], name='examresult_latest_idx'),
+        ),
+    ]
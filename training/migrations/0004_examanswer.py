@@ -0,0 +1,24 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0003_examresult_latest_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_correct', models.BooleanField(default=False)),
+                ('choice', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='answers', to='training.choice')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='training.question')),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='training.examresult')),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_customuser_is_active'),
+        ('training', '0005_exam_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examresult',
+            name='submission_token',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='examresult',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ExamSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(unique=True)),
+                ('score', models.FloatField()),
+                ('passed', models.BooleanField(default=False)),
+                ('answers', models.JSONField(default=list)),
+                ('submitted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='training.exam')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.profile')),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connections, models
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 from jobs.models import JobBase, Profile
 
@@ -18,6 +19,8 @@ class Exam(models.Model):
     year = models.PositiveIntegerField()
     passing_score = models.PositiveIntegerField(default=90)
     date_created = models.DateTimeField(default=timezone.now)
+    # Bumped whenever a question or choice changes; keys the cached exam form
+    content_version = models.PositiveIntegerField(default=1, editable=False)
 
     class Meta:
         unique_together = ('job', 'season', 'year')
@@ -27,6 +30,14 @@ class Exam(models.Model):
     def __str__(self):
         return f"{self.job.title} Exam - ({self.get_season_display()} {self.year})"
 
+    def save(self, *args, **kwargs):
+        # content_version only moves through bump_content_version(); an instance loaded before a
+        # question changed must not write its stale version back and resurrect the old cached form
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'content_version']
+        super().save(*args, **kwargs)
+
 class Question(models.Model):
     exam = models.ForeignKey(Exam,on_delete=models.CASCADE, related_name='questions')
     text = models.TextField()
@@ -47,9 +58,80 @@ class Choice(models.Model):
         return f"Choice for Q{self.question.id}: {self.text[:40]}"
 
 
+class ExamResultQuerySet(models.QuerySet):
+    def latest_attempts(self):
+        """
+        Keep only the most recent attempt per (profile, exam).
+        Uses DISTINCT ON in PostgreSQL and a correlated subquery elsewhere;
+        both are served by the (profile, exam, -submitted_at) index.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            return self.order_by('profile_id', 'exam_id', '-submitted_at', '-id').distinct('profile_id', 'exam_id')
+
+        latest = ExamResult.objects.filter(
+            profile_id=OuterRef('profile_id'), exam_id=OuterRef('exam_id')
+        ).order_by('-submitted_at', '-id').values('id')[:1]
+        return self.filter(id=Subquery(latest))
+
+
 class ExamResult(models.Model):
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
     score = models.FloatField()
     passed = models.BooleanField(default=False)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add so buffered submissions keep the time they were graded
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Client-generated token that makes double-posts of the same exam form idempotent
+    submission_token = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    objects = ExamResultQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'exam', '-submitted_at'], name='examresult_latest_idx'),
+        ]
+
+
+class ExamAnswer(models.Model):
+    result = models.ForeignKey(ExamResult, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
+    choice = models.ForeignKey(Choice, on_delete=models.SET_NULL, null=True, related_name='answers')
+    is_correct = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Answer to Q{self.question_id} on result {self.result_id}"
+
+
+class ExamSubmission(models.Model):
+    """
+    Outbox row for a graded submission that has not been written as an ExamResult yet.
+    Only used when TRAINING_BUFFERED_SUBMISSIONS is on; flushed by `flush_exam_submissions`.
+    """
+    token = models.UUIDField(unique=True)
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    score = models.FloatField()
+    passed = models.BooleanField(default=False)
+    # list of [question_id, choice_id, is_correct]
+    answers = models.JSONField(default=list)
+    submitted_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"Submission {self.token} ({'processed' if self.processed_at else 'pending'})"
+
+
+class ExamStats(models.Model):
+    """Per-exam totals kept up to date as results come in (see training.stats)."""
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    takers = models.PositiveIntegerField(default=0)
+    passes = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    mean_score = models.FloatField(default=0)
+    last_submitted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'exam stats'
+
+    def __str__(self):
+        return f"Stats for {self.exam_id}"
@@ -0,0 +1,76 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+from accounts.models import Profile
+from jobs.models import EmployeeJob
+from .models import Exam, Question, Choice, ExamResult
+from .grading import invalidate_answer_key
+from .analytics import invalidate_item_analysis
+from .fragments import bump_content_version
+from .stats import record_results
+from .compliance import invalidate_all_compliance, invalidate_compliance, invalidate_compliance_for_profiles
+from .status import invalidate_training_status, invalidate_training_status_for_jobs
+
+# Sent with `results=[...]` whenever ExamResults are created, including bulk inserts
+results_created = Signal()
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_answer_key(instance.exam_id)
+    invalidate_item_analysis(instance.exam_id)
+    bump_content_version([instance.exam_id])
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    # Look the exam up by id: on cascade deletes the cached question may be stale
+    exam_id = Question.objects.filter(pk=instance.question_id).values_list('exam_id', flat=True).first()
+    if exam_id is not None:
+        invalidate_answer_key(exam_id)
+        invalidate_item_analysis(exam_id)
+        bump_content_version([exam_id])
+
+
+@receiver(post_save, sender=ExamResult)
+def exam_result_created(sender, instance, created, **kwargs):
+    if created:
+        results_created.send(sender=ExamResult, results=[instance])
+
+
+@receiver(results_created)
+def update_exam_stats(sender, results, **kwargs):
+    record_results(results)
+
+
+@receiver(results_created)
+def invalidate_result_caches(sender, results, **kwargs):
+    profiles = Profile.objects.filter(pk__in={result.profile_id for result in results})
+    user_ids, location_ids = set(), set()
+    for user_id, location_id in profiles.values_list('user_id', 'location_id'):
+        user_ids.add(user_id)
+        location_ids.add(location_id)
+    invalidate_training_status(user_ids)
+    invalidate_compliance(location_ids)
+
+
+@receiver([post_save, post_delete], sender=EmployeeJob)
+def employee_job_changed(sender, instance, **kwargs):
+    invalidate_compliance_for_profiles([instance.profile_id])
+    invalidate_training_status(
+        Profile.objects.filter(pk=instance.profile_id).values_list('user_id', flat=True)
+    )
+
+
+@receiver(pre_save, sender=Exam)
+def remember_exam_job(sender, instance, **kwargs):
+    # An exam moved to another job changes the requirements of both jobs' employees
+    instance._previous_job_id = (
+        Exam.objects.filter(pk=instance.pk).values_list('job_id', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    invalidate_all_compliance()
+    job_ids = {instance.job_id, getattr(instance, '_previous_job_id', None)} - {None}
+    invalidate_training_status_for_jobs(job_ids)
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ExamResult, ExamStats
+
+
+def record_results(results):
+    """
+    Fold newly created ExamResults into their exams' stats rows.
+    Runs in the same transaction as the result inserts so the two never drift.
+    """
+    results = sorted(results, key=lambda r: (r.submitted_at, r.pk))
+    profile_ids = {r.profile_id for r in results}
+    exam_ids = {r.exam_id for r in results}
+
+    # (profile, exam) pairs that already had an attempt / a pass before this batch
+    previous = ExamResult.objects.filter(
+        profile_id__in=profile_ids, exam_id__in=exam_ids
+    ).exclude(pk__in=[r.pk for r in results]).values_list('profile_id', 'exam_id', 'passed')
+    taken, passed = set(), set()
+    for profile_id, exam_id, result_passed in previous:
+        taken.add((profile_id, exam_id))
+        if result_passed:
+            passed.add((profile_id, exam_id))
+
+    deltas = {}
+    for result in results:
+        pair = (result.profile_id, result.exam_id)
+        delta = deltas.setdefault(result.exam_id, {'attempts': 0, 'takers': 0, 'passes': 0, 'score': 0.0, 'last': None})
+        delta['attempts'] += 1
+        delta['score'] += result.score
+        delta['last'] = result.submitted_at
+        if pair not in taken:
+            taken.add(pair)
+            delta['takers'] += 1
+        if result.passed and pair not in passed:
+            passed.add(pair)
+            delta['passes'] += 1
+
+    with transaction.atomic():
+        for exam_id, delta in deltas.items():
+            ExamStats.objects.get_or_create(exam_id=exam_id)
+            # All F() references read the pre-update values, so the running mean is exact
+            ExamStats.objects.filter(exam_id=exam_id).update(
+                attempts=F('attempts') + delta['attempts'],
+                takers=F('takers') + delta['takers'],
+                passes=F('passes') + delta['passes'],
+                mean_score=(F('mean_score') * F('attempts') + delta['score']) / (F('attempts') + delta['attempts']),
+                last_submitted_at=Greatest(Coalesce('last_submitted_at', Value(delta['last'])), Value(delta['last'])),
+            )
+
+
+def rebuild_exam_stats(exam_ids=None):
+    """Recompute stats from ExamResult with one grouped query. Returns the number of rows written."""
+    results = ExamResult.objects.all()
+    stats = ExamStats.objects.all()
+    if exam_ids is not None:
+        results = results.filter(exam_id__in=exam_ids)
+        stats = stats.filter(exam_id__in=exam_ids)
+
+    rows = results.values('exam_id').annotate(
+        n_attempts=Count('id'),
+        n_takers=Count('profile', distinct=True),
+        n_passes=Count('profile', filter=Q(passed=True), distinct=True),
+        avg_score=Avg('score'),
+        last=Max('submitted_at'),
+    ).order_by()
+
+    new_stats = [
+        ExamStats(
+            exam_id=row['exam_id'],
+            attempts=row['n_attempts'],
+            takers=row['n_takers'],
+            passes=row['n_passes'],
+            mean_score=row['avg_score'] or 0,
+            last_submitted_at=row['last'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        stats.delete()
+        ExamStats.objects.bulk_create(new_stats)
+    return len(new_stats)
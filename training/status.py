@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from jobs.models import EmployeeJob
+from .models import Exam, ExamResult
+
+TRAINING_STATUS_TIMEOUT = 60 * 60 * 24
+
+
+def training_status_cache_key(user_id):
+    return f"training:status:{user_id}"
+
+
+def compute_training_status(user_id):
+    """
+    Summarize a user's required exams the same way AvailableExamView does:
+    an exam is passed once any attempt passed, failed if attempted but never passed,
+    and remaining if never attempted.
+    """
+    exams = list(
+        Exam.objects.filter(job__employees__profile__user_id=user_id)
+        .values_list('id', 'title').distinct().order_by('-year', '-season', 'id')
+    )
+    attempts = dict(
+        ExamResult.objects.filter(profile__user_id=user_id, exam_id__in=[exam_id for exam_id, _ in exams])
+        .values_list('exam_id')
+        .annotate(passes=Count('id', filter=Q(passed=True)))
+        .order_by()
+    )
+
+    status = {'remaining': 0, 'failed': 0, 'passed': 0, 'next_due': None}
+    for exam_id, title in exams:
+        if exam_id not in attempts:
+            status['remaining'] += 1
+        elif attempts[exam_id]:
+            status['passed'] += 1
+            continue
+        else:
+            status['failed'] += 1
+        if status['next_due'] is None:
+            status['next_due'] = {'id': exam_id, 'title': title}
+    status['pending'] = status['remaining'] + status['failed']
+    return status
+
+
+def get_training_status(user_id):
+    key = training_status_cache_key(user_id)
+    status = cache.get(key)
+    if status is None:
+        status = compute_training_status(user_id)
+        cache.set(key, status, TRAINING_STATUS_TIMEOUT)
+    return status
+
+
+def invalidate_training_status(user_ids):
+    cache.delete_many([training_status_cache_key(user_id) for user_id in set(user_ids)])
+
+
+def invalidate_training_status_for_jobs(job_ids):
+    invalidate_training_status(
+        EmployeeJob.objects.filter(job_id__in=job_ids).values_list('profile__user_id', flat=True)
+    )
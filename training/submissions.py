@@ -0,0 +1,130 @@
+import datetime
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Choice, ExamAnswer, ExamResult, ExamSubmission, Question
+from .signals import results_created
+
+
+class SubmissionTokenConflict(Exception):
+    """The submission token was already used by another profile."""
+
+
+def parse_submission_token(value):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def save_result(profile, grade, token=None):
+    """
+    Write a graded submission straight away (the default, unbuffered path).
+    A repeated token returns the result that was already saved.
+    """
+    try:
+        with transaction.atomic():
+            result = ExamResult.objects.create(
+                profile=profile,
+                exam=grade.exam,
+                score=grade.score,
+                passed=grade.passed,
+                submission_token=token,
+            )
+            ExamAnswer.objects.bulk_create([
+                ExamAnswer(result=result, question_id=question_id, choice_id=choice_id, is_correct=is_correct)
+                for question_id, choice_id, is_correct in grade.answers
+            ])
+    except IntegrityError:
+        result = ExamResult.objects.filter(submission_token=token).first() if token else None
+        if result is None:
+            raise
+        if result.profile_id != profile.pk:
+            raise SubmissionTokenConflict("This submission token belongs to another user.")
+    return result
+
+
+def enqueue_submission(profile, grade, token=None):
+    """
+    Put a graded submission on the outbox for `flush_submissions` to write later.
+    Double-posts with the same token get the row that is already queued.
+    """
+    submission, _ = ExamSubmission.objects.get_or_create(
+        token=token or uuid.uuid4(),
+        defaults={
+            'profile': profile,
+            'exam': grade.exam,
+            'score': grade.score,
+            'passed': grade.passed,
+            'answers': [list(answer) for answer in grade.answers],
+        },
+    )
+    if submission.profile_id != profile.pk:
+        raise SubmissionTokenConflict("This submission token belongs to another user.")
+    return submission
+
+
+def flush_submissions(batch_size=500):
+    """
+    Move one batch of pending outbox rows into ExamResult/ExamAnswer with bulk inserts.
+    Safe to run from several workers: rows are claimed with SKIP LOCKED where supported.
+    Returns the number of submissions processed.
+    """
+    with transaction.atomic():
+        pending = ExamSubmission.objects.filter(processed_at__isnull=True).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        pending = list(pending[:batch_size])
+        if not pending:
+            return 0
+
+        tokens = [submission.token for submission in pending]
+        # A token can already have a result if the direct path saved it first
+        existing = set(ExamResult.objects.filter(submission_token__in=tokens).values_list('submission_token', flat=True))
+        new = [submission for submission in pending if submission.token not in existing]
+
+        ExamResult.objects.bulk_create([
+            ExamResult(
+                profile_id=submission.profile_id,
+                exam_id=submission.exam_id,
+                score=submission.score,
+                passed=submission.passed,
+                submitted_at=submission.submitted_at,
+                submission_token=submission.token,
+            )
+            for submission in new
+        ])
+        # Re-read instead of relying on returned ids so every backend behaves the same
+        results = {
+            result.submission_token: result
+            for result in ExamResult.objects.filter(submission_token__in=[submission.token for submission in new])
+        }
+        # Questions and choices edited out since grading: drop or null the answers as their
+        # foreign keys would have, so one stale submission can't fail the whole batch
+        answers = [answer for submission in new for answer in submission.answers]
+        questions = set(Question.objects.filter(pk__in={answer[0] for answer in answers}).values_list('id', flat=True))
+        choices = set(Choice.objects.filter(pk__in={answer[1] for answer in answers if answer[1] is not None})
+                      .values_list('id', flat=True))
+        ExamAnswer.objects.bulk_create([
+            ExamAnswer(result_id=results[submission.token].pk, question_id=question_id,
+                       choice_id=choice_id if choice_id in choices else None, is_correct=is_correct)
+            for submission in new
+            for question_id, choice_id, is_correct in submission.answers
+            if question_id in questions
+        ])
+        ExamSubmission.objects.filter(pk__in=[submission.pk for submission in pending]).update(
+            processed_at=timezone.now()
+        )
+        if results:
+            # bulk_create skips post_save, so announce the new results explicitly
+            results_created.send(sender=ExamResult, results=list(results.values()))
+    return len(pending)
+
+
+def prune_submissions(now=None):
+    """Delete outbox rows processed more than TRAINING_SUBMISSION_RETENTION_DAYS ago; returns how many."""
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=settings.TRAINING_SUBMISSION_RETENTION_DAYS)
+    return ExamSubmission.objects.filter(processed_at__lt=cutoff).delete()[0]
@@ -1,12 +1,42 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import tempfile
+import uuid
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
 from django.utils import timezone
-from jobs.models import JobBase, Profile
-from training.models import Exam, Question, Choice, ExamResult
+from jobs.models import JobBase, EmployeeJob, Profile
+from training.models import Exam, Question, Choice, ExamResult, ExamAnswer, ExamStats, ExamSubmission
+from training.submissions import flush_submissions
+from training.compliance import (
+    build_compliance_matrix, get_compliance_matrix, NOT_REQUIRED, NOT_TAKEN, FAILED, PASSED,
+)
+from training.status import get_training_status
+from training.context_processors import training_status
+from accounts.models import Location
+from training.analytics import compute_item_analysis, get_item_analysis
+from training.grading import grade_submission, InvalidSubmission
+from training.fragments import exam_form_cache_stats
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+def employee(username, location=None, jobs=()):
+    """A new user's profile, with a matching email address, home `location` and an EmployeeJob per job."""
+    profile = User.objects.create_user(username=username, email=f"{username}@email.com", password="x").profile
+    profile.location = location
+    profile.save()
+    for job in jobs:
+        EmployeeJob.objects.create(profile=profile, job=job)
+    return profile
+
+
 class ExamModelTests(TestCase):
     def setUp(self):
         # Create a mock user and profile
@@ -89,3 +119,529 @@ def test_question_ordering(self):
 
 
 # Create your tests here.
+
+
+class ExamGradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="grader", password="testpass123")
+        self.job = JobBase.objects.create(title="Server")
+        self.exam = Exam.objects.create(title="Server Knowledge", job=self.job, season="FALL", year=2025)
+        self.q1 = Question.objects.create(exam=self.exam, text="Q1", order=1)
+        self.q2 = Question.objects.create(exam=self.exam, text="Q2", order=2)
+        self.q1_right = Choice.objects.create(question=self.q1, text="right", is_correct=True)
+        self.q1_wrong = Choice.objects.create(question=self.q1, text="wrong")
+        self.q2_right = Choice.objects.create(question=self.q2, text="right", is_correct=True)
+        self.q2_wrong = Choice.objects.create(question=self.q2, text="wrong")
+
+    def test_grades_in_memory_after_key_is_cached(self):
+        """Once the answer key is cached grading costs no queries"""
+        data = {f"question_{self.q1.id}": str(self.q1_right.id), f"question_{self.q2.id}": str(self.q2_wrong.id)}
+        grade_submission(self.exam, data)
+        with self.assertNumQueries(0):
+            grade = grade_submission(self.exam, data)
+        self.assertEqual((grade.correct, grade.total, grade.score), (1, 2, 50.0))
+        self.assertFalse(grade.passed)
+
+    def test_rejects_choice_from_another_question(self):
+        data = {f"question_{self.q1.id}": str(self.q2_right.id)}
+        with self.assertRaises(InvalidSubmission):
+            grade_submission(self.exam, data)
+
+    def test_answer_key_rebuilt_when_choice_changes(self):
+        data = {f"question_{self.q1.id}": str(self.q1_wrong.id)}
+        self.assertEqual(grade_submission(self.exam, data).correct, 0)
+        self.q1_wrong.is_correct = True
+        self.q1_wrong.save()
+        self.assertEqual(grade_submission(self.exam, data).correct, 1)
+
+    def test_answer_key_rebuilt_when_question_deleted(self):
+        grade_submission(self.exam, {})
+        self.q2.delete()
+        self.assertEqual(grade_submission(self.exam, {}).total, 1)
+
+    def test_exam_view_post(self):
+        self.client.login(username="grader", password="testpass123")
+        url = reverse("server_exam", args=[self.exam.pk])
+        data = {f"question_{self.q1.id}": self.q1_right.id, f"question_{self.q2.id}": self.q2_right.id}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        result = ExamResult.objects.get(exam=self.exam)
+        self.assertTrue(result.passed)
+        self.assertEqual(result.score, 100.0)
+
+        response = self.client.post(url, {f"question_{self.q1.id}": self.q2_right.id})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExamStatsTests(TestCase):
+    def setUp(self):
+        self.job = JobBase.objects.create(title="Cook")
+        self.exam = Exam.objects.create(title="Line Check", job=self.job, season="SPRING", year=2025)
+        self.alice = User.objects.create_user(username="alice", email="alice@email.com", password="testpass123").profile
+        self.bob = User.objects.create_user(username="bob", email="bob@email.com", password="testpass123").profile
+
+    def test_stats_updated_on_result_creation(self):
+        ExamResult.objects.create(profile=self.alice, exam=self.exam, score=60, passed=False)
+        ExamResult.objects.create(profile=self.alice, exam=self.exam, score=95, passed=True)
+        ExamResult.objects.create(profile=self.bob, exam=self.exam, score=100, passed=True)
+
+        stats = ExamStats.objects.get(exam=self.exam)
+        self.assertEqual((stats.attempts, stats.takers, stats.passes), (3, 2, 2))
+        self.assertAlmostEqual(stats.mean_score, 85.0)
+        self.assertIsNotNone(stats.last_submitted_at)
+
+    def test_rebuild_matches_incremental_stats(self):
+        ExamResult.objects.create(profile=self.alice, exam=self.exam, score=70, passed=False)
+        ExamResult.objects.create(profile=self.bob, exam=self.exam, score=90, passed=True)
+        before = ExamStats.objects.values().get(exam=self.exam)
+
+        ExamStats.objects.all().delete()
+        call_command('rebuild_exam_stats', stdout=StringIO())
+        self.assertEqual(ExamStats.objects.values().get(exam=self.exam), before)
+
+    def test_dashboard_is_a_single_query(self):
+        other = Exam.objects.create(title="Prep", job=self.job, season="FALL", year=2025)
+        ExamResult.objects.create(profile=self.alice, exam=self.exam, score=95, passed=True)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("exam_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        rows = {row['exam_title']: row for row in response.context['exam_data']}
+        self.assertEqual(rows["Line Check"]['total_takers'], 1)
+        self.assertEqual(rows["Prep"]['total_takers'], 0)
+
+
+class LatestAttemptTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="server", email="server@email.com", password="testpass123")
+        self.profile = self.user.profile
+        self.job = JobBase.objects.create(title="Server")
+        EmployeeJob.objects.create(profile=self.profile, job=self.job, is_primary=True)
+        self.passed_exam = Exam.objects.create(title="Wine", job=self.job, season="FALL", year=2025)
+        self.failed_exam = Exam.objects.create(title="Menu", job=self.job, season="SUMMER", year=2025)
+        self.new_exam = Exam.objects.create(title="Safety", job=self.job, season="SPRING", year=2025)
+        self.client.login(username="server", password="testpass123")
+
+    def _retake(self, exam, scores):
+        for score in scores:
+            ExamResult.objects.create(profile=self.profile, exam=exam, score=score, passed=score >= 90)
+
+    def test_latest_attempts_returns_newest_result_per_exam(self):
+        self._retake(self.passed_exam, [50, 95])
+        self._retake(self.failed_exam, [80, 40])
+        latest = {r.exam_id: r.score for r in ExamResult.objects.filter(profile=self.profile).latest_attempts()}
+        self.assertEqual(latest, {self.passed_exam.id: 95, self.failed_exam.id: 40})
+
+    # Counts include 2 queries for the navigation training status, which new results invalidate
+    def test_available_exams_query_count_is_fixed(self):
+        self._retake(self.passed_exam, [95])
+        self._retake(self.failed_exam, [40])
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse("available_exams"))
+        self.assertEqual([e.title for e in response.context['exams']], ["Menu", "Safety"])
+
+        self._retake(self.failed_exam, [10, 20, 30, 40, 50])
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse("available_exams"))
+        menu = response.context['exams'][0]
+        self.assertEqual((menu.score, menu.can_retake), (50, True))
+
+    def test_user_dashboard_query_count_is_fixed(self):
+        self._retake(self.passed_exam, [50, 95])
+        self._retake(self.failed_exam, [40])
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse("user_exam_dashboard"))
+        self.assertEqual(response.context['passed_count'], 1)
+        self.assertEqual(response.context['failed_count'], 1)
+        self.assertEqual(response.context['remaining_count'], 1)
+
+        self._retake(self.failed_exam, [10, 20, 30, 95])
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse("user_exam_dashboard"))
+        self.assertEqual(response.context['passed_count'], 2)
+
+
+class ItemAnalysisTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.job = JobBase.objects.create(title="Host")
+        self.exam = Exam.objects.create(title="Greeting", job=self.job, season="WINTER", year=2025)
+        self.easy = Question.objects.create(exam=self.exam, text="Easy", order=1)
+        self.hard = Question.objects.create(exam=self.exam, text="Hard", order=2)
+        self.easy_right = Choice.objects.create(question=self.easy, text="right", is_correct=True)
+        self.easy_wrong = Choice.objects.create(question=self.easy, text="wrong")
+        self.hard_right = Choice.objects.create(question=self.hard, text="right", is_correct=True)
+        self.hard_wrong = Choice.objects.create(question=self.hard, text="wrong")
+
+        # Strong takers get both right, weak takers only the easy one
+        for i, hard_choice in enumerate([self.hard_right, self.hard_right, self.hard_wrong, self.hard_wrong]):
+            profile = User.objects.create_user(username=f"host{i}", email=f"host{i}@email.com", password="x").profile
+            result = ExamResult.objects.create(profile=profile, exam=self.exam, score=0)
+            ExamAnswer.objects.bulk_create([
+                ExamAnswer(result=result, question=self.easy, choice=self.easy_right, is_correct=True),
+                ExamAnswer(result=result, question=self.hard, choice=hard_choice, is_correct=hard_choice.is_correct),
+            ])
+
+    def test_item_statistics(self):
+        analysis = compute_item_analysis(self.exam.id)
+        self.assertEqual(analysis['takers'], 4)
+        easy = analysis['questions'][self.easy.id]
+        hard = analysis['questions'][self.hard.id]
+        self.assertEqual(easy['difficulty'], 1.0)
+        self.assertIsNone(easy['discrimination'])  # everyone got it right, no variance
+        self.assertEqual(hard['difficulty'], 0.5)
+        self.assertEqual(hard['choices'], {self.hard_right.id: 0.5, self.hard_wrong.id: 0.5})
+        self.assertEqual(easy['choices'][self.easy_wrong.id], 0.0)
+
+    def test_analysis_cached_until_question_changes(self):
+        get_item_analysis(self.exam.id)
+        with self.assertNumQueries(0):
+            get_item_analysis(self.exam.id)
+        self.hard.text = "Harder"
+        self.hard.save()
+        with self.assertNumQueries(2):
+            get_item_analysis(self.exam.id)
+
+    def test_exam_view_saves_answers(self):
+        user = User.objects.create_user(username="taker", email="taker@email.com", password="testpass123")
+        self.client.login(username="taker", password="testpass123")
+        self.client.post(reverse("server_exam", args=[self.exam.pk]), {
+            f"question_{self.easy.id}": self.easy_right.id,
+            f"question_{self.hard.id}": self.hard_wrong.id,
+        })
+        answers = ExamAnswer.objects.filter(result__profile=user.profile)
+        self.assertEqual(
+            set(answers.values_list('question_id', 'choice_id', 'is_correct')),
+            {(self.easy.id, self.easy_right.id, True), (self.hard.id, self.hard_wrong.id, False)},
+        )
+
+    def test_question_admin_shows_analysis(self):
+        User.objects.create_superuser(username="admin", email="admin@email.com", password="testpass123")
+        self.client.login(username="admin", password="testpass123")
+        response = self.client.get(reverse("admin:training_question_changelist"))
+        self.assertContains(response, "Discrimination")
+        response = self.client.get(reverse("admin:training_question_change", args=[self.hard.id]))
+        self.assertContains(response, "right (correct): 50.0%")
+
+
+class ImportExamsTests(TestCase):
+    def setUp(self):
+        self.job = JobBase.objects.create(title="Server")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_import_jsonl(self):
+        lines = [
+            {"job": "Server", "season": "fall", "year": 2026, "exam": "Fall Menu", "order": i,
+             "question": f"Question {i}", "choices": [{"text": "yes", "is_correct": True}, {"text": "no"}]}
+            for i in range(5)
+        ]
+        path = self._write("bank.jsonl", "\n".join(json.dumps(line) for line in lines))
+        out = StringIO()
+        call_command("import_exams", path, "--batch-size", "2", stdout=out)
+
+        exam = Exam.objects.get(job=self.job, season="FALL", year=2026)
+        self.assertEqual(exam.questions.count(), 5)
+        self.assertEqual(Choice.objects.filter(question__exam=exam, is_correct=True).count(), 5)
+        self.assertIn("rows/s", out.getvalue())
+
+    def test_import_csv_appends_to_existing_exam(self):
+        exam = Exam.objects.create(title="Spring", job=self.job, season="SPRING", year=2026)
+        path = self._write("bank.csv", (
+            "job,season,year,exam,order,question,choices,correct\n"
+            "Server,SPRING,2026,Spring,1,Pick two,a|b|c,1|3\n"
+        ))
+        call_command("import_exams", path, stdout=StringIO())
+        question = exam.questions.get()
+        self.assertEqual(
+            list(question.choices.order_by("id").values_list("text", "is_correct")),
+            [("a", True), ("b", False), ("c", True)],
+        )
+
+    def test_invalid_row_rolls_back_everything(self):
+        good = {"job": "Server", "season": "FALL", "year": 2026, "exam": "Fall", "question": "Q",
+                "choices": [{"text": "yes", "is_correct": True}, {"text": "no"}]}
+        bad = dict(good, job="Dishwasher")
+        path = self._write("bank.jsonl", json.dumps(good) + "\n" + json.dumps(bad))
+        with self.assertRaisesMessage(CommandError, "Line 2: job 'Dishwasher' does not exist"):
+            call_command("import_exams", path, "--batch-size", "1", stdout=StringIO())
+        self.assertFalse(Exam.objects.exists())
+        self.assertFalse(Question.objects.exists())
+
+    def test_malformed_values_are_reported_by_line(self):
+        good = {"job": "Server", "season": "FALL", "year": 2026, "exam": "Fall", "question": "Q",
+                "choices": [{"text": "yes", "is_correct": True}, {"text": "no"}]}
+        cases = [
+            ({"choices": [{"text": 42, "is_correct": True}, {"text": "no"}]}, "choice text must be a string"),
+            ({"choices": [{"text": "yes", "is_correct": True}, {"text": None}]}, "choice text must be a string"),
+            ({"choices": ["yes", "no"]}, "choices must be a list of objects"),
+            ({"exam": "x" * 101}, "exam title longer than 100 characters"),
+            ({"question": 7}, "question must be a string"),
+            ({"year": -2026}, "year, order and passing_score can't be negative"),
+            ({"passing_score": -1}, "year, order and passing_score can't be negative"),
+        ]
+        for changes, message in cases:
+            path = self._write("bank.jsonl", json.dumps(good) + "\n" + json.dumps(dict(good, **changes)))
+            with self.subTest(message), self.assertRaisesMessage(CommandError, f"Line 2: {message}"):
+                call_command("import_exams", path, stdout=StringIO())
+        for line in ('["Server", "FALL"]', '"Server"', '7'):
+            path = self._write("bank.jsonl", json.dumps(good) + "\n" + line)
+            with self.subTest(line), self.assertRaisesMessage(CommandError, "Line 2: expected a JSON object"):
+                call_command("import_exams", path, stdout=StringIO())
+        self.assertFalse(Exam.objects.exists())
+
+
+class ExamFormCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username="reader", email="reader@email.com", password="testpass123")
+        self.client.login(username="reader", password="testpass123")
+        self.exam = Exam.objects.create(title="Bar", job=JobBase.objects.create(title="Bartender"),
+                                        season="SUMMER", year=2025)
+        self.question = Question.objects.create(exam=self.exam, text="Shaken or stirred?", order=1)
+        self.choice = Choice.objects.create(question=self.question, text="Shaken", is_correct=True)
+        self.url = reverse("server_exam", args=[self.exam.pk])
+
+    def test_question_block_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(3):  # session, user, exam
+            response = self.client.get(self.url)
+        self.assertContains(response, "Shaken or stirred?")
+        self.assertContains(response, "csrfmiddlewaretoken")
+        self.assertEqual(exam_form_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_version_bumped_by_question_and_choice_changes(self):
+        version = Exam.objects.get(pk=self.exam.pk).content_version
+        self.choice.text = "Stirred"
+        self.choice.save()
+        Question.objects.create(exam=self.exam, text="Ice?", order=2)
+        self.assertEqual(Exam.objects.get(pk=self.exam.pk).content_version, version + 2)
+
+        response = self.client.get(self.url)
+        self.assertContains(response, "Stirred")
+        self.assertContains(response, "Ice?")
+
+        # Saving an exam loaded before the bump keeps the new version
+        self.exam.title = "Bar basics"
+        self.exam.save()
+        self.assertEqual(Exam.objects.get(pk=self.exam.pk).content_version, version + 2)
+        self.assertContains(self.client.get(self.url), "Ice?")
+
+
+class BufferedSubmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="rush", email="rush@email.com", password="testpass123")
+        self.client.login(username="rush", password="testpass123")
+        self.exam = Exam.objects.create(title="Peak", job=JobBase.objects.create(title="Cook"), season="SUMMER", year=2025)
+        self.question = Question.objects.create(exam=self.exam, text="Hot holding temp?", order=1)
+        self.right = Choice.objects.create(question=self.question, text="135F", is_correct=True)
+        self.url = reverse("server_exam", args=[self.exam.pk])
+        self.data = {f"question_{self.question.id}": self.right.id, "submission_token": str(uuid.uuid4())}
+
+    def test_double_post_is_idempotent_without_buffering(self):
+        self.client.post(self.url, self.data)
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ExamResult.objects.filter(exam=self.exam).count(), 1)
+        self.assertEqual(ExamAnswer.objects.count(), 1)
+
+    @override_settings(TRAINING_BUFFERED_SUBMISSIONS=True)
+    def test_buffered_submission_is_graded_now_and_written_on_flush(self):
+        response = self.client.post(self.url, self.data)
+        self.assertContains(response, "100.0%")
+        self.client.post(self.url, self.data)  # double-post
+        self.assertFalse(ExamResult.objects.exists())
+        self.assertEqual(ExamSubmission.objects.count(), 1)
+
+        call_command("flush_exam_submissions", stdout=StringIO())
+        result = ExamResult.objects.get(exam=self.exam)
+        self.assertTrue(result.passed)
+        self.assertEqual(result.answers.get().choice, self.right)
+        self.assertEqual(ExamStats.objects.get(exam=self.exam).attempts, 1)
+
+        # Flushing again finds nothing new to write
+        self.assertEqual(flush_submissions(), 0)
+        self.assertEqual(ExamResult.objects.count(), 1)
+
+    @override_settings(TRAINING_BUFFERED_SUBMISSIONS=True)
+    def test_flush_survives_questions_deleted_after_grading(self):
+        self.client.post(self.url, self.data)
+        other = Exam.objects.create(title="Other", job=self.exam.job, season="FALL", year=2025)
+        question = Question.objects.create(exam=other, text="Gone?", order=1)
+        choice = Choice.objects.create(question=question, text="Yes", is_correct=True)
+        self.client.post(reverse("server_exam", args=[other.pk]),
+                         {f"question_{question.id}": choice.id, "submission_token": str(uuid.uuid4())})
+        question.delete()
+        self.right.delete()
+
+        self.assertEqual(flush_submissions(), 2)
+        self.assertEqual(ExamResult.objects.count(), 2)
+        self.assertEqual(list(ExamAnswer.objects.values_list('question_id', 'choice_id')), [(self.question.pk, None)])
+        self.assertFalse(ExamSubmission.objects.filter(processed_at__isnull=True).exists())
+
+    def test_token_reused_by_another_user_is_a_conflict(self):
+        self.client.post(self.url, self.data)
+        User.objects.create_user(username="other", email="other@email.com", password="testpass123")
+        self.client.login(username="other", password="testpass123")
+        self.assertEqual(self.client.post(self.url, self.data).status_code, 409)
+        with self.settings(TRAINING_BUFFERED_SUBMISSIONS=True):
+            self.data["submission_token"] = str(uuid.uuid4())
+            self.client.post(self.url, self.data)
+            self.client.login(username="rush", password="testpass123")
+            self.assertEqual(self.client.post(self.url, self.data).status_code, 409)
+        self.assertEqual(ExamResult.objects.count(), 1)
+        self.assertEqual(ExamSubmission.objects.count(), 1)
+
+    @override_settings(TRAINING_BUFFERED_SUBMISSIONS=True, TRAINING_SUBMISSION_RETENTION_DAYS=7)
+    def test_flush_prunes_old_processed_submissions(self):
+        self.client.post(self.url, self.data)
+        call_command("flush_exam_submissions", stdout=StringIO())
+        ExamSubmission.objects.update(processed_at=timezone.now() - datetime.timedelta(days=8))
+        self.client.post(self.url, {**self.data, "submission_token": str(uuid.uuid4())})
+
+        out = StringIO()
+        call_command("flush_exam_submissions", stdout=out)
+        self.assertIn("Pruned 1 processed submission(s).", out.getvalue())
+        self.assertEqual(ExamSubmission.objects.get().processed_at.date(), timezone.now().date())
+        self.assertEqual(ExamResult.objects.count(), 2)
+
+
+class ComplianceMatrixTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.location = Location.objects.create(name="Downtown")
+        self.server = JobBase.objects.create(title="Server")
+        self.cook = JobBase.objects.create(title="Cook")
+        self.wine = Exam.objects.create(title="Wine", job=self.server, season="FALL", year=2025)
+        self.grill = Exam.objects.create(title="Grill", job=self.cook, season="FALL", year=2025)
+
+        self.ana = employee("ana", self.location, [self.server])
+        self.ben = employee("ben", self.location, [self.server, self.cook])
+        ExamResult.objects.create(profile=self.ana, exam=self.wine, score=95, passed=True)
+        ExamResult.objects.create(profile=self.ben, exam=self.grill, score=40, passed=False)
+
+    def _status(self, matrix):
+        exams = [label.split(" (")[0] for _, label in matrix.exams]
+        return {
+            name: dict(zip(exams, row))
+            for (_, name), row in zip(matrix.employees, matrix.status.tolist())
+        }
+
+    def test_matrix_statuses(self):
+        with self.assertNumQueries(3):
+            matrix = build_compliance_matrix(self.location.pk)
+        self.assertEqual(self._status(matrix), {
+            "ana": {"Wine": PASSED, "Grill": NOT_REQUIRED},
+            "ben": {"Wine": NOT_TAKEN, "Grill": FAILED},
+        })
+
+    def test_cache_invalidated_by_new_result_and_job_change(self):
+        get_compliance_matrix(self.location.pk)
+        with self.assertNumQueries(0):
+            get_compliance_matrix(self.location.pk)
+
+        ExamResult.objects.create(profile=self.ben, exam=self.grill, score=99, passed=True)
+        self.assertEqual(self._status(get_compliance_matrix(self.location.pk))["ben"]["Grill"], PASSED)
+
+        EmployeeJob.objects.create(profile=self.ana, job=self.cook)
+        self.assertEqual(self._status(get_compliance_matrix(self.location.pk))["ana"]["Grill"], NOT_TAKEN)
+
+    def test_report_is_staff_only(self):
+        url = reverse("compliance_report") + f"?location={self.location.pk}"
+        self.client.login(username="ana", password="x")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        User.objects.create_user(username="boss", email="boss@email.com", password="x", is_staff=True)
+        self.client.login(username="boss", password="x")
+        response = self.client.get(url)
+        self.assertContains(response, "Not taken")
+        self.assertContains(response, "Wine (Fall 2025)")
+
+
+class TrainingStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="cook", email="cook@email.com", password="testpass123")
+        self.job = JobBase.objects.create(title="Cook")
+        EmployeeJob.objects.create(profile=self.user.profile, job=self.job, is_primary=True)
+        self.knife = Exam.objects.create(title="Knife Skills", job=self.job, season="FALL", year=2025)
+        self.allergens = Exam.objects.create(title="Allergens", job=self.job, season="SPRING", year=2025)
+        self.sanitation = Exam.objects.create(title="Sanitation", job=self.job, season="WINTER", year=2024)
+        ExamResult.objects.create(profile=self.user.profile, exam=self.knife, score=95, passed=True)
+        ExamResult.objects.create(profile=self.user.profile, exam=self.allergens, score=30, passed=False)
+
+    def test_status_counts(self):
+        status = get_training_status(self.user.pk)
+        self.assertEqual(
+            (status['passed'], status['failed'], status['remaining'], status['pending']), (1, 1, 1, 2)
+        )
+        self.assertEqual(status['next_due']['title'], "Allergens")
+
+    def test_context_processor_costs_no_queries_on_cache_hit(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        training_status(request)
+        with self.assertNumQueries(0):
+            context = training_status(request)
+        self.assertEqual(context['training_status']['pending'], 2)
+
+    def test_invalidated_by_results_jobs_and_exams(self):
+        get_training_status(self.user.pk)
+        ExamResult.objects.create(profile=self.user.profile, exam=self.allergens, score=99, passed=True)
+        self.assertEqual(get_training_status(self.user.pk)['passed'], 2)
+
+        Exam.objects.create(title="Fryer", job=self.job, season="SUMMER", year=2025)
+        self.assertEqual(get_training_status(self.user.pk)['remaining'], 2)
+
+        EmployeeJob.objects.filter(profile=self.user.profile).delete()
+        self.assertEqual(get_training_status(self.user.pk)['pending'], 0)
+
+    def test_badges_in_navigation(self):
+        self.client.login(username="cook", password="testpass123")
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, '<span class="badge bg-warning text-dark">2</span>', html=True)
+
+
+class ExamResultExportTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Uptown")
+        self.job = JobBase.objects.create(title="Server")
+        self.fall = Exam.objects.create(title="Fall Menu", job=self.job, season="FALL", year=2025)
+        self.spring = Exam.objects.create(title="Spring Menu", job=self.job, season="SPRING", year=2025)
+        profile = employee("eve", self.location)
+        ExamResult.objects.create(profile=profile, exam=self.fall, score=91, passed=True)
+        ExamResult.objects.create(profile=profile, exam=self.spring, score=50, passed=False)
+        User.objects.create_user(username="boss", email="boss@email.com", password="x", is_staff=True)
+
+    def test_streaming_csv_export_with_filters(self):
+        self.client.login(username="boss", password="x")
+        response = self.client.get(reverse("exam_result_export"), {"season": "fall", "location": self.location.pk})
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:4], ["result_id", "submitted_at", "score", "passed"])
+        self.assertEqual(len(lines), 2)
+        self.assertIn("eve,eve@email.com,Uptown", lines[1])
+        self.assertIn("Fall Menu,FALL,2025,Server", lines[1])
+
+    def test_ndjson_export_and_bad_filter(self):
+        self.client.login(username="boss", password="x")
+        response = self.client.get(reverse("exam_result_export"), {"format": "ndjson"})
+        records = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([r["exam"] for r in records], ["Fall Menu", "Spring Menu"])
+        self.assertEqual(self.client.get(reverse("exam_result_export"), {"year": "soon"}).status_code, 400)
+
+    def test_export_is_staff_only(self):
+        self.client.login(username="eve", password="x")
+        self.assertEqual(self.client.get(reverse("exam_result_export")).status_code, 403)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command("export_exam_results", "--year", "2025", "--job", str(self.job.pk), stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import AvailableExamView, ExamDetailView, ExamView, ExamDashboardView, UserExamDashboardView
+from .views import (
+    AvailableExamView, ExamDetailView, ExamView, ExamDashboardView, UserExamDashboardView,
+    ComplianceReportView, ExamResultExportView,
+)
 
 urlpatterns = [
     path("available_exams/", AvailableExamView.as_view(), name="available_exams"),
@@ -7,4 +10,6 @@ urlpatterns = [
     path("exam/<int:pk>/take/", ExamView.as_view(), name="server_exam"),
     path("dashboard/", ExamDashboardView.as_view(), name="exam_dashboard"),
     path("user_exam_dashboard/", UserExamDashboardView.as_view(), name="user_exam_dashboard"),
+    path("compliance/", ComplianceReportView.as_view(), name="compliance_report"),
+    path("exam_results/export/", ExamResultExportView.as_view(), name="exam_result_export"),
 ]
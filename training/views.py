@@ -1,9 +1,19 @@
+import uuid
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.db.models import Count, Q
 from django.views import View
 from django.views.generic import ListView, DetailView, TemplateView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from .models import Exam, ExamResult, Question, Choice
+from .grading import grade_submission, InvalidSubmission
+from .fragments import render_exam_questions
+from .submissions import SubmissionTokenConflict, enqueue_submission, parse_submission_token, save_result
+from .compliance import get_compliance_matrix
+from .exports import EXPORT_FORMATS, ExportFilterError, export_rows, iter_export
+from accounts.models import Location
 from jobs.models import JobBase, EmployeeJob
 
 # -------------------------------
@@ -24,7 +34,7 @@ class AvailableExamView(LoginRequiredMixin, ListView):
         job_ids = profile.employee_jobs.values_list('job_id', flat=True)
 
         # All exams for those jobs
-        exams = Exam.objects.filter(job_id__in=job_ids).distinct()
+        exams = Exam.objects.filter(job_id__in=job_ids).select_related('job').distinct()
 
         # Identify passed exams (to exclude them)
         passed_exam_ids = ExamResult.objects.filter(
@@ -34,14 +44,10 @@ class AvailableExamView(LoginRequiredMixin, ListView):
         # Exams not yet passed (either failed or not taken)
         available_exams = exams.exclude(id__in=passed_exam_ids)
 
-        # Get user's latest attempt for each exam
-        results = (
-            ExamResult.objects.filter(profile=profile)
-            .order_by('exam_id', '-submitted_at')
-        )
-        result_dict = {}
-        for r in results:
-            result_dict.setdefault(r.exam_id, r)  # keep only the latest result per exam
+        # Get user's latest attempt for each exam (resolved by the database)
+        result_dict = {
+            r.exam_id: r for r in ExamResult.objects.filter(profile=profile).latest_attempts()
+        }
 
         for exam in available_exams:
             result = result_dict.get(exam.id)
@@ -76,19 +82,23 @@ class ExamView(LoginRequiredMixin, View):
 
     def get(self, request, pk):
         exam = get_object_or_404(Exam, pk=pk)
-        # Prefetch related choices to avoid N+1 queries
-        questions = exam.questions.prefetch_related('choices')
+        # Questions come from the fragment cache; only the CSRF token is rendered per request
         return render(request, self.template_name, {
             'exam': exam,
-            'questions': questions,
+            'questions_html': render_exam_questions(exam),
+            'submission_token': uuid.uuid4(),
         })
 
     def post(self, request, pk):
         exam = get_object_or_404(Exam, pk=pk)
-        questions = exam.questions.prefetch_related('choices')
 
-        total = questions.count()
-        if total == 0:
+        # Grade the whole submission in memory against the cached answer key
+        try:
+            grade = grade_submission(exam, request.POST)
+        except InvalidSubmission as e:
+            return HttpResponseBadRequest(str(e))
+
+        if grade.total == 0:
             # Prevent division by zero if exam has no questions
             return render(request, "training/exam_result.html", {
                 "exam": exam,
@@ -97,43 +107,20 @@ class ExamView(LoginRequiredMixin, View):
                 "error": "This exam has no questions configured."
             })
 
-        correct = 0
-        answers_data = []  # (Optional) track answers if needed later
-
-        for question in questions:
-            selected_choice_id = request.POST.get(f"question_{question.id}")
-            if not selected_choice_id:
-                continue  # skipped question
-
-            # Simplified and safer choice lookup
-            selected_choice = get_object_or_404(Choice, id=selected_choice_id)
-
-            is_correct = selected_choice.is_correct
-            if is_correct:
-                correct += 1
-
-            # Optional: record answer data for analytics/review (Improvement #3)
-            answers_data.append({
-                "question": question,
-                "selected_choice": selected_choice,
-                "is_correct": is_correct
-            })
-
-        percentage = round((correct / total) * 100, 2)
-        passed = percentage >= exam.passing_score
-
-        # Save main exam result
-        result = ExamResult.objects.create(
-            profile=request.user.profile,
-            exam=exam,
-            score=percentage,
-            passed=passed,
-        )
+        # Save main exam result, or queue it when submissions are buffered for peak windows
+        token = parse_submission_token(request.POST.get("submission_token"))
+        try:
+            if getattr(settings, "TRAINING_BUFFERED_SUBMISSIONS", False):
+                result = enqueue_submission(request.user.profile, grade, token)
+            else:
+                result = save_result(request.user.profile, grade, token)
+        except SubmissionTokenConflict as e:
+            return HttpResponse(str(e), status=409)
 
         return render(request, "training/exam_result.html", {
             "exam": exam,
-            "score": percentage,
-            "passed": passed
+            "score": result.score,
+            "passed": result.passed
         })
 
 
@@ -148,21 +135,23 @@ class ExamDashboardView(TemplateView):
             total_exams=Count('exams', distinct=True)
         )
 
-        # Count who has taken exams
+        # One query: every exam with its job and materialized stats (see training.stats)
+        exams = Exam.objects.select_related('job', 'stats').order_by('job_id', '-year', '-season')
+
         exam_data = []
-        for job in jobs:
-            exams = job.exams.all()
-            for exam in exams:
-                total_takers = ExamResult.objects.filter(exam=exam).count()
-                passed = ExamResult.objects.filter(exam=exam, passed=True).count()
-                exam_data.append({
-                    'job': job.title,
-                    'exam_title': exam.title,
-                    'season': exam.get_season_display(),
-                    'year': exam.year,
-                    'total_takers': total_takers,
-                    'passed': passed,
-                })
+        for exam in exams:
+            stats = getattr(exam, 'stats', None)
+            exam_data.append({
+                'job': exam.job.title,
+                'exam_title': exam.title,
+                'season': exam.get_season_display(),
+                'year': exam.year,
+                'total_takers': stats.takers if stats else 0,
+                'passed': stats.passes if stats else 0,
+                'attempts': stats.attempts if stats else 0,
+                'mean_score': round(stats.mean_score, 2) if stats else None,
+                'last_submitted_at': stats.last_submitted_at if stats else None,
+            })
 
         context['jobs'] = jobs
         context['exam_data'] = exam_data
@@ -204,13 +193,9 @@ class UserExamDashboardView(LoginRequiredMixin, TemplateView):
         exams = Exam.objects.filter(job=primary_job.job)
 
         # Get user's latest results (handle retakes)
-        latest_results = (
-            ExamResult.objects.filter(profile=profile)
-            .order_by('exam_id', '-submitted_at')
-        )
-        result_dict = {}
-        for r in latest_results:
-            result_dict.setdefault(r.exam_id, r)  # keep latest per exam
+        result_dict = {
+            r.exam_id: r for r in ExamResult.objects.filter(profile=profile).latest_attempts()
+        }
 
         # Split exams by result type
         taken_exams, passed_exams, failed_exams, remaining_exams = [], [], [], []
@@ -227,7 +212,7 @@ class UserExamDashboardView(LoginRequiredMixin, TemplateView):
                 remaining_exams.append(exam)
 
         # Stats
-        total_exams = exams.count()
+        total_exams = len(exams)
         taken_count = len(taken_exams)
         passed_count = len(passed_exams)
         failed_count = len(failed_exams)
@@ -247,3 +232,64 @@ class UserExamDashboardView(LoginRequiredMixin, TemplateView):
             'remaining_count': remaining_count,
         })
         return context
+
+
+# -------------------------------
+# Compliance matrix for managers
+# -------------------------------
+class ComplianceReportView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    template_name = 'training/compliance_report.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        locations = Location.objects.order_by('name')
+        location = None
+        location_id = self.request.GET.get('location')
+        if location_id and location_id.isdigit():
+            location = get_object_or_404(Location, pk=location_id)
+
+        context.update({
+            'locations': locations,
+            'location': location,
+        })
+        if location:
+            # Cached per location and invalidated on ExamResult/EmployeeJob/Exam writes
+            matrix = get_compliance_matrix(location.pk)
+            context.update({
+                'exams': matrix.exams,
+                'rows': matrix.rows(),
+                'totals': matrix.totals(),
+                'employee_count': len(matrix.employees),
+            })
+        return context
+
+
+# -------------------------------
+# Streaming export of exam results
+# -------------------------------
+class ExamResultExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return HttpResponseBadRequest(f"format must be one of {', '.join(EXPORT_FORMATS)}.")
+        try:
+            rows = export_rows(
+                season=request.GET.get('season'),
+                year=request.GET.get('year'),
+                job=request.GET.get('job'),
+                location=request.GET.get('location'),
+            )
+        except ExportFilterError as e:
+            return HttpResponseBadRequest(str(e))
+
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(iter_export(fmt, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="exam_results.{fmt}"'
+        return response